@@ -0,0 +1,118 @@
+"""
+Synthetic data generators for the benchmarks. Records follow the JSON schema of the shop's data files
+and are generated from a seed, so every run of a size benchmarks the same data.
+"""
+import json
+import os
+import random
+import bcrypt
+
+# dataset sizes of the suite, accounts, items and orders each have this many records
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+BRANDS = ("Fern", "Olive & Co", "Nordic Care", "Luma", "Pure Leaf", "Atlas")
+PRODUCTS = ("Shampoo", "Conditioner", "Hair Mask", "Body Wash", "Hand Cream", "Face Serum", "Toothpaste")
+ADJECTIVES = ("Deep Moisture", "Volume", "Repair", "Sensitive", "Fresh Mint", "Daily", "Night")
+STATUSES = ("placed", "dispatched", "delivered", "cancelled")
+# password of all generated accounts
+PASSWORD = "SsDMoDuLe123!."
+
+
+def resolve_size(size):
+    """
+    :param size: name of a size in SIZES or a number of records
+    :return: int number of records
+    """
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def generate_accounts(count, seed=0):
+    """
+    :param count: number of accounts
+    :param seed: random seed
+    :return: list of account dicts with account numbers 1 to count
+    """
+    rng = random.Random(seed)
+    # one cheap hash shared by all accounts, hashing is not what the data benchmarks measure
+    password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(4)).decode("utf-8")
+    return [
+        {
+            "email_address": f"user{number}@example.com",
+            "account_number": f"{number:06d}",
+            "secure_password": password_hash,
+            "insecure_password": "",
+            "name": rng.choice(("Anna", "George", "Maria", "Tom", "Aisha", "Li")),
+            "surname": rng.choice(("Smith", "Phil", "Jones", "Okafor", "Chen", "Novak")),
+            "address": {"line1": f"{rng.randint(1, 200)} Acorn Place", "line2": "", "postcode": "NW85BN"},
+            "phone": f"07{rng.randint(100000000, 999999999)}",
+            "role": "user" if number % 100 else rng.choice(("admin", "clerk")),
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def generate_inventory(count, seed=0):
+    """
+    :param count: number of items
+    :param seed: random seed
+    :return: list of item dicts with item IDs 1 to count
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "item_id": f"{number:07d}",
+            "brand": rng.choice(BRANDS),
+            "name": f"{rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS)}",
+            "price": f"{rng.randint(99, 4999) / 100:.2f}",
+            "quantity": str(rng.randint(0, 500)),
+            "category_id": f"{rng.randint(1, 12):02d}",
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def generate_orders(count, accounts, items, seed=0):
+    """
+    :param count: number of orders
+    :param accounts: number of accounts the orders are spread over
+    :param items: number of items the order lines are drawn from
+    :param seed: random seed
+    :return: list of order dicts with order IDs 1 to count
+    """
+    rng = random.Random(seed)
+    orders = []
+    for number in range(1, count + 1):
+        lines = [
+            {"item_id": f"{rng.randint(1, items):07d}", "quantity": rng.randint(1, 5)}
+            for _ in range(rng.randint(1, 4))
+        ]
+        orders.append(
+            {
+                "account_number": f"{rng.randint(1, accounts):06d}",
+                "order_id": f"{number:07d}",
+                "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "status": rng.choice(STATUSES),
+                "total": f"{rng.randint(99, 20000) / 100:.2f}",
+                "order_items": lines,
+            }
+        )
+    return orders
+
+
+def write_dataset(directory, count, seed=0):
+    """
+    Writes accounts.json, inventory.json and orders.json of count records each.
+    :param directory: data directory, created if missing
+    :param count: number of records per data type
+    :param seed: random seed
+    """
+    os.makedirs(directory, exist_ok=True)
+    generators = {
+        "accounts": lambda: generate_accounts(count, seed),
+        "inventory": lambda: generate_inventory(count, seed),
+        "orders": lambda: generate_orders(count, count, count, seed),
+    }
+    # one data type at a time, so the largest size does not hold all records at once
+    for data_type, generate in generators.items():
+        with open(os.path.join(directory, f"{data_type}.json"), "w") as f:
+            json.dump(generate(), f)
@@ -0,0 +1,76 @@
+"""
+ReDoS regression benchmark for the e-mail validators.
+Times the linear-time scanner and the precompiled secure pattern on crafted addresses of growing length,
+the time per call has to stay flat relative to the input length. With --insecure the backtracking pattern
+of the insecure mode is timed as well, on short inputs only, as its time doubles with every character.
+
+Run from src/eCommerce_application: python benchmarks/redos_benchmark.py [--insecure]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eCommerceApp"))
+
+from validators import SECURE_EMAIL_PATTERN, is_valid_email, is_valid_email_insecure  # noqa: E402
+
+LENGTHS = (10, 100, 1000, 10000, 100000)
+INSECURE_LENGTHS = (12, 14, 16, 18, 20, 22)
+
+
+def crafted_addresses(length):
+    """
+    :param length: number of repeated characters
+    :return: list of invalid addresses that make backtracking matchers retry many splits
+    """
+    return [
+        "a" * length + "!",
+        "a@" + "a." * length + "!",
+        "a" * length + "@" + "-" * length,
+    ]
+
+
+def time_check(check, addresses, repeat):
+    """
+    :param check: validation function
+    :param addresses: addresses to check
+    :param repeat: number of rounds
+    :return: microseconds per check
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for address in addresses:
+            check(address)
+    return (time.perf_counter() - start) / (repeat * len(addresses)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ReDoS regression benchmark of the e-mail validators")
+    parser.add_argument("--insecure", action="store_true", help="also time the backtracking pattern")
+    parser.add_argument("--repeat", type=int, default=20, help="rounds per input length")
+    args = parser.parse_args()
+
+    checks = [
+        ("scanner", is_valid_email),
+        ("secure regex", lambda address: SECURE_EMAIL_PATTERN.fullmatch(address)),
+    ]
+    print(f"{'length':>8}" + "".join(f"{name + ' us/call':>22}{'ns/char':>10}" for name, _ in checks))
+    for length in LENGTHS:
+        addresses = crafted_addresses(length)
+        characters = sum(len(address) for address in addresses) / len(addresses)
+        row = f"{length:>8}"
+        for _, check in checks:
+            micros = time_check(check, addresses, args.repeat)
+            row += f"{micros:>22.2f}{micros * 1000 / characters:>10.2f}"
+        print(row)
+
+    if args.insecure:
+        print(f"\n{'length':>8}{'insecure regex us/call':>24}")
+        for length in INSECURE_LENGTHS:
+            micros = time_check(is_valid_email_insecure, ["a" * length + "!"], 1)
+            print(f"{length:>8}{micros:>24.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Benchmark suite of the shop's data paths.
+Generates a synthetic dataset of the chosen size in a temporary directory, runs the shop on it through a
+JSON storage engine of its own and times data loading, inventory and order search, account lookups and
+saves, order number allocation, batch encryption and the /api/orders endpoint. Results are written as
+JSON, and compared against a stored baseline of the same size the run fails if an operation got slower
+than the threshold allows.
+
+Run from src/eCommerce_application:
+    python benchmarks/run_benchmarks.py --size 10k --output results.json
+    python benchmarks/run_benchmarks.py --size 10k --save-baseline benchmarks/baseline-10k.json
+    python benchmarks/run_benchmarks.py --size 10k --baseline benchmarks/baseline-10k.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), "eCommerceApp"))
+
+from cryptography.fernet import Fernet  # noqa: E402
+import helper_funcs  # noqa: E402
+from api_server import create_app  # noqa: E402
+from data_store import data_store  # noqa: E402
+from generators import generate_accounts, resolve_size, write_dataset  # noqa: E402
+from helper_funcs import generate_order_number, get_data, max_record_number  # noqa: E402
+from id_allocator import IdAllocator  # noqa: E402
+from models import AccountModel, EShopModel, InventoryModel  # noqa: E402
+from record_crypto import encrypt_records  # noqa: E402
+from search_index import InventorySearchIndex  # noqa: E402
+from storage import JsonStorageEngine, get_storage_engine, set_storage_engine  # noqa: E402
+
+# slowdown of the median over the baseline that fails a comparison
+DEFAULT_THRESHOLD = 0.25
+SEARCH_KEYWORDS = ("shampoo", "mask", "repair", "mint", "serum", "volume", "cream", "no such item")
+
+
+def measure(function, repeat, operations=1):
+    """
+    Times a function.
+    :param function: callable running the benchmarked operations
+    :param repeat: number of timed runs
+    :param operations: operations per run, the results are per operation
+    :return: dict with the median and minimum seconds per operation
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {
+        "median_s": statistics.median(timings) / operations,
+        "min_s": min(timings) / operations,
+        "repeat": repeat,
+        "operations": operations,
+    }
+
+
+def _benchmarks(count, seed):
+    # name -> (function, operations per run), each prepared so that only the named operation is timed
+    rng = random.Random(seed)
+    account_numbers = [rng.randint(1, count) for _ in range(1000)]
+    emails = [f"user{rng.randint(1, count)}@example.com" for _ in range(1000)]
+    order_filters = [f"{rng.randint(1, count):06d}" for _ in range(50)]
+    new_accounts = iter(range(count + 1, 10 ** 9))
+    cipher = Fernet(Fernet.generate_key())
+    plain_accounts = generate_accounts(1000, seed)
+    inventory = InventoryModel()
+    inventory.load_inventory()
+    shop = EShopModel()
+    account = AccountModel()
+    api = create_app().test_client()
+
+    def get_data_cold():
+        data_store.invalidate()
+        for data_type in ("accounts", "inventory", "orders"):
+            get_data(data_type)
+
+    def get_data_cached():
+        for _ in range(1000):
+            get_data("orders")
+
+    def search_index_build():
+        InventorySearchIndex(get_data("inventory"))
+
+    def search_inventory():
+        for keyword in SEARCH_KEYWORDS:
+            inventory.search_inventory(keyword)
+
+    def search_orders():
+        for number in account_numbers:
+            shop.account.account_number = number
+            shop.search_orders()
+
+    def load_account_details():
+        for email in emails:
+            account.load_account_details(True, email)
+
+    def generate_order_numbers():
+        for _ in range(1000):
+            generate_order_number()
+
+    def save_account():
+        for _ in range(100):
+            number = next(new_accounts)
+            AccountModel.from_dict(
+                {"email_address": f"user{number}@example.com", "account_number": f"{number:06d}"}
+            ).save_account()
+
+    def encrypt_batch():
+        encrypt_records(plain_accounts, cipher)
+
+    def api_orders():
+        for account_number in order_filters:
+            response = api.get("/api/orders", query_string={"account_number": account_number, "limit": 50})
+            assert response.status_code == 200
+
+    return {
+        "get_data_cold": (get_data_cold, 1),
+        "get_data_cached": (get_data_cached, 1000),
+        "search_index_build": (search_index_build, 1),
+        "search_inventory": (search_inventory, len(SEARCH_KEYWORDS)),
+        "search_orders": (search_orders, len(account_numbers)),
+        "load_account_details": (load_account_details, len(emails)),
+        "generate_order_number": (generate_order_numbers, 1000),
+        "save_account": (save_account, 100),
+        "encrypt_records": (encrypt_batch, len(plain_accounts)),
+        "api_orders": (api_orders, len(order_filters)),
+    }
+
+
+def run_suite(size="10k", repeat=5, seed=0, only=None):
+    """
+    Runs the benchmarks on a generated dataset in a temporary directory. The working directory, the
+    storage engine and the account and order number allocators are restored afterwards.
+    :param size: name of a size in generators.SIZES or a number of records per data type
+    :param repeat: timed runs per benchmark
+    :param seed: random seed of the data and the lookups
+    :param only: names of the benchmarks to run, all if None
+    :return: results dict
+    """
+    count = resolve_size(size)
+    previous_directory = os.getcwd()
+    previous_engine = get_storage_engine()
+    previous_allocators = (helper_funcs.account_number_allocator, helper_funcs.order_number_allocator)
+    results = {
+        "size": str(size),
+        "records": count,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "benchmarks": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="eshop-benchmarks-") as directory:
+        os.chdir(directory)
+        try:
+            started = time.perf_counter()
+            write_dataset("data", count, seed)
+            results["generate_s"] = time.perf_counter() - started
+            set_storage_engine(JsonStorageEngine())
+            # allocators of their own, which recover their high-water marks from the generated data
+            helper_funcs.account_number_allocator = IdAllocator(
+                "data/account_number.hwm", lambda: max_record_number("accounts", "account_number")
+            )
+            helper_funcs.order_number_allocator = IdAllocator(
+                "data/order_number.hwm", lambda: max_record_number("orders", "order_id")
+            )
+            for name, (function, operations) in _benchmarks(count, seed).items():
+                if only and name not in only:
+                    continue
+                # untimed warm-up run, e.g. to build the indexes used by the lookups
+                function()
+                results["benchmarks"][name] = measure(function, repeat, operations)
+        finally:
+            set_storage_engine(previous_engine)
+            helper_funcs.account_number_allocator, helper_funcs.order_number_allocator = previous_allocators
+            data_store.invalidate()
+            os.chdir(previous_directory)
+    return results
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares median timings against a baseline of the same size.
+    :param results: results dict of run_suite
+    :param baseline: results dict stored as baseline
+    :param threshold: allowed slowdown, e.g. 0.25 for 25 %
+    :return: list of dicts of the regressed benchmarks with their baseline and current medians
+    :raises ValueError: if the baseline was recorded for another size
+    """
+    if baseline.get("records") != results.get("records"):
+        raise ValueError(
+            f"Baseline of {baseline.get('records')} records cannot be compared to {results.get('records')}."
+        )
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        reference = baseline["benchmarks"].get(name)
+        if reference is None or not reference["median_s"]:
+            continue
+        ratio = current["median_s"] / reference["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                {
+                    "benchmark": name,
+                    "baseline_s": reference["median_s"],
+                    "current_s": current["median_s"],
+                    "ratio": ratio,
+                }
+            )
+    return regressions
+
+
+def _print_results(results, baseline=None):
+    print(f"{results['records']} records per data type, Python {results['python']}")
+    print(f"{'benchmark':<24}{'median us/op':>16}{'min us/op':>14}{'vs baseline':>14}")
+    for name, timing in results["benchmarks"].items():
+        change = ""
+        reference = (baseline or {}).get("benchmarks", {}).get(name)
+        if reference and reference["median_s"]:
+            change = f"{(timing['median_s'] / reference['median_s'] - 1) * 100:+.1f} %"
+        print(f"{name:<24}{timing['median_s'] * 1e6:>16.2f}{timing['min_s'] * 1e6:>14.2f}{change:>14}")
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the shop's data paths on synthetic data.")
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1m or a number of records")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the generated data")
+    parser.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="fail if a benchmark is slower than in this results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown")
+    parser.add_argument("--save-baseline", help="store the results as baseline in this file")
+    args = parser.parse_args()
+
+    # paths are resolved before the suite changes into its temporary directory
+    output, baseline_path, save_path = (
+        os.path.abspath(path) if path else None for path in (args.output, args.baseline, args.save_baseline)
+    )
+    results = run_suite(args.size, args.repeat, args.seed, args.only)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    _print_results(results, baseline)
+    if output:
+        _write_json(output, results)
+    if save_path:
+        _write_json(save_path, results)
+        print(f"Baseline saved to {save_path}")
+    if baseline is not None:
+        regressions = compare_results(results, baseline, args.threshold)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['benchmark']}: {regression['baseline_s'] * 1e6:.2f} us/op ->"
+                f" {regression['current_s'] * 1e6:.2f} us/op ({regression['ratio']:.2f}x)"
+            )
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,254 @@
+import gzip
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, current_app, jsonify, request, stream_with_context
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from helper_funcs import get_data
+from metrics import render_prometheus, timed
+from orders_api import OrderQuery, query_orders, stream_orders
+from response_cache import ResponseCache
+from storage import get_storage_engine
+
+logger = logging.getLogger("EShopApp")
+
+# servers started in this process, used by the API client to skip HTTP for in-process calls
+_running_servers = []
+_running_lock = threading.Lock()
+
+
+def get_running_server():
+    """
+    Returns the most recently started API server of this process that is still running.
+    :return: ApiServer instance or None
+    """
+    with _running_lock:
+        return _running_servers[-1] if _running_servers else None
+
+
+def create_app():
+    """
+    Creates the Flask application serving the shop API.
+    :return: Flask app
+    """
+    app = Flask(__name__)
+    response_cache = ResponseCache()
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_api():
+        """
+        Exposes the operation latencies and counters in the Prometheus text format. Nothing is
+        recorded unless metrics are enabled with ESHOP_METRICS=1.
+        """
+        return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/api/orders", methods=["GET"])
+    @timed("api_orders")
+    def get_orders_api():
+        """
+        Lists orders. Supports the filters account_number, status, date_from and date_to (YYYY-MM-DD),
+        field projection with fields=a,b, cursor pagination with limit and cursor, and streaming
+        NDJSON with format=ndjson or an Accept: application/x-ndjson header.
+        JSON responses carry a strong ETag and are answered with 304 Not Modified if the client
+        already holds the current version. Bodies are gzip compressed for clients accepting it.
+        """
+        try:
+            query = OrderQuery.from_args(request.args, request.headers.get("Accept", ""))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            if query.stream:
+                return Response(
+                    stream_with_context(stream_orders(get_data("orders"), query)),
+                    mimetype="application/x-ndjson",
+                )
+            use_gzip = "gzip" in request.accept_encodings
+
+            def render():
+                body = current_app.json.dumps(query_orders(get_data("orders"), query)).encode("utf-8")
+                # mtime=0 keeps the compressed bytes, and so the ETag, stable between renders
+                return gzip.compress(body, compresslevel=6, mtime=0) if use_gzip else body
+
+            etag, body = response_cache.get_or_render(
+                "orders",
+                get_storage_engine().version("orders"),
+                (request.query_string, use_gzip),
+                render,
+            )
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype="application/json")
+                if use_gzip:
+                    response.headers["Content-Encoding"] = "gzip"
+            response.set_etag(etag)
+            response.vary.add("Accept-Encoding")
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        except FileNotFoundError:
+            return jsonify({"error": "Orders file not found"}), 404
+        except json.JSONDecodeError:
+            return jsonify({"error": "Invalid JSON format"}), 400
+
+    return app
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """
+    HTTP/1.1 request handler that closes idle keep-alive connections, so they do not hold a worker forever.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    WSGI server handing connections to a fixed pool of worker threads instead of one thread per request.
+    Closing the server waits for requests in progress to finish.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, workers=8):
+        """
+        :param host: interface to listen on
+        :param port: port to listen on
+        :param app: WSGI application
+        :param workers: number of worker threads
+        """
+        super().__init__(host, port, app, handler=KeepAliveRequestHandler)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+class ApiServer:
+    """
+    Single long-lived API server for the lifetime of the application.
+    The listening socket is bound when the server starts, after which it is ready and signals this
+    through an event instead of callers sleeping for a fixed time. Requests are served by a pool of
+    worker threads, optionally in several pre-forked worker processes sharing the socket (POSIX only).
+    """
+
+    def __init__(self, app=None, host="127.0.0.1", port=8000, workers=8, processes=1):
+        """
+        :param app: WSGI application, the shop API by default
+        :param host: interface to listen on
+        :param port: port to listen on, 0 picks a free port
+        :param workers: worker threads per process
+        :param processes: number of worker processes
+        """
+        self.app = app or create_app()
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.processes = processes
+        self.ready = threading.Event()
+        self.startup_ms = None
+        self._server = None
+        self._thread = None
+        self._children = []
+
+    @property
+    def url(self):
+        """
+        :return: base URL of the running server
+        """
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout=5.0):
+        """
+        Binds the socket and starts serving in a background thread.
+        :param timeout: seconds to wait until the server is ready
+        :return: bool if the server is ready
+        """
+        started = time.perf_counter()
+        try:
+            self._server = PooledWSGIServer(self.host, self.port, self.app, self.workers)
+        except SystemExit:
+            # werkzeug exits when the port cannot be bound
+            raise RuntimeError(f"API server could not listen on {self.host}:{self.port}")
+        self.port = self._server.server_port
+        if self.processes > 1:
+            self._fork_workers()
+        self._thread = threading.Thread(target=self._serve, name="api-server", daemon=True)
+        self._thread.start()
+        ready = self.ready.wait(timeout)
+        with _running_lock:
+            _running_servers.append(self)
+        self.startup_ms = (time.perf_counter() - started) * 1000
+        logger.info("API server ready on %s in %.1f ms.", self.url, self.startup_ms)
+        return ready
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Blocks until the server accepts requests.
+        :param timeout: seconds to wait, forever if None
+        :return: bool if the server is ready
+        """
+        return self.ready.wait(timeout)
+
+    def stop(self, timeout=10.0):
+        """
+        Stops accepting connections, waits for requests in progress and stops the worker processes.
+        :param timeout: seconds to wait for the serving thread
+        """
+        if self._server is None:
+            return
+        self.ready.clear()
+        with _running_lock:
+            if self in _running_servers:
+                _running_servers.remove(self)
+        # serve_forever closes the server and waits for requests in progress once shut down
+        self._server.shutdown()
+        self._thread.join(timeout)
+        for pid in self._children:
+            os.kill(pid, signal.SIGTERM)
+        for pid in self._children:
+            os.waitpid(pid, 0)
+        self._children = []
+        self._server = None
+        logger.info("API server stopped.")
+
+    def _serve(self):
+        self.ready.set()
+        self._server.serve_forever()
+
+    def _fork_workers(self):
+        for _ in range(self.processes - 1):
+            pid = os.fork()
+            if pid == 0:
+                self._run_worker_process()
+            self._children.append(pid)
+
+    def _run_worker_process(self):
+        # worker processes accept connections on the inherited listening socket until terminated
+        server = self._server
+
+        def terminate(signum, frame):
+            threading.Thread(target=server.shutdown).start()
+
+        signal.signal(signal.SIGTERM, terminate)
+        try:
+            # closes the server and waits for requests in progress when it returns
+            server.serve_forever()
+        finally:
+            os._exit(0)
@@ -1,42 +1,14 @@
-import json
-from flask import Flask, jsonify
-from threading import Thread
-import time
-from helper_funcs import get_data
+import atexit
+from api_server import ApiServer
 from controllers import EShopController
+from logging_setup import configure_logging
 import logging
 
-logging.basicConfig(filename="app.log", encoding="utf-8", level=logging.DEBUG)
+# records are written to app.log as JSON lines by a background thread
+configure_logging(filename="app.log", level=logging.DEBUG)
 logger = logging.getLogger("EShopApp")
 
 
-def start_api():
-    app = Flask(__name__)
-    with app.app_context():
-
-        def get_orders_api():
-            try:
-                orders = get_data("orders")
-                return jsonify(orders)
-            except FileNotFoundError:
-                return jsonify({"error": "Orders file not found"}), 404
-            except json.JSONDecodeError:
-                return jsonify({"error": "Invalid JSON format"}), 400
-
-        # Add URL rules
-        app.add_url_rule(
-            "/api/orders", "get_orders_api", get_orders_api, methods=["GET"]
-        )
-
-        def run_flask():
-            app.run(port=8000)
-
-        Thread(target=run_flask).start()
-
-        log = logging.getLogger("werkzeug")
-        log.setLevel(logging.ERROR)
-
-
 if __name__ == "__main__":
     # security enabling functionality
     secure = int(
@@ -49,19 +21,23 @@ if __name__ == "__main__":
         secure = True
     else:
         secure = False
-    logger.info(f"Secure capability enabled: {secure}")
+    logger.info("Secure capability enabled: %s", secure)
+
+    # single API server for the lifetime of the app, started once and ready when start() returns
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    api_server = ApiServer()
+    api_server.start()
+    atexit.register(api_server.stop)
+
     # whilst the app is active
     while True:
         # email = input("Please enter your e-mail: \n")
         eshop_controller = EShopController(secure)
-        start_api()
-        # give the API time to start up
-        time.sleep(1)
 
         email = input("Please enter your e-mail:\n")
 
         login_validated = eshop_controller.login(email)
-        logger.info(f"Login for {email} validated: {login_validated}")
+        logger.info("Login for %s validated: %s", email, login_validated)
 
         while True:
             main_choice = int(
@@ -89,39 +65,39 @@ if __name__ == "__main__":
                 if main_choice == 1:
                     if sub_choice == 1:
                         # view own order - all allowed
-                        logger.info(f"Get order functionality requested.")
+                        logger.info("Get order functionality requested.")
                         eshop_controller.get_order()
                         break
                     if sub_choice == 2:
                         # view all orders - only clerk and admin allowed
-                        logger.info(f"Get all orders functionality requested.")
+                        logger.info("Get all orders functionality requested.")
                         eshop_controller.get_all_orders()
                         break
                     if sub_choice == 3:
                         # create order - all allowed
-                        logger.info(f"Create order functionality requested.")
+                        logger.info("Create order functionality requested.")
                         eshop_controller.create_order()
                         break
                     if sub_choice == 4:
                         # delete order - only clerk allowed
-                        logger.info(f"Delete order functionality requested.")
+                        logger.info("Delete order functionality requested.")
                         eshop_controller.delete_order()
                         break
 
                 elif main_choice == 2:
                     # get current account - all allowed
                     if sub_choice == 1:
-                        logger.info(f"Get account functionality requested.")
+                        logger.info("Get account functionality requested.")
                         eshop_controller.get_account()
                         break
                     # get all accounts - only admin allowed
                     if sub_choice == 2:
-                        logger.info(f"Get all accounts functionality requested.")
+                        logger.info("Get all accounts functionality requested.")
                         eshop_controller.get_all_accounts()
                         break
                     # delete account - only admin allowed
                     if sub_choice == 3:
-                        logger.info(f"Delete account functionality requested.")
+                        logger.info("Delete account functionality requested.")
                         eshop_controller.delete_account()
                         break
                     else:
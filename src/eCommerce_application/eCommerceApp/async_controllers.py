@@ -0,0 +1,121 @@
+from async_models import AsyncEShopModel
+from controllers import role_required
+from helper_funcs import get_data
+from http_client import get_api_client
+from record_crypto import lazy_decrypt
+from repositories import get_account_repository
+import asyncio
+import logging
+
+logger = logging.getLogger("EShopApp")
+
+
+class AsyncEShopController:
+    """
+    Async variant of EShopController for serving many concurrent sessions, one controller per session.
+    Takes inputs as arguments and returns results instead of prompting and printing, and applies the same
+    role-based access control, denied calls return None.
+    """
+
+    def __init__(self, secure=True):
+        self.secure = secure
+        self.model = AsyncEShopModel(secure)
+        # local copy of the orders from the API and their ETag
+        self._orders = None
+        self._orders_etag = None
+
+    async def login(self, email, password):
+        """
+        Logs in with an email address and password.
+        :param email: email address
+        :param password: plain text password
+        :return: bool if login successful
+        """
+        validated = await self.model.login(email, password)
+        if validated:
+            logger.info("Successful login with %s", email)
+        return validated
+
+    async def create_order(self, items):
+        """
+        Adds items to an order and places it.
+        :param items: iterable of (item_id, quantity) tuples
+        :return: placed order dict, or None if no items were given
+        """
+        for item_id, quantity in items:
+            await self.model.add_to_order(item_id, quantity)
+        return await self.model.place_order()
+
+    async def search_inventory(self, search_keyword):
+        """
+        Searches the inventory for items to add to an order.
+        :param search_keyword: keyword to search by
+        :return: found items
+        """
+        return await self.model.search_inventory(search_keyword)
+
+    async def get_order(self):
+        """
+        Search for orders associated to current account.
+        :return: list of found orders
+        """
+        return await self.model.search_orders()
+
+    @role_required(["admin", "clerk"])
+    async def get_all_orders(self):
+        """
+        Gets all orders via the API. Only admin and clerk are allowed to do this.
+        The blocking pooled client runs in a worker thread, unchanged orders are revalidated with the ETag.
+        :return: list of orders, or None if the request failed
+        """
+        response = await asyncio.to_thread(get_api_client().get_orders, etag=self._orders_etag)
+        if response.status_code == 304:
+            return self._orders
+        if response.status_code != 200:
+            return None
+        self._orders = response.data
+        self._orders_etag = response.etag
+        return self._orders
+
+    @role_required(["clerk"])
+    async def delete_order(self, order_id):
+        """
+        Deletes an order. Only clerk is allowed to do this.
+        :param order_id: ID of the order
+        :return: bool if the order was deleted
+        """
+        deleted = await self.model.delete_order(order_id)
+        if deleted:
+            logger.info("Order with the ID %s is deleted.", order_id)
+        return deleted
+
+    @role_required(["admin", "clerk"])
+    async def get_all_accounts(self):
+        """
+        View all accounts. Only admins and clerks are allowed this.
+        :return: list of lazily decrypted account views
+        """
+        accounts = await asyncio.to_thread(get_data, "accounts")
+        return lazy_decrypt(accounts)
+
+    @role_required(["admin"])
+    async def delete_account(self, account_id):
+        """
+        Delete an account. Only admins are allowed this.
+        :param account_id: ID of the account
+        :return: bool if the account was deleted
+        """
+        deleted = await asyncio.to_thread(self._delete_account, account_id)
+        if deleted:
+            logger.info("Account with the ID %s is deleted.", account_id)
+        else:
+            logger.warning("No account found with the ID %s.", account_id)
+        return deleted
+
+    @staticmethod
+    def _delete_account(account_id):
+        repository = get_account_repository()
+        if repository.delete_by_id(account_id):
+            repository.save()
+            return True
+        return False
@@ -0,0 +1,157 @@
+from helper_funcs import (
+    generate_account_number,
+    check_email_pattern,
+    check_password_strength,
+    create_address_object,
+    create_jtw,
+)
+from models import EShopModel
+from password_service import get_password_hasher
+from record_crypto import encrypt_record, get_crypto_executor
+from repositories import get_account_repository
+import asyncio
+import datetime
+import logging
+
+logger = logging.getLogger("EShopApp")
+
+
+class AsyncEShopModel:
+    """
+    Async variant of EShopModel for serving many concurrent sessions from one process.
+    Wraps an EShopModel, so state and validation are shared with the interactive application. Inputs are
+    passed as arguments instead of being prompted for, file I/O runs in worker threads, bcrypt on the
+    password service's pool and encryption on the crypto thread pool, so the event loop is never blocked.
+    """
+
+    def __init__(self, secure=True):
+        """
+        :param secure: secure functionality bool
+        """
+        self.secure = secure
+        self.model = EShopModel()
+        self.model.account.secure = secure
+
+    @property
+    def account(self):
+        return self.model.account
+
+    @property
+    def order(self):
+        return self.model.order
+
+    async def login(self, email, password):
+        """
+        Logs in with an email address and password.
+        :param email: email address
+        :param password: plain text password
+        :return: bool if login successful
+        """
+        account = self.model.account
+        if not check_email_pattern(email, secure=self.secure):
+            raise ValueError(f"Invalid email address: {email}")
+        account.email_address = email
+        found = await asyncio.to_thread(account.load_account_details, self.secure, email)
+        logger.info("Account with email %s found: %s", email, found)
+        if not found:
+            return False
+        if self.secure:
+            validated, new_hash = await get_password_hasher().verify_and_rehash_async(
+                password, account.secure_password
+            )
+            if new_hash:
+                await asyncio.to_thread(account.update_password_hash, new_hash)
+        else:
+            validated = account.insecure_password == password
+        if validated:
+            logger.info("Login successful.")
+            login_info = {
+                "user_email": email,
+                "role": account.role,
+                "account_number": account.account_number,
+                "time": str(datetime.datetime.now()),
+            }
+            account.jwt = create_jtw(login_info)
+        return validated
+
+    async def register_account(self, email, password, name, surname, line1, line2, postcode, phone):
+        """
+        Registers and saves a new account.
+        :param email: email address
+        :param password: plain text password, must be strong if secure
+        :return: account number of the new account
+        """
+        account = self.model.account
+        if not check_email_pattern(email, secure=self.secure):
+            raise ValueError(f"Invalid email address: {email}")
+        if not check_password_strength(password, self.secure):
+            raise ValueError("Password does not match the requirements.")
+        if await asyncio.to_thread(get_account_repository().email_exists, email):
+            raise ValueError(f"E-mail already registered: {email}")
+        details = {
+            "name": name,
+            "surname": surname,
+            "address": create_address_object(line1, line2, postcode),
+            "phone": phone,
+        }
+        if self.secure:
+            account.secure_password = await get_password_hasher().hash_async(password)
+            details = await asyncio.get_running_loop().run_in_executor(
+                get_crypto_executor(), encrypt_record, details
+            )
+        else:
+            account.insecure_password = password
+        account.email_address = email
+        account.name = details["name"]
+        account.surname = details["surname"]
+        account.address = details["address"]
+        account.phone = details["phone"]
+        account.account_number = await asyncio.to_thread(generate_account_number)
+        await asyncio.to_thread(account.save_account)
+        logger.info("Account registered.")
+        return account.account_number
+
+    async def search_inventory(self, search_keyword):
+        """
+        Loads and searches inventory for order updating.
+        :return results: found inventory items.
+        """
+        await asyncio.to_thread(self.model.inventory.load_inventory)
+        return self.model.inventory.search_inventory(search_keyword)
+
+    async def search_orders(self):
+        """
+        Search orders based on the logged-in account's account number.
+        :return: list of found orders.
+        """
+        return await asyncio.to_thread(self.model.search_orders)
+
+    async def add_to_order(self, item_id, quantity):
+        """
+        Adds an item to the current order.
+        :param item_id: item id value of item
+        :param quantity: number of items required
+        """
+        await asyncio.to_thread(self.model.add_to_order, item_id, quantity)
+
+    async def place_order(self):
+        """
+        Places the order in progress once it is durably saved.
+        :return: the placed order dict, or None if no items were added
+        """
+        return await asyncio.to_thread(self.model.place_order)
+
+    async def delete_order(self, order_id):
+        """
+        Deletes an order once the deletion is durably saved.
+        :param order_id: ID of the order
+        :return: bool if the order existed
+        """
+        return await asyncio.to_thread(self.model.delete_order, order_id)
+
+    def get_current_order(self):
+        """
+        Gets and returns current order in progress.
+        :return current_order: returns the newly created order.
+        """
+        return self.model.get_current_order()
@@ -0,0 +1,369 @@
+import argparse
+import json
+import logging
+import sys
+import time
+from decimal import InvalidOperation
+from helper_funcs import generate_account_number, generate_order_number
+from journal import record_key
+from models import AccountModel, Item, OrderModel
+from password_service import get_password_hasher
+from record_crypto import decrypt_records, encrypt_records
+from records import to_cents
+from storage import RECORD_KEYS, get_storage_engine
+from validators import validate_accounts
+
+logger = logging.getLogger("EShopApp")
+
+# characters read from the input per chunk
+READ_SIZE = 64 * 1024
+# largest single record accepted, so malformed input cannot make the parser buffer the whole file
+MAX_RECORD_SIZE = 1024 * 1024
+# records validated, hashed, encrypted and written together
+BATCH_SIZE = 500
+# rejected records listed in an import report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_json_records(stream, read_size=READ_SIZE):
+    """
+    Parses records incrementally from a JSON array or from newline delimited JSON (NDJSON).
+    The input is read in chunks and each record is decoded with JSONDecoder.raw_decode as soon as it is
+    complete, so only the current chunk and record are held in memory.
+    :param stream: text file object
+    :param read_size: characters read per chunk
+    :return: iterator of record dicts
+    :raises ValueError: if the input is not a JSON array or NDJSON of objects
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+
+    def read_more():
+        nonlocal buffer, position
+        chunk = stream.read(read_size)
+        if not chunk:
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    def next_character():
+        # skips whitespace, returns the next character or "" at the end of the input
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not read_more():
+                return ""
+
+    in_array = next_character() == "["
+    if in_array:
+        position += 1
+    count = 0
+    while True:
+        character = next_character()
+        if in_array and character == "]":
+            position += 1
+            if next_character():
+                raise ValueError("Unexpected data after the JSON array.")
+            return
+        if in_array and count:
+            if character != ",":
+                raise ValueError(f"Expected ',' after record {count}.")
+            position += 1
+            character = next_character()
+        if not character:
+            if in_array:
+                raise ValueError("Unterminated JSON array.")
+            return
+        while True:
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError as e:
+                # the record may continue in the next chunk
+                if len(buffer) - position > MAX_RECORD_SIZE or not read_more():
+                    raise ValueError(f"Invalid JSON in record {count + 1}: {e}") from None
+        count += 1
+        if not isinstance(record, dict):
+            raise ValueError(f"Record {count} is not a JSON object.")
+        yield record
+
+
+def write_json_records(records, stream, ndjson=False):
+    """
+    Writes records one at a time as a JSON array or as NDJSON.
+    :param records: iterable of record dicts
+    :param stream: text file object
+    :param ndjson: write one record per line instead of a JSON array
+    :return: number of written records
+    """
+    count = 0
+    if not ndjson:
+        stream.write("[")
+    for record in records:
+        if ndjson:
+            stream.write(json.dumps(record) + "\n")
+        else:
+            stream.write((",\n" if count else "\n") + json.dumps(record))
+        count += 1
+    if not ndjson:
+        stream.write("\n]\n" if count else "]\n")
+    return count
+
+
+def _batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _AccountPreparer:
+    """
+    Validates, hashes and encrypts batches of imported accounts.
+    """
+
+    def __init__(self, engine, secure, cipher):
+        self.secure = secure
+        self.cipher = cipher
+        # e-mail address -> account number of the stored and imported accounts
+        self.emails = {
+            account.get("email_address"): record_key(account.get("account_number"))
+            for account in engine.load("accounts")
+        }
+
+    def __call__(self, batch):
+        accounts = []
+        passwords = []
+        errors = []
+        for index, (record, messages) in enumerate(zip(batch, validate_accounts(batch, self.secure))):
+            email = record.get("email_address")
+            owner = self.emails.get(email)
+            number = record_key(record.get("account_number"))
+            if not messages and owner is not None and owner != number:
+                messages = [f"E-mail already registered: {email}"]
+            if messages:
+                errors.append((index, messages))
+                continue
+            account = AccountModel.from_dict(record)
+            account.secure = self.secure
+            if account.account_number in (None, ""):
+                account.account_number = generate_account_number()
+            self.emails[email] = record_key(account.account_number)
+            accounts.append(account)
+            passwords.append(record.get("password"))
+        if self.secure:
+            hashes = iter(
+                get_password_hasher().hash_many(
+                    [password for password in passwords if password is not None]
+                )
+            )
+            for account, password in zip(accounts, passwords):
+                if password is not None:
+                    account.secure_password = next(hashes)
+            # exported accounts hold encrypted fields already, decrypting keeps plain text as it is,
+            # so every field ends up encrypted exactly once
+            records = encrypt_records(
+                decrypt_records([account.to_dict() for account in accounts], self.cipher), self.cipher
+            )
+        else:
+            for account, password in zip(accounts, passwords):
+                if password is not None:
+                    account.insecure_password = password
+            records = [account.to_dict() for account in accounts]
+        return records, errors
+
+
+def _prepare_inventory(batch):
+    items = []
+    errors = []
+    for index, record in enumerate(batch):
+        messages = []
+        if record.get("item_id") in (None, ""):
+            messages.append("Missing item_id.")
+        try:
+            to_cents(record.get("price"))
+        except (InvalidOperation, ValueError, TypeError):
+            messages.append(f"Invalid price: {record.get('price')}")
+        try:
+            if int(record.get("quantity")) < 0:
+                messages.append(f"Invalid quantity: {record.get('quantity')}")
+        except (ValueError, TypeError):
+            messages.append(f"Invalid quantity: {record.get('quantity')}")
+        if messages:
+            errors.append((index, messages))
+        else:
+            items.append(Item.from_dict(record).to_dict())
+    return items, errors
+
+
+def _valid_order_items(order_items):
+    if not isinstance(order_items, list):
+        return False
+    for line in order_items:
+        try:
+            if line.get("item_id") in (None, "") or int(line["quantity"]) <= 0:
+                return False
+        except (AttributeError, KeyError, ValueError, TypeError):
+            return False
+    return True
+
+
+def _prepare_orders(batch):
+    orders = []
+    errors = []
+    for index, record in enumerate(batch):
+        messages = []
+        if record.get("account_number") in (None, ""):
+            messages.append("Missing account_number.")
+        if not _valid_order_items(record.get("order_items", [])):
+            messages.append("Order items need an item_id and a positive quantity.")
+        if messages:
+            errors.append((index, messages))
+            continue
+        order = OrderModel.from_dict(record)
+        if order.order_id in (None, ""):
+            order.order_id = f"{generate_order_number():07d}"
+        orders.append(order.to_dict())
+    return orders, errors
+
+
+def import_records(data_type, stream, secure=True, batch_size=BATCH_SIZE, engine=None, cipher=None):
+    """
+    Streams records of a JSON array or NDJSON input into the shop's storage.
+    Records are parsed incrementally and handled in batches. Account e-mail addresses and passwords are
+    validated with the bulk validators, passwords are hashed in parallel on the password service's
+    worker pool and personal details are encrypted on the crypto thread pool. Each batch is written
+    with one bulk insert on SQLite or one journal append on JSON storage. Data types the JSON storage
+    rewrites as a whole are written once at the end instead. Records with an existing key replace the
+    stored record, so an import can be re-run.
+    :param data_type: accounts, inventory or orders
+    :param stream: text file object holding a JSON array or NDJSON
+    :param secure: validate passwords and encrypt personal details, otherwise stores them as given
+    :param batch_size: records handled together
+    :param engine: StorageEngine to import into, the process-wide engine by default
+    :param cipher: Fernet/MultiFernet cipher for personal details, the keyring's cipher by default
+    :return: dict with the read, imported and rejected counts, the first rejected records with their
+    errors, the elapsed seconds and the records per second
+    """
+    if data_type not in RECORD_KEYS:
+        raise ValueError("No such data exists.")
+    engine = engine or get_storage_engine()
+    if data_type == "accounts":
+        prepare = _AccountPreparer(engine, secure, cipher)
+    elif data_type == "inventory":
+        prepare = _prepare_inventory
+    else:
+        prepare = _prepare_orders
+    streamed = hasattr(engine, "insert_many") or data_type in getattr(engine, "journaled", ())
+    report = {"read": 0, "imported": 0, "rejected": 0, "errors": []}
+    pending = []
+    started = time.perf_counter()
+    for batch in _batches(iter_json_records(stream), batch_size):
+        records, errors = prepare(batch)
+        for index, messages in errors:
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"record": report["read"] + index + 1, "errors": messages})
+        report["read"] += len(batch)
+        report["rejected"] += len(errors)
+        report["imported"] += len(records)
+        if not streamed:
+            pending.extend(records)
+        elif hasattr(engine, "insert_many"):
+            engine.insert_many(data_type, records)
+        elif records:
+            engine.write(data_type, [{"op": "put", "record": record} for record in records])
+    if pending:
+        engine.write(data_type, [{"op": "put", "record": record} for record in pending])
+    engine.compact(data_type)
+    report["seconds"] = time.perf_counter() - started
+    report["records_per_second"] = report["read"] / report["seconds"] if report["seconds"] else 0.0
+    logger.info(
+        "Imported %d of %d %s records in %.2f s (%.0f records/s), %d rejected.",
+        report["imported"],
+        report["read"],
+        data_type,
+        report["seconds"],
+        report["records_per_second"],
+        report["rejected"],
+    )
+    return report
+
+
+def export_records(data_type, stream, ndjson=False, engine=None):
+    """
+    Streams all records of a data type to a JSON array or NDJSON output. Account fields stay encrypted.
+    :param data_type: accounts, inventory or orders
+    :param stream: text file object
+    :param ndjson: write one record per line instead of a JSON array
+    :param engine: StorageEngine to export from, the process-wide engine by default
+    :return: dict with the exported count, the elapsed seconds and the records per second
+    """
+    if data_type not in RECORD_KEYS:
+        raise ValueError("No such data exists.")
+    engine = engine or get_storage_engine()
+    started = time.perf_counter()
+    count = write_json_records(engine.scan(data_type), stream, ndjson)
+    seconds = time.perf_counter() - started
+    report = {
+        "exported": count,
+        "seconds": seconds,
+        "records_per_second": count / seconds if seconds else 0.0,
+    }
+    logger.info(
+        "Exported %d %s records in %.2f s (%.0f records/s).",
+        count,
+        data_type,
+        seconds,
+        report["records_per_second"],
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Streaming bulk import and export of shop data. Run from eCommerceApp/."
+    )
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("data_type", choices=tuple(RECORD_KEYS))
+    parser.add_argument("path", help="JSON array or NDJSON file, - for stdin or stdout")
+    parser.add_argument("--ndjson", action="store_true", help="export one record per line")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="records handled together")
+    parser.add_argument(
+        "--insecure", action="store_true", help="store passwords and personal details as given"
+    )
+    args = parser.parse_args()
+
+    if args.command == "import":
+        source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+        try:
+            result = import_records(args.data_type, source, not args.insecure, args.batch_size)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        for error in result["errors"]:
+            print(f"record {error['record']}: {' '.join(error['errors'])}", file=sys.stderr)
+        print(
+            f"{args.data_type}: {result['imported']} of {result['read']} records imported,"
+            f" {result['rejected']} rejected, {result['records_per_second']:.0f} records/s"
+        )
+    else:
+        target = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8")
+        try:
+            result = export_records(args.data_type, target, args.ndjson)
+        finally:
+            if target is not sys.stdout:
+                target.close()
+        print(
+            f"{args.data_type}: {result['exported']} records exported,"
+            f" {result['records_per_second']:.0f} records/s",
+            file=sys.stderr,
+        )
@@ -1,21 +1,70 @@
 from models import EShopModel
 from views import EShopView
 from functools import wraps
+import inspect
 from helper_funcs import get_data
-import requests
+from http_client import get_api_client
+from metrics import increment, timed
+from record_crypto import lazy_decrypt
+from repositories import get_account_repository
+from tokens import get_token_verifier
 import logging
 
 logger = logging.getLogger("EShopApp")
 
 
+def role_required(roles):
+    """
+    Custom Python decorator to implement Role-based Access Control.
+    Decorates certain functions and fetches loaded account role.
+    Once logged in, the role is taken from the verified claims of the account's JSON web token, so an
+    expired or forged token is denied. Without a token the loaded account role is used.
+    Coroutine functions are wrapped in a coroutine, so the async controller shares the same checks.
+    Source: https://medium.com/@subhamx/role-based-access-control-in-django-the-right-features-to-the-right-users-9e93feb8a3b1
+    :return:
+    """
+    def allowed(self, func):
+        token = self.model.account.jwt
+        role = get_token_verifier().role(token) if token else self.model.account.role
+        if role in roles:
+            return True
+        print("You're not allowed to do this!")
+        logger.error("Unauthorised access to %s", func)
+        return False
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                if allowed(self, func):
+                    return await func(self, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if allowed(self, func):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 class EShopController:
     """
     Controller to implement EShop capabilities and manage interactions between Model(s) and View.
     """
+    # kept as a class attribute for code decorating with EShopController.role_required
+    role_required = staticmethod(role_required)
+
     def __init__(self, secure):
         self.model = EShopModel()
         self.view = EShopView()
         self.secure = secure
+        # local copy of the orders from the API and their ETag
+        self._orders = None
+        self._orders_etag = None
 
     def login(self, email):
         """
@@ -27,29 +76,9 @@ class EShopController:
         while True:
             login_validated = self.model.login(self.secure)
             if login_validated:
-                logger.info(f"Successful login with {email}")
+                logger.info("Successful login with %s", email)
                 break
 
-    def role_required(roles):
-        """
-        Custom Python decorator to implement Role-based Access Control.
-        Decorates certain functions and fetches loaded account role.
-        Source: https://medium.com/@subhamx/role-based-access-control-in-django-the-right-features-to-the-right-users-9e93feb8a3b1
-        :return:
-        """
-        def decorator(func):
-            @wraps(func)
-            def wrapper(self, *args, **kwargs):
-                if self.model.account.role in roles:
-                    return func(self, *args, **kwargs)
-                else:
-                    print("You're not allowed to do this!")
-                    logger.error(f"Unauthorised access to {func}")
-
-            return wrapper
-
-        return decorator
-
     def create_order(self):
         """
         Enables user to search for items to add to order and creates an order based on user inputs of item IDs.
@@ -66,7 +95,11 @@ class EShopController:
             while results:
                 item_id = str(input("Enter item ID of item to add to cart."))
                 quantity = int(input("Enter quantity of items required."))
-                self.model.add_to_order(item_id, quantity)
+                try:
+                    self.model.add_to_order(item_id, quantity)
+                except ValueError:
+                    print("No item found with this ID.")
+                    continue
                 current_order = self.model.get_current_order()
                 self.view.list_order(current_order)
                 more = int(input("Any more to add? [1] YES [2] NO"))
@@ -74,6 +107,10 @@ class EShopController:
                     pass
                 else:
                     break
+            # saves the order once all items are added
+            placed_order = self.model.place_order()
+            if placed_order:
+                logger.info("Order %s created.", placed_order["order_id"])
             break
 
     def get_order(self):
@@ -84,15 +121,30 @@ class EShopController:
         self.view.list_order(order)
 
     @role_required(["admin", "clerk"])
+    @timed("get_all_orders")
     def get_all_orders(self):
         """
         Gets all orders via an API request. Only admin and clerk are allowed to do this.
+        The last received orders are kept with their ETag, so unchanged orders are not sent again.
         """
-        response = requests.get("http://localhost:8000/api/orders", timeout=10)
-        if response.status_code == 200:
-            self.view.list_all_orders(response)
-            return response.json()
-        return None
+        orders = self._fetch_orders()
+        if orders is None:
+            return None
+        self.view.list_all_orders(orders)
+        return orders
+
+    @timed("fetch_orders")
+    def _fetch_orders(self):
+        # pooled client, answers in-process without HTTP when the API server runs in this process
+        response = get_api_client().get_orders(etag=self._orders_etag)
+        if response.status_code == 304:
+            increment("orders_not_modified")
+            return self._orders
+        if response.status_code != 200:
+            return None
+        self._orders = response.data
+        self._orders_etag = response.etag
+        return self._orders
 
     @role_required(["clerk"])
     def delete_order(self):
@@ -100,15 +152,14 @@ class EShopController:
         Deletes an order. Only clerk is allowed to do this.
         :return:
         """
-        orders = get_data("orders")
+        orders = self._fetch_orders() or []
         self.view.list_all_orders(orders)
         order_id = str(input("Enter order ID of order for deletion."))
-        for i, d in enumerate(orders):
-            if d.get("order_id") == order_id:
-                # pop order from list based on index
-                orders.pop(i)
-                break
-        logger.info(f"Order with the ID {order_id} is deleted.")
+        # the deletion is saved to the order log before returning
+        if self.model.delete_order(order_id):
+            logger.info("Order with the ID %s is deleted.", order_id)
+        else:
+            print("No order found with this ID.")
         self.get_all_orders()
 
     def get_account(self):
@@ -122,21 +173,22 @@ class EShopController:
     def get_all_accounts(self):
         """
         View all accounts. Only admins and clerks are allowed this.
+        Personal details are only decrypted for the fields shown in the listing.
         """
         accounts = get_data("accounts")
-        self.view.list_accounts(accounts)
+        self.view.list_accounts(lazy_decrypt(accounts))
 
     @role_required(["admin"])
     def delete_account(self):
         """
         Delete an account. Only admins are allowed this.
         """
-        accounts = get_data("accounts")
+        repository = get_account_repository()
         account_id = str(input("Enter account ID of order for deletion."))
-        for i, d in enumerate(accounts):
-            if d.get("account_id") == account_id:
-                # pop account from list based on index
-                accounts.pop(i)
-                break
-        logger.info(f"Account with the ID {account_id} is deleted.")
+        # removes the account from the index and writes the remaining accounts back
+        if repository.delete_by_id(account_id):
+            repository.save()
+            logger.info("Account with the ID %s is deleted.", account_id)
+        else:
+            print("No account found with this ID.")
         self.get_all_accounts()
@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("EShopApp")
+
+
+def load_json(path):
+    """
+    Default loader for the data store, parses a whole JSON file.
+    :param path: path of the JSON file
+    :return: parsed JSON content
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def file_signature(paths):
+    """
+    Builds a change signature for a set of files from their mtime, size and inode.
+    Missing files are recorded as None so that creating them counts as a change.
+    :param paths: iterable of file paths
+    :return: tuple signature
+    """
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+    return tuple(signature)
+
+
+class DataStore:
+    """
+    Process-wide cache of parsed data files.
+    Each file is parsed once and the same object is handed out on every subsequent call until the
+    file's mtime, size or inode changes. The number of cached files is bounded by an LRU limit.
+    Handed out data is shared between callers and must be treated as read-only, callers that need to
+    modify it should take a copy first.
+    """
+
+    def __init__(self, max_entries=8):
+        """
+        Initialises an empty cache.
+        :param max_entries: maximum number of parsed files held in memory
+        """
+        self.max_entries = max_entries
+        # path -> (signature, data)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, path, loader=load_json, watch=None):
+        """
+        Returns the parsed content of a file, loading it only if it is not cached or has changed on disk.
+        :param path: cache key and default file to watch
+        :param loader: callable receiving the path and returning the parsed data
+        :param watch: files whose changes invalidate the entry, defaults to the path itself
+        :return: cached parsed data
+        """
+        watch = watch or (path,)
+        signature = file_signature(watch)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                self._entries.move_to_end(path)
+                return entry[1]
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+                logger.debug("Data file %s changed on disk, reloading.", path)
+            data = loader(path)
+            self._store(path, signature, data)
+            return data
+
+    def update(self, path, data, watch=None, expected=None, signature=None):
+        """
+        Replaces the cached content of a file after the application wrote it itself,
+        so that the next read does not parse the file again.
+        :param path: cache key and default file to watch
+        :param data: data that was just written
+        :param watch: files whose changes invalidate the entry, defaults to the path itself
+        :param expected: signature the cached entry must have had before the write, if it differs
+        the files were changed by someone else as well and the entry is dropped instead
+        :param signature: signature of the watched files right after the write, taken while the writer
+        still held its file lock, read now if None
+        :return: bool if the cached entry was replaced
+        """
+        if signature is None:
+            signature = file_signature(watch or (path,))
+        with self._lock:
+            entry = self._entries.get(path)
+            if expected is not None and (entry is None or entry[0] != expected):
+                self._entries.pop(path, None)
+                return False
+            self._store(path, signature, data)
+            return True
+
+    def invalidate(self, path=None):
+        """
+        Drops a single cached file, or every cached file if no path is given.
+        :param path: cache key to drop
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self):
+        """
+        Returns cache counters, e.g. to confirm that a code path no longer reads from disk.
+        :return: dict of hits, misses, reloads and number of cached entries
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "entries": len(self._entries),
+            }
+
+    def reset_stats(self):
+        """
+        Resets the hit/miss/reload counters.
+        """
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.reloads = 0
+
+    def _store(self, path, signature, data):
+        self._entries[path] = (signature, data)
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            logger.debug("Evicted %s from the data store.", evicted)
+
+
+# shared instance used by helper_funcs.get_data
+data_store = DataStore()
@@ -1,8 +1,11 @@
-import json
-import re
 import getpass
-import jwt
 import logging
+from id_allocator import IdAllocator
+from metrics import timed
+from secret_keys import get_keyring
+from storage import get_storage_engine
+from tokens import issue_token
+from validators import is_strong_password, is_valid_email, is_valid_email_insecure
 
 logger = logging.getLogger("EShopApp")
 
@@ -10,11 +13,10 @@ logger = logging.getLogger("EShopApp")
 def create_jtw(login_activity):
     """
     Creates JSON web token based on login activities to ensure uniqueness.
-    :param login_activity: dict containing login name, date and role.
+    The token carries issued-at, not-before and expiry claims, see tokens.issue_token.
+    :param login_activity: dict containing login name, account number, date and role.
     """
-    return jwt.encode(
-        login_activity, get_secret_key("jwt_secret_key"), algorithm="HS256"
-    )
+    return issue_token(login_activity)
 
 
 def validate_email(email_address, debug=False):
@@ -23,46 +25,20 @@ def validate_email(email_address, debug=False):
     :param email_address: inputted email address
     :param debug: debugging flag for testing
     """
-    if debug is False:
-        file = "data/accounts.json"
-    else:
-        file = "tests/test_data/test_accounts.json"
+    # imported here as the repository itself loads its data through this module
+    from repositories import get_account_repository
 
-    with open(file) as f:
-        d = json.load(f)
-        if not any(account["email"] == email_address for account in d):
-            return False
-        else:
-            return True
+    return get_account_repository(debug).email_exists(email_address)
 
 
 def check_password_strength(password, secure):
     """
-    Checks if password matches required strength attributes.
+    Checks if password matches required strength attributes, see validators.is_strong_password.
     :param password: inputted password
     :param secure: secure flag to bypass strength checks
     """
-    pass_length = 8
-    upper_pattern = r"[A-Z]"
-    lower_pattern = r"[a-z]"
-    char_pattern = r"@|!|\$|&|\."
-    digit_pattern = r"\d"
-
     if secure:
-        upper_match = re.search(upper_pattern, password)
-        lower_match = re.search(lower_pattern, password)
-        char_match = re.search(char_pattern, password)
-        digit_match = re.search(digit_pattern, password)
-        if (
-            upper_match
-            and lower_match
-            and char_match
-            and len(password) >= pass_length
-            and digit_match
-        ):
-            return True
-        else:
-            return False
+        return is_strong_password(password)
     else:
         return True
 
@@ -70,21 +46,17 @@ def check_password_strength(password, secure):
 def check_email_pattern(email, secure):
     """
     Checks if email matches an expected pattern.
-    Regex source for safe pattern: GeeksForGeeks https://www.geeksforgeeks.org/check-if-email-address-valid-or-not-in-python/
-    Regex source for evil pattern: DZone https://dzone.com/articles/regular-expressions-denial
+    The secure check scans the address in linear time, the insecure one uses the backtracking pattern,
+    see the validators module for both.
     :param email: email address string
     :param secure: secure bool
     :return: boolean if pattern valid or not
     """
-    if secure:
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    else:
-        pattern = r"^([0-9a-za-z]([-.\w]*[0-9a-za-z])*@([0-9a-za-z][-\w]*[0-9a-za-z]\.)+[a-za-z]{2,9})$"
     # validates entered e-mail address structure
-    if re.fullmatch(pattern, email):
-        return True
+    if secure:
+        return is_valid_email(email)
     else:
-        return False
+        return is_valid_email_insecure(email)
 
 
 def request_new_password(message, secure):
@@ -119,73 +91,61 @@ def get_secret_key(key_type, debug=False):
     """
     Fetches secret keys for activities.
     In normal circumstances, these would be stored in a highly secured environment.
+    Keys are served from the in-memory keyring, which reloads them when the keys file changes.
     :param debug: debug value for testing
     :param key_type: type of key required (jwt or encryption)
     :return key: returns key for encoding/decoding activities
     """
-    if not debug:
-        f = open("no_secrets_here/keys.json")
-        data = json.load(f)
-        key = data[0].get(key_type)
-        f.close()
-    else:
-        f = open("tests/test_data/test_keys.json")
-        data = json.load(f)
-        key = data[0].get(key_type)
-        f.close()
-    return key
+    return get_keyring(debug).get(key_type)
 
 
+@timed("get_data")
 def get_data(data_type, debug=False):
     """
     Loads accounts from json file.
+    Data is loaded through the configured storage engine, which parses it once and serves it from
+    memory until it changes. The returned list is shared, so it must be copied before being modified.
     :param data_type: type of data required to be loaded
     :param debug: debug flag for testing
     :return dicts: read list of dicts for further data processing
     """
-    if data_type == "accounts":
-        if debug is False:
-            file = "data/accounts.json"
-        else:
-            file = "tests/test_data/test_accounts.json"
-    elif data_type == "inventory":
-        if debug is False:
-            file = "data/inventory.json"
-        else:
-            file = "test_inventory.json"
-    elif data_type == "orders":
-        if debug is False:
-            file = "data/orders.json"
-        else:
-            file = "test_orders.json"
-    else:
-        raise ValueError("No such data exists.")
+    return get_storage_engine(debug).load(data_type)
+
+
+def max_record_number(data_type, key_field):
+    """
+    Finds the highest numeric key of a type of data, used to recover the ID allocators' high-water marks.
+    :param data_type: type of data
+    :param key_field: numeric key field of the records
+    :return: highest key, 0 if there is no data
+    """
+    return max((int(record[key_field]) for record in get_data(data_type)), default=0)
+
 
-    with open(file) as f:
-        dicts = json.load(f)
-        return dicts
+account_number_allocator = IdAllocator(
+    "data/account_number.hwm", lambda: max_record_number("accounts", "account_number")
+)
+order_number_allocator = IdAllocator(
+    "data/order_number.hwm", lambda: max_record_number("orders", "order_id")
+)
 
 
 def generate_account_number():
     """
     Generates an account number for a given Account instance.
-    Checks for latest account number and adds +1 to increase value.
+    Numbers come from a block allocator continuing after the latest account number.
     :return: new updated account number
     """
-    accounts = get_data("accounts")
-    new_account_number = max(int(account["account_number"]) for account in accounts) + 1
-    return new_account_number
+    return account_number_allocator.next_id()
 
 
 def generate_order_number():
     """
     Generates an order number for a given Order instance.
-    Checks for latest order number and adds +1 to increase value.
+    Numbers come from a block allocator continuing after the latest order number.
     :return: new updated order number
     """
-    orders = get_data("orders")
-    new_order_number = max(int(order["order_id"]) for order in orders) + 1
-    return new_order_number
+    return order_number_allocator.next_id()
 
 
 def load_brute_passwords():
@@ -0,0 +1,159 @@
+import logging
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import api_server
+from helper_funcs import get_data
+from orders_api import OrderQuery, query_orders
+from response_cache import ResponseCache, strong_etag
+from storage import get_storage_engine
+
+logger = logging.getLogger("EShopApp")
+
+# (connect, read) timeouts in seconds per endpoint
+DEFAULT_TIMEOUTS = {"/api/orders": (3.05, 10)}
+FALLBACK_TIMEOUT = (3.05, 10)
+
+
+class ApiResponse:
+    """
+    Result of an API call: status code, decoded data and ETag.
+    """
+
+    def __init__(self, status_code, data=None, etag=None):
+        self.status_code = status_code
+        self.data = data
+        self.etag = etag
+
+
+class ApiClient:
+    """
+    Shared client for the shop API.
+    Keeps connections alive in a pool, retries idempotent requests with exponential backoff, applies
+    per-endpoint timeouts and asks for gzip compressed responses, which are decoded transparently.
+    When the API server runs in the same process, requests are answered directly from the data layer
+    without HTTP and without encoding and decoding JSON. These answers are cached per data version and
+    carry an ETag as well, so conditional requests get 304 Not Modified on both paths.
+    """
+
+    def __init__(
+        self,
+        base_url="http://localhost:8000",
+        retries=3,
+        backoff_factor=0.2,
+        pool_maxsize=10,
+        timeouts=None,
+        in_process=True,
+    ):
+        """
+        :param base_url: URL of the API server
+        :param retries: number of retries of failed GET requests
+        :param backoff_factor: base of the exponential backoff between retries in seconds
+        :param pool_maxsize: maximum number of kept-alive connections
+        :param timeouts: dict of endpoint path to (connect, read) timeouts, merged with the defaults
+        :param in_process: answer requests directly if the API server runs in this process
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.in_process = in_process
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip"
+        self._responses = ResponseCache()
+
+    def get(self, path, params=None, etag=None):
+        """
+        Sends a GET request, conditional if an ETag is given.
+        :param path: endpoint path, e.g. /api/orders
+        :param params: query string parameters
+        :param etag: ETag of the copy the caller holds
+        :return: ApiResponse, with data None on 304 Not Modified and the error message on 400 Bad Request
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.session.get(
+            self.base_url + path,
+            params=params,
+            headers=headers,
+            timeout=self.timeouts.get(path, FALLBACK_TIMEOUT),
+        )
+        data = None
+        if response.status_code in (200, 400):
+            data = response.json()
+        return ApiResponse(response.status_code, data, response.headers.get("ETag"))
+
+    def get_orders(self, etag=None, **params):
+        """
+        Fetches orders, see the /api/orders endpoint for the supported parameters.
+        :param etag: ETag of the orders the caller holds
+        :param params: filter, projection and pagination parameters
+        :return: ApiResponse
+        """
+        if self._local_server() is not None:
+            return self._get_orders_in_process(params, etag)
+        return self.get("/api/orders", params=params, etag=etag)
+
+    def close(self):
+        """
+        Closes the kept-alive connections.
+        """
+        self.session.close()
+
+    def _get_orders_in_process(self, params, etag):
+        args = {key: str(value) for key, value in params.items()}
+        try:
+            query = OrderQuery.from_args(args)
+        except ValueError as e:
+            # the same 400 Bad Request the endpoint answers over HTTP
+            return ApiResponse(400, {"error": str(e)})
+        version = get_storage_engine().version("orders")
+        key = tuple(sorted(args.items()))
+        # versions are comparable within the process, so they identify the data without serialising it
+        current, orders = self._responses.get_or_render(
+            "orders",
+            version,
+            key,
+            lambda: query_orders(get_data("orders"), query),
+            etag=strong_etag(repr((version, key)).encode("utf-8")),
+        )
+        if etag == current:
+            return ApiResponse(304, None, current)
+        return ApiResponse(200, orders, current)
+
+    def _local_server(self):
+        if not self.in_process:
+            return None
+        server = api_server.get_running_server()
+        url = urlparse(self.base_url)
+        if (
+            server is not None
+            and server.port == url.port
+            and url.hostname in ("localhost", "127.0.0.1", server.host)
+        ):
+            return server
+        return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_api_client():
+    """
+    Returns the process-wide API client.
+    :return: ApiClient instance
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient()
+        return _client
@@ -0,0 +1,220 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+from data_store import file_signature
+from locks import FileLock
+
+logger = logging.getLogger("EShopApp")
+
+
+def record_key(value):
+    """
+    Normalises record keys so zero-padded strings and integers refer to the same record.
+    :param value: key value as string or int
+    :return: normalised string key
+    """
+    try:
+        return str(int(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def write_json_atomic(path, data, indent=2):
+    """
+    Writes JSON to a temporary file in the same directory, fsyncs it and renames it over the target,
+    so readers see either the old or the new file but never a partially written one.
+    :param path: target file
+    :param data: JSON serialisable data
+    :param indent: indentation used for the snapshot files
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(data, indent=indent))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def apply_entries(records, entries, key_field):
+    """
+    Applies put/delete entries to a list of records, keeping the order of existing records.
+    :param records: list of record dicts
+    :param entries: list of {"op": "put", "record": ...} or {"op": "delete", "key": ...} dicts
+    :param key_field: record field identifying a record
+    :return: new list of records
+    """
+    if not entries:
+        return records
+    merged = {}
+    for position, record in enumerate(records):
+        if record.get(key_field) in (None, ""):
+            merged[("unkeyed", position)] = record
+        else:
+            merged[record_key(record[key_field])] = record
+    for entry in entries:
+        if entry["op"] == "put":
+            record = entry["record"]
+            merged[record_key(record[key_field])] = record
+        elif entry["op"] == "delete":
+            merged.pop(record_key(entry["key"]), None)
+    return list(merged.values())
+
+
+class RecordJournal:
+    """
+    Append-only JSON-lines journal in front of a JSON snapshot file.
+    Every change is appended as one line ({"op": "put", "record": ...} or {"op": "delete", "key": ...}),
+    so saving a record no longer rewrites the whole data file. Appends are fsync'd in batches and the
+    journal is periodically compacted into the snapshot. Replaying is idempotent, as puts replace the
+    record with the same key and deletes of missing records are ignored.
+    """
+
+    def __init__(self, snapshot_path, key_field, fsync_every=16, compact_every=1000):
+        """
+        :param snapshot_path: JSON list file holding the compacted records
+        :param key_field: record field identifying a record
+        :param fsync_every: number of appended entries after which the journal is fsync'd
+        :param compact_every: number of journal entries after which compaction is due
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".jsonl"
+        self.key_field = key_field
+        self.fsync_every = fsync_every
+        self.compact_every = compact_every
+        self.files = (self.snapshot_path, self.journal_path)
+        self._file_lock = FileLock(self.journal_path + ".lock")
+        self._lock = threading.Lock()
+        self._fd = None
+        self._unsynced = 0
+        self._entries = None
+        atexit.register(self.sync)
+
+    def load(self, path=None):
+        """
+        Loads the snapshot and replays the journal on top of it.
+        Accepts the path argument so it can be used as a data store loader.
+        :return: merged list of records
+        """
+        with open(self.snapshot_path) as f:
+            records = json.load(f)
+        entries = self._read_entries()
+        self._entries = len(entries)
+        return self.replay(records, entries)
+
+    def replay(self, records, entries):
+        """
+        Applies journal entries to a list of records.
+        :param records: snapshot records
+        :param entries: journal entries
+        :return: list of merged records
+        """
+        return apply_entries(records, entries, self.key_field)
+
+    def put(self, record):
+        """
+        Appends an insert or update of a record.
+        :param record: record dict holding the key field
+        """
+        self._append([{"op": "put", "record": record}])
+
+    def delete(self, key):
+        """
+        Appends a deletion of a record.
+        :param key: key of the deleted record
+        """
+        self._append([{"op": "delete", "key": key}])
+
+    def append_entries(self, entries, fsync=False):
+        """
+        Appends several entries with a single write.
+        :param entries: list of journal entry dicts
+        :param fsync: fsync the journal before returning, so the entries are durable
+        :return: tuple of the signatures of the snapshot and journal files just before and just after the
+        write, both taken under the journal lock
+        """
+        return self._append(entries, fsync)
+
+    def needs_compaction(self):
+        """
+        :return: bool if the journal has grown beyond the compaction threshold
+        """
+        return self._entries is not None and self._entries >= self.compact_every
+
+    def compact(self):
+        """
+        Replays the journal into a new snapshot and truncates the journal.
+        Runs under the journal lock and re-reads both files, so entries appended by other
+        processes since this process last loaded the data are not lost.
+        :return: tuple of the merged list of records written to the snapshot and the signature of the
+        snapshot and journal files right after the compaction, taken under the journal lock
+        """
+        with self._lock, self._file_lock:
+            records = self.load()
+            write_json_atomic(self.snapshot_path, records)
+            self._close()
+            with open(self.journal_path, "w") as f:
+                os.fsync(f.fileno())
+            self._entries = 0
+            self._unsynced = 0
+            signature = file_signature(self.files)
+        logger.info("Compacted %s into %s.", self.journal_path, self.snapshot_path)
+        return records, signature
+
+    def sync(self):
+        """
+        Fsyncs appended entries that have not been flushed to disk yet.
+        """
+        with self._lock:
+            if self._fd is not None and self._unsynced:
+                os.fsync(self._fd)
+                self._unsynced = 0
+
+    def _append(self, entries, fsync=False):
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+        with self._lock, self._file_lock:
+            before = file_signature(self.files)
+            if self._fd is None:
+                self._fd = os.open(
+                    self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+                )
+            os.write(self._fd, data)
+            self._unsynced += len(entries)
+            if self._entries is not None:
+                self._entries += len(entries)
+            if fsync or self._unsynced >= self.fsync_every:
+                os.fsync(self._fd)
+                self._unsynced = 0
+            after = file_signature(self.files)
+        return before, after
+
+    def _close(self):
+        if self._fd is not None:
+            if self._unsynced:
+                os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def _read_entries(self):
+        entries = []
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # torn write at the end of the journal from an interrupted process
+                        logger.warning("Skipping unreadable entry in %s.", self.journal_path)
+        except FileNotFoundError:
+            pass
+        return entries
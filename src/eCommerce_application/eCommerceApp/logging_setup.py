@@ -0,0 +1,202 @@
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+
+# attributes every LogRecord has, anything else was passed through extra= and is logged as a field
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.NOTSET, "", 0, "", (), None)).keys() | {"message", "asctime"}
+)
+
+_listener = None
+_queue_handler = None
+# filename, max_bytes, backup_count and when of the log file, for the files of forked workers
+_file_settings = None
+_listener_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line with the timestamp, level, logger, message and
+    source location, plus the fields passed through extra= and the formatted exception if any.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps one in every rate DEBUG records per message template, so high-volume debug events cannot
+    flood the queue and the log file. Records of INFO and above always pass.
+    """
+
+    def __init__(self, rate=1):
+        """
+        :param rate: keep every rate-th debug record of a message, 1 keeps all
+        """
+        super().__init__()
+        self.rate = max(1, int(rate))
+        self._counts = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        key = (record.name, record.msg)
+        # unsynchronised on purpose, a lost increment only shifts which record is sampled
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        return count % self.rate == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that enqueues records as they are instead of formatting them first, so the message
+    is merged with its arguments and written to disk on the listener thread, not the request thread.
+    Log arguments are therefore rendered later and should not be mutated after the call.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def create_file_handler(filename, max_bytes=10 * 1024 * 1024, backup_count=5, when=None):
+    """
+    Creates a rotating log file handler.
+    :param filename: log file
+    :param max_bytes: size at which the file is rotated, used when no time interval is given
+    :param backup_count: number of rotated files kept
+    :param when: rotation interval of TimedRotatingFileHandler, e.g. "midnight", size based if None
+    :return: logging.Handler instance
+    """
+    if when:
+        return TimedRotatingFileHandler(
+            filename, when=when, backupCount=backup_count, encoding="utf-8"
+        )
+    return RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+
+
+def configure_logging(
+    filename="app.log",
+    level=logging.DEBUG,
+    json_format=True,
+    max_bytes=10 * 1024 * 1024,
+    backup_count=5,
+    when=None,
+    debug_sample_rate=None,
+):
+    """
+    Routes all logging through a queue to a background listener thread writing a rotating log file,
+    so logging calls on the login, search and order paths only enqueue the record.
+    Replaces a previous configure_logging call, handlers installed by others, e.g. a test runner's, are
+    kept. The listener is stopped when the process exits, and forked worker processes write to a log
+    file of their own, e.g. app.<pid>.log. The sampling rate of debug records can be set with the
+    ESHOP_LOG_DEBUG_SAMPLE environment variable and the rotation interval with ESHOP_LOG_ROTATE_WHEN.
+    :param filename: log file
+    :param level: level of the root logger
+    :param json_format: write JSON lines, otherwise the plain "LEVEL:logger:message" format
+    :param max_bytes: size at which the file is rotated
+    :param backup_count: number of rotated files kept
+    :param when: time based rotation interval, e.g. "midnight", size based rotation if None
+    :param debug_sample_rate: keep every n-th debug record of a message, 1 keeps all
+    :return: the started QueueListener
+    """
+    global _listener, _queue_handler, _file_settings
+    when = when or os.environ.get("ESHOP_LOG_ROTATE_WHEN") or None
+    if debug_sample_rate is None:
+        debug_sample_rate = int(os.environ.get("ESHOP_LOG_DEBUG_SAMPLE", "1"))
+    handler = create_file_handler(filename, max_bytes, backup_count, when)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(logging.BASIC_FORMAT))
+    records = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.addFilter(DebugSampler(debug_sample_rate))
+
+    with _listener_lock:
+        if _listener is not None:
+            _stop_listener()
+        root = logging.getLogger()
+        if _queue_handler is not None:
+            root.removeHandler(_queue_handler)
+            _queue_handler.close()
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+        _queue_handler = queue_handler
+        _file_settings = (filename, max_bytes, backup_count, when)
+        _listener = QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """
+    Writes the queued records, stops the listener thread and closes the log file.
+    """
+    with _listener_lock:
+        _stop_listener()
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _worker_filename(filename, pid):
+    root, extension = os.path.splitext(filename)
+    return f"{root}.{pid}{extension}"
+
+
+def _restart_after_fork():
+    # the listener thread does not survive a fork, pre-forked workers start their own. Workers also
+    # write to a file of their own, e.g. app.<pid>.log, as rotating the parent's file independently of
+    # each other would lose records.
+    global _listener, _listener_lock
+    _listener_lock = threading.Lock()
+    if _listener is not None:
+        filename, max_bytes, backup_count, when = _file_settings
+        inherited = _listener.handlers[0]
+        handler = create_file_handler(_worker_filename(filename, os.getpid()), max_bytes, backup_count, when)
+        handler.setFormatter(inherited.formatter)
+        inherited.close()
+        records = queue.SimpleQueue()
+        _queue_handler.queue = records
+        _listener = QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,236 @@
+import contextlib
+import inspect
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+# quantiles reported per operation
+QUANTILES = (0.5, 0.95, 0.99)
+# latest samples per operation the quantiles are computed from
+WINDOW = 2048
+
+_enabled = os.environ.get("ESHOP_METRICS", "").lower() in ("1", "true", "yes", "on")
+_NOOP = contextlib.nullcontext()
+
+
+class Histogram:
+    """
+    Latency distribution of one operation. The total count and sum cover every observation, the
+    quantiles are computed from a ring buffer of the latest observations, so memory stays bounded.
+    """
+
+    def __init__(self, window=WINDOW):
+        """
+        :param window: number of latest observations kept for the quantiles
+        """
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self._window = window
+        self._samples = []
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, failed=False):
+        """
+        Records one observation.
+        :param seconds: duration of the operation
+        :param failed: the operation raised an exception
+        """
+        with self._lock:
+            if len(self._samples) < self._window:
+                self._samples.append(seconds)
+            else:
+                self._samples[self.count % self._window] = seconds
+            self.count += 1
+            self.sum += seconds
+            if failed:
+                self.errors += 1
+
+    def quantiles(self, quantiles=QUANTILES):
+        """
+        :param quantiles: quantiles between 0 and 1
+        :return: dict of quantile to seconds (nearest rank), empty if nothing was observed
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {}
+        return {
+            quantile: samples[max(0, math.ceil(quantile * len(samples)) - 1)] for quantile in quantiles
+        }
+
+
+class MetricsRegistry:
+    """
+    Counters and per-operation latency histograms of the shop.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, operation):
+        """
+        :param operation: operation name
+        :return: Histogram of the operation, created on first use
+        """
+        histogram = self._histograms.get(operation)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(operation, Histogram())
+        return histogram
+
+    def increment(self, counter, amount=1):
+        """
+        Adds to a counter.
+        :param counter: counter name
+        :param amount: amount to add
+        """
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def snapshot(self):
+        """
+        :return: dict with the counters and, per operation, count, sum, errors and quantiles
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "counters": counters,
+            "operations": {
+                operation: {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "errors": histogram.errors,
+                    "quantiles": histogram.quantiles(),
+                }
+                for operation, histogram in histograms.items()
+            },
+        }
+
+    def render_prometheus(self):
+        """
+        Renders the metrics in the Prometheus text exposition format, latencies as a summary.
+        :return: text of the metrics
+        """
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot["operations"]:
+            lines.append("# HELP eshop_operation_duration_seconds Duration of shop operations.")
+            lines.append("# TYPE eshop_operation_duration_seconds summary")
+            for operation, stats in sorted(snapshot["operations"].items()):
+                label = f'operation="{operation}"'
+                for quantile, seconds in stats["quantiles"].items():
+                    lines.append(
+                        f'eshop_operation_duration_seconds{{{label},quantile="{quantile}"}} {seconds!r}'
+                    )
+                lines.append(f"eshop_operation_duration_seconds_sum{{{label}}} {stats['sum']!r}")
+                lines.append(f"eshop_operation_duration_seconds_count{{{label}}} {stats['count']}")
+            lines.append("# HELP eshop_operation_errors_total Shop operations that raised an exception.")
+            lines.append("# TYPE eshop_operation_errors_total counter")
+            for operation, stats in sorted(snapshot["operations"].items()):
+                lines.append(f'eshop_operation_errors_total{{operation="{operation}"}} {stats["errors"]}')
+        for counter, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE eshop_{counter}_total counter")
+            lines.append(f"eshop_{counter}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Drops all recorded metrics.
+        """
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+
+registry = MetricsRegistry()
+
+
+def enable(enabled=True):
+    """
+    Switches recording on or off, it is on if the ESHOP_METRICS environment variable is set to 1.
+    :param enabled: bool if metrics are recorded
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    """
+    :return: bool if metrics are recorded
+    """
+    return _enabled
+
+
+def increment(counter, amount=1):
+    """
+    Adds to a counter if metrics are enabled.
+    :param counter: counter name, exposed as eshop_<counter>_total
+    :param amount: amount to add
+    """
+    if _enabled:
+        registry.increment(counter, amount)
+
+
+@contextlib.contextmanager
+def _timing(operation):
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        registry.histogram(operation).observe(time.perf_counter() - started, failed)
+
+
+def timer(operation):
+    """
+    Context manager timing a block of code as an operation. A shared no-op context is returned while
+    metrics are disabled.
+    :param operation: operation name
+    :return: context manager
+    """
+    return _timing(operation) if _enabled else _NOOP
+
+
+def timed(operation):
+    """
+    Decorator timing every call of a function or coroutine function as an operation. While metrics
+    are disabled the wrapper only checks a flag before calling the function.
+    :param operation: operation name
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+                with _timing(operation):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _timing(operation):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def render_prometheus():
+    """
+    :return: the shop's metrics in the Prometheus text exposition format
+    """
+    return registry.render_prometheus()
@@ -0,0 +1,36 @@
+import argparse
+import logging
+from storage import RECORD_KEYS, JsonStorageEngine, SQLiteStorageEngine
+
+logger = logging.getLogger("EShopApp")
+
+
+def migrate(db_path):
+    """
+    Copies accounts, inventory and orders from the JSON files into a SQLite database.
+    Records already in the database are replaced, so the migration can be re-run.
+    :param db_path: path of the SQLite database
+    :return: dict of migrated record counts per data type
+    """
+    source = JsonStorageEngine()
+    target = SQLiteStorageEngine(db_path)
+    counts = {}
+    try:
+        for data_type in RECORD_KEYS:
+            counts[data_type] = target.insert_many(data_type, source.load(data_type))
+            logger.info("Migrated %d %s records to %s.", counts[data_type], data_type, db_path)
+    finally:
+        target.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrates the JSON data files to the SQLite storage engine. Run from eCommerceApp/."
+    )
+    parser.add_argument("--db", default="data/eshop.db", help="path of the SQLite database")
+    args = parser.parse_args()
+
+    for data_type, count in migrate(args.db).items():
+        print(f"{data_type}: {count} records migrated")
+    print(f"Set ESHOP_STORAGE=sqlite (and ESHOP_SQLITE_PATH={args.db}) to run the shop on SQLite.")
@@ -1,7 +1,4 @@
-import bcrypt
-from cryptography.fernet import Fernet
 from helper_funcs import (
-    get_secret_key,
     generate_account_number,
     get_data,
     generate_order_number,
@@ -11,17 +8,34 @@ from helper_funcs import (
     request_new_password,
     load_brute_passwords,
 )
+from repositories import get_account_repository, get_order_repository
+from password_service import get_password_hasher
+from metrics import timer
+from pricing import get_pricing_engine
+from record_crypto import encrypt_record
+from search_index import get_search_index
 import datetime
 import logging
-import json
 import getpass
 
 logger = logging.getLogger("EShopApp")
 
-cipher_suite = Fernet(get_secret_key("data_encryption_key").encode("utf-8"))
+
+def _fill(record, data):
+    # assigns the slotted fields present in a JSON dict
+    for field in record.__slots__:
+        if field in data:
+            setattr(record, field, data[field])
+    return record
 
 
 class Item:
+    """
+    Inventory item. Slotted, so a record holds its fields without a per-instance dict.
+    """
+
+    __slots__ = ("item_id", "brand", "name", "price", "quantity", "category_id")
+
     def __init__(self):
         self.item_id = ""
         self.brand = ""
@@ -30,6 +44,21 @@ class Item:
         self.quantity = ""
         self.category_id = ""
 
+    def to_dict(self):
+        """
+        :return: item dict of the JSON schema
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates an item from a dict of the JSON schema, missing fields keep their defaults.
+        :param data: item dict
+        :return: Item instance
+        """
+        return _fill(cls(), data)
+
 
 class InventoryModel:
     """
@@ -38,34 +67,51 @@ class InventoryModel:
 
     def __init__(self):
         """
-        Holds loaded inventory list.
+        Holds loaded inventory list and its search index.
         """
         self.inventory = None
+        self.search_index = None
 
     def load_inventory(self):
         """
-        Loads data for the inventory.
+        Loads data for the inventory. The search index is shared process-wide and only rebuilt when the
+        inventory changed.
         """
-        self.inventory = get_data("inventory")
+        inventory = get_data("inventory")
+        if inventory is not self.inventory or self.search_index is None:
+            self.inventory = inventory
+            self.search_index = get_search_index(inventory)
 
     def search_inventory(self, search_keyword):
         """
-        Very simple sequential search algorithm for the purposes of demonstrating functionality.
-        Ensures casing is the same for
+        Searches item names for the keyword through the prebuilt search index.
+        Matches the semantics of a case-insensitive sequential substring search.
         :param search_keyword: keyword to search by
         :return: found items in the inventory
         """
-        return [
-            item
-            for item in self.inventory
-            if search_keyword.lower() in item.get("name", "").lower()
-        ]
+        if self.search_index is None:
+            self.load_inventory()
+        return self.search_index.search(search_keyword)
+
+    def search_inventory_terms(self, query, top_k=10):
+        """
+        Searches name, brand and category ID by term prefixes, all terms must match.
+        :param query: search terms
+        :param top_k: number of best ranked results
+        :return: found items in the inventory, best matches first
+        """
+        if self.search_index is None:
+            self.load_inventory()
+        return self.search_index.search_terms(query, top_k)
 
 
 class OrderModel:
     """
     Order class to store and update order attributes.
     """
+
+    __slots__ = ("account_number", "order_id", "date", "status", "total", "order_items")
+
     def __init__(self):
         self.account_number = ""
         self.order_id = ""
@@ -74,6 +120,25 @@ class OrderModel:
         self.total = ""
         self.order_items = []
 
+    def to_dict(self):
+        """
+        :return: order dict of the JSON schema, with its own copy of the order items list
+        """
+        order = {field: getattr(self, field) for field in self.__slots__}
+        order["order_items"] = list(self.order_items)
+        return order
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates an order from a dict of the JSON schema, missing fields keep their defaults.
+        :param data: order dict
+        :return: OrderModel instance
+        """
+        order = _fill(cls(), data)
+        order.order_items = list(order.order_items)
+        return order
+
     def create_order(self, account_number, order_id, date, status, total):
         """
         Creates and assigns attributes to Order object as user creates an order.
@@ -111,6 +176,20 @@ class AccountModel:
     Class to manage account functionalities.
     """
 
+    __slots__ = (
+        "email_address",
+        "account_number",
+        "secure_password",
+        "insecure_password",
+        "name",
+        "surname",
+        "address",
+        "phone",
+        "role",
+        "jwt",
+        "secure",
+    )
+
     def __init__(self):
         """
         Initialises empty Account object.
@@ -127,6 +206,21 @@ class AccountModel:
         self.jwt = ""
         self.secure = True
 
+    def to_dict(self):
+        """
+        :return: account dict of the JSON schema
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates an account from a dict of the JSON schema, missing fields keep their defaults.
+        :param data: account dict
+        :return: AccountModel instance
+        """
+        return _fill(cls(), data)
+
     @property
     def email(self):
         """
@@ -146,14 +240,13 @@ class AccountModel:
 
         # validates entered e-mail address structure, and also assesses if system secure/insecure for ReDoS attack
         if check_email_pattern(value, secure=self.secure):
-            # opens account json files and checks if email exists already
-            accounts = get_data("accounts", debug)
-            if any(account["email_address"] == value for account in accounts):
-                logger.error(f"E-mail already registered: {value}")
+            # checks the account index if email exists already
+            if get_account_repository(debug).email_exists(value):
+                logger.error("E-mail already registered: %s", value)
                 self.email_address = value
             else:
                 # assigns e-mail to the new account model
-                logger.error(f'Account with e-mail "{value}" requires registration.')
+                logger.error('Account with e-mail "%s" requires registration.', value)
                 self.email_address = value
         else:
             raise ValueError(f"Invalid email address: {value}")
@@ -165,21 +258,20 @@ class AccountModel:
         :param email: account is loaded based on inputted email address
         :return: bool if account loaded
         """
-        accounts = get_data("accounts")
-        account = [d for d in accounts if d.get("email_address") == email]
+        account = get_account_repository().find_by_email(email)
         if account:
-            self.name = account[0].get("name")
-            self.surname = account[0].get("surname")
-            self.account_number = account[0].get("account_number")
+            self.name = account.get("name")
+            self.surname = account.get("surname")
+            self.account_number = account.get("account_number")
             # demonstrating security functionality for securely/insecurely storing passwords
             if secure:
-                self.secure_password = account[0].get("secure_password")
+                self.secure_password = account.get("secure_password")
             else:
-                self.insecure_password = account[0].get("insecure_password")
-            self.phone = account[0].get("phone")
-            self.address = account[0].get("address")
+                self.insecure_password = account.get("insecure_password")
+            self.phone = account.get("phone")
+            self.address = account.get("address")
             if secure:
-                self.role = account[0].get("role")
+                self.role = account.get("role")
             else:
                 # if insecure, assign admin role by default
                 self.role = "admin"
@@ -192,12 +284,10 @@ class AccountModel:
         Fetches attribute information from newly updated Account class object,
         transforms into a dict and saves to JSON file.
         """
-        accounts = get_data("accounts")
-        account = self.__dict__
-        accounts.append(account)
-        with open("data/accounts.json", mode="w") as f:
-            f.write(json.dumps(accounts, indent=2))
-        logger.info(f"Account saved.")
+        repository = get_account_repository()
+        repository.add(self.to_dict())
+        repository.save()
+        logger.info("Account saved.")
 
     def register_account(self, secure):
         """
@@ -205,41 +295,29 @@ class AccountModel:
         Secure and insecure saving of details enabled.
         """
         self.request_password(secure, existing_account=False)
+        details = {
+            "name": input("Please enter your name. \n"),
+            "surname": input("Please enter your surname. \n"),
+            "address": create_address_object(
+                input("Please enter the first line of your address. \n"),
+                input("Please enter the second line of your address. \n"),
+                input("Please enter your postcode. \n"),
+            ),
+            "phone": input("Please enter your phone number. \n"),
+        }
         if secure:
-            self.name = cipher_suite.encrypt(
-                input("Please enter your name. \n").encode("utf-8")
-            ).decode("utf-8")
-            self.surname = cipher_suite.encrypt(
-                input("Please enter your surname. \n").encode("utf-8")
-            ).decode("utf-8")
-            line1 = cipher_suite.encrypt(
-                input("Please enter the first line of your address. \n").encode("utf-8")
-            ).decode("utf-8")
-            line2 = cipher_suite.encrypt(
-                input("Please enter the second line of your address. \n").encode(
-                    "utf-8"
-                )
-            ).decode("utf-8")
-            postcode = cipher_suite.encrypt(
-                input("Please enter your postcode. \n").encode("utf-8")
-            ).decode("utf-8")
-            self.address = create_address_object(line1, line2, postcode)
-            self.phone = cipher_suite.encrypt(
-                input("Please enter your phone number. \n").encode("utf-8")
-            ).decode("utf-8")
-        else:
-            self.name = input("Please enter your name. \n")
-            self.surname = input("Please enter your surname. \n")
-            line1 = input("Please enter the first line of your address. \n")
-            line2 = input("Please enter the second line of your address. \n")
-            postcode = input("Please enter your postcode. \n")
-            self.address = create_address_object(line1, line2, postcode)
-            self.phone = input("Please enter your phone number. \n")
+            # encrypts all personal details in one batch
+            with timer("encrypt_account_details"):
+                details = encrypt_record(details)
+        self.name = details["name"]
+        self.surname = details["surname"]
+        self.address = details["address"]
+        self.phone = details["phone"]
         self.account_number = generate_account_number()
 
         # save account
         self.save_account()
-        logger.info(f"Account registered.")
+        logger.info("Account registered.")
 
     def request_password(self, secure, existing_account=True, brute_password=None):
         """
@@ -257,18 +335,14 @@ class AccountModel:
                 # if account already exists
                 message = "Enter your password: \n"
                 pass_phrase = str(getpass.getpass(message))
-                validated = bcrypt.checkpw(
-                    pass_phrase.encode("utf-8"), self.secure_password.encode("utf-8")
-                )
+                validated = self.verify_secure_password(pass_phrase)
 
             else:
                 # new registration
-                logger.info(f"Registration required.")
+                logger.info("Registration required.")
                 message = "Enter your password: \nIt must \n* Be at least 8 characters \n* Contain at least one uppercase and one lowercase character \n *Contain at least one numeric character \n*Contain at least one of these characters @!$&.\n"
                 pass_phrase = request_new_password(message, secure)
-                self.secure_password = bcrypt.hashpw(
-                    pass_phrase.encode("utf-8"), bcrypt.gensalt()
-                ).decode("utf-8")
+                self.secure_password = get_password_hasher().hash(pass_phrase)
                 validated = False
         else:  # all insecure paths
             if brute_password:
@@ -286,6 +360,30 @@ class AccountModel:
 
         return validated
 
+    def verify_secure_password(self, pass_phrase):
+        """
+        Checks a password against the stored bcrypt hash on the password service's worker pool.
+        If the hash was created with an outdated cost factor, the password is hashed again and saved.
+        :param pass_phrase: inputted password
+        :return: bool if password matches
+        """
+        validated, new_hash = get_password_hasher().verify_and_rehash(
+            pass_phrase, self.secure_password
+        )
+        if new_hash:
+            self.update_password_hash(new_hash)
+        return validated
+
+    def update_password_hash(self, new_hash):
+        """
+        Replaces the stored password hash and saves it to the account.
+        :param new_hash: new bcrypt hash string
+        """
+        self.secure_password = new_hash
+        repository = get_account_repository()
+        if repository.update(self.account_number, secure_password=new_hash):
+            repository.save()
+
 
 class EShopModel:
     """
@@ -305,7 +403,7 @@ class EShopModel:
         self.account.secure = secure
         email = self.account.email
         account_status = self.account.load_account_details(secure, email)
-        logger.info(f"Account with email {email} found: {account_status}")
+        logger.info("Account with email %s found: %s", email, account_status)
         logins = 0
         if secure:
             login_limit = 4
@@ -320,7 +418,7 @@ class EShopModel:
             )
 
         if brute_force == 1:  # if user would like to enter via brute-force
-            logger.warning(f"Brute entry executed by {email}")
+            logger.warning("Brute entry executed by %s", email)
             passwords = load_brute_passwords()
             for password in passwords:
                 print(f"Trying weak password: {password}")
@@ -333,6 +431,7 @@ class EShopModel:
                         login_info = {
                             "user_email": email,
                             "role": self.account.role,
+                            "account_number": self.account.account_number,
                             "time": str(datetime.datetime.now()),
                         }
                         self.account.jwt = create_jtw(login_info)
@@ -345,7 +444,7 @@ class EShopModel:
                         while logins < login_limit - 1:
                             logins += 1
                             logger.error(
-                                f"Password incorrect, try again. Attempts remaining: {login_limit - logins}"
+                                "Password incorrect, try again. Attempts remaining: %d", login_limit - logins
                             )
                             passed = self.account.request_password(
                                 secure,
@@ -356,6 +455,7 @@ class EShopModel:
                                 login_info = {
                                     "user_email": email,
                                     "role": self.account.role,
+                                    "account_number": self.account.account_number,
                                     "time": str(datetime.datetime.now()),
                                 }
                                 self.account.jwt = create_jtw(login_info)
@@ -376,6 +476,7 @@ class EShopModel:
                 login_info = {
                     "user_email": email,
                     "role": self.account.role,
+                    "account_number": self.account.account_number,
                     "time": str(datetime.datetime.now()),
                 }
                 self.account.jwt = create_jtw(login_info)
@@ -385,13 +486,14 @@ class EShopModel:
                 while logins < login_limit - 1:
                     logins += 1
                     logger.error(
-                        f"Password incorrect, try again. Attempts remaining: {login_limit - logins}"
+                        "Password incorrect, try again. Attempts remaining: %d", login_limit - logins
                     )
                     passed = self.account.request_password(secure)
                     if passed:
                         login_info = {
                             "user_email": email,
                             "role": self.account.role,
+                            "account_number": self.account.account_number,
                             "time": str(datetime.datetime.now()),
                         }
                         self.account.jwt = create_jtw(login_info)
@@ -404,13 +506,41 @@ class EShopModel:
             self.account.register_account(secure)
             return False
 
+    def authenticate(self, email, password, secure=True):
+        """
+        Non-interactive login with a single password attempt, used by the service mode.
+        :param email: email address
+        :param password: plain text password
+        :param secure: bool if secure or not secure
+        :return: bool true if login successful
+        """
+        self.account.secure = secure
+        if not check_email_pattern(email, secure=secure):
+            return False
+        self.account.email_address = email
+        if not self.account.load_account_details(secure, email):
+            return False
+        if secure:
+            passed = self.account.verify_secure_password(password)
+        else:
+            passed = self.account.insecure_password == password
+        if passed:
+            login_info = {
+                "user_email": email,
+                "role": self.account.role,
+                "account_number": self.account.account_number,
+                "time": str(datetime.datetime.now()),
+            }
+            self.account.jwt = create_jtw(login_info)
+        return passed
+
     def search_inventory(self, search_keyword):
         """
         Loads and searches inventory for order updating.
         :return results: found inventory items.
         """
         self.inventory.load_inventory()
-        logger.info(f"Inventory loaded.")
+        logger.info("Inventory loaded.")
         results = self.inventory.search_inventory(search_keyword)
 
         return results
@@ -420,31 +550,63 @@ class EShopModel:
         Search orders based on the logged-in account's account number.
         :return: list of found orders.
         """
-        orders = get_data("orders")
-        return [
-            d for d in orders if d.get("account_number") == self.account.account_number
-        ]
+        # looked up in the account number index instead of scanning all orders
+        return get_order_repository().find_by_account(self.account.account_number)
 
     def add_to_order(self, item_id, quantity):
         """
-        Creates new order and allows input of item ids to add order items.
+        Adds an item to the order in progress, creating the order with the first item, and updates
+        the order total from the inventory prices.
         :param item_id:
         :param quantity:
-        """
-        order_id = generate_order_number()
-        date = datetime.datetime.now()
-        status = "created"
-        total = "0.00"
-        self.order.create_order(
-            self.account.account_number, order_id, date, status, total
-        )
+        :raises ValueError: if the item does not exist
+        """
+        pricing = get_pricing_engine()
+        # raises before anything is added if the item does not exist
+        pricing.price_cents(item_id)
+        if not self.order.order_id:
+            order_id = f"{generate_order_number():07d}"
+            # stored as YYYY-MM-DD like the existing orders
+            date = datetime.date.today().isoformat()
+            status = "created"
+            total = "0.00"
+            self.order.create_order(
+                self.account.account_number, order_id, date, status, total
+            )
         self.order.add_product_to_order(item_id, quantity)
-        logger.info(f"Products added to order.")
+        self.order.total = pricing.order_total(self.order.order_items)
+        logger.info("Products added to order.")
+
+    def place_order(self):
+        """
+        Places the order in progress and waits until it is durably saved. A new order is started afterwards.
+        :return: the placed order dict, or None if no items were added
+        """
+        if not self.order.order_id:
+            return None
+        self.order.update_order_status("placed")
+        order = self.order.to_dict()
+        get_order_repository().add(order).result()
+        self.order = OrderModel()
+        logger.info("Order %s placed.", order["order_id"])
+        return order
+
+    def delete_order(self, order_id):
+        """
+        Deletes an order and waits until the deletion is durably saved.
+        :param order_id: ID of the order
+        :return: bool if the order existed
+        """
+        deleted = get_order_repository().delete(order_id)
+        if deleted is None:
+            return False
+        deleted.result()
+        return True
 
     def get_current_order(self):
         """
         Gets and returns current order in progress.
         :return current_order: returns the newly created order.
         """
-        current_order = self.order.__dict__
+        current_order = self.order.to_dict()
         return current_order
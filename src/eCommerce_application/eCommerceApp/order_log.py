@@ -0,0 +1,182 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from storage import get_storage_engine
+
+logger = logging.getLogger("EShopApp")
+
+
+class OrderWriter:
+    """
+    Group-committing writer of order changes on top of the orders write-ahead log.
+    Callers submit put/delete entries and receive a future, a single writer thread collects everything
+    queued in the meantime into one batch, appends it to the order journal with one fsync and then
+    resolves the futures of the whole batch. An order is therefore only acknowledged once it is on disk,
+    while many concurrent orders share the cost of one fsync. Replaying the journal on restart is
+    idempotent, and the journal is compacted into the orders snapshot periodically.
+    """
+
+    def __init__(self, debug=False, max_batch=512, max_delay=0.0, compact_interval=60.0):
+        """
+        :param debug: debug flag for testing, writes the test data files
+        :param max_batch: maximum number of entries committed together
+        :param max_delay: seconds to wait for more entries before committing a batch, 0 commits
+        whatever has queued up while the previous batch was being written
+        :param compact_interval: minimum seconds between compactions of the journal into the snapshot
+        """
+        self.debug = debug
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.compact_interval = compact_interval
+        self.batches = 0
+        self.entries_written = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._compacted_at = time.monotonic()
+        self._dirty = False
+        # sequence number of the latest submission, and of the latest one queued when a batch failed
+        self._submitted = 0
+        self._failed_at = 0
+
+    def submit(self, entries, merged=None):
+        """
+        Queues journal entries, see journal.apply_entries for their format.
+        :param entries: list of entry dicts
+        :param merged: the caller's in-memory orders list with the entries applied, handed to the data
+        store after the commit if every change in the batch came with a list. Each list must also hold the
+        changes submitted before it, the list of the batch's last change is handed over
+        :return: Future resolved when the entries are durable
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Order writer is closed.")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+                self._thread.start()
+            self._submitted += 1
+            self._queue.put((entries, merged, future, self._submitted))
+        return future
+
+    def put(self, order):
+        """
+        Queues an insert or update of an order.
+        :param order: order dict holding its order_id
+        :return: Future resolved when the order is durable
+        """
+        return self.submit([{"op": "put", "record": order}])
+
+    def delete(self, order_id):
+        """
+        Queues the deletion of an order.
+        :param order_id: ID of the order
+        :return: Future resolved when the deletion is durable
+        """
+        return self.submit([{"op": "delete", "key": order_id}])
+
+    def flush(self, timeout=None):
+        """
+        Waits until everything submitted so far is durable.
+        :param timeout: seconds to wait, forever if None
+        """
+        self.submit([]).result(timeout)
+
+    def close(self):
+        """
+        Commits the queued entries, compacts the journal and stops the writer thread.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(None)
+        if thread is not None:
+            thread.join()
+            if self._dirty:
+                self._compact()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            count = len(item[0])
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            while count < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                count += len(item[0])
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        entries = [entry for batch_entries, _, _, _ in batch for entry in batch_entries]
+        changes = [item for item in batch if item[0]]
+        # the in-memory list is only current if all changes of the batch were applied to it, and lists
+        # submitted before a failed batch may still hold the failed changes
+        merged = None
+        if changes and all(item[1] is not None and item[3] > self._failed_at for item in changes):
+            merged = changes[-1][1]
+        try:
+            if entries:
+                get_storage_engine(self.debug).write("orders", entries, merged=merged, durable=True)
+                self._dirty = True
+        except Exception as e:
+            logger.error("Writing %d order changes failed: %s", len(entries), e)
+            for _, _, future, _ in batch:
+                future.set_exception(e)
+            # the submitters have dropped the failed changes once their futures are resolved
+            with self._lock:
+                self._failed_at = self._submitted
+            return
+        self.batches += 1
+        self.entries_written += len(entries)
+        for _, _, future, _ in batch:
+            future.set_result(None)
+        if self._dirty and time.monotonic() - self._compacted_at >= self.compact_interval:
+            try:
+                self._compact()
+            except Exception as e:
+                # the changes are durable in the journal, compaction is retried after the next batch
+                logger.error("Compacting the order journal failed: %s", e)
+
+    def _compact(self):
+        get_storage_engine(self.debug).compact("orders")
+        self._compacted_at = time.monotonic()
+        self._dirty = False
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_order_writer(debug=False):
+    """
+    Returns the process-wide order writer, which is closed when the process exits.
+    :param debug: debug flag for testing
+    :return: OrderWriter instance
+    """
+    with _writers_lock:
+        if debug not in _writers:
+            _writers[debug] = OrderWriter(debug)
+            atexit.register(_writers[debug].close)
+        return _writers[debug]
@@ -0,0 +1,206 @@
+import base64
+import json
+import threading
+from journal import record_key
+
+# largest page size accepted by the orders API
+MAX_LIMIT = 1000
+
+
+class OrderQuery:
+    """
+    Parsed query of the /api/orders endpoint: filters, field projection and cursor pagination.
+    """
+
+    def __init__(
+        self,
+        account_number=None,
+        status=None,
+        date_from=None,
+        date_to=None,
+        fields=None,
+        limit=None,
+        cursor=None,
+        stream=False,
+    ):
+        self.account_number = account_number
+        self.status = status
+        self.date_from = date_from
+        self.date_to = date_to
+        self.fields = fields
+        self.limit = limit
+        self.cursor = cursor
+        self.stream = stream
+
+    @classmethod
+    def from_args(cls, args, accept=""):
+        """
+        Parses request arguments.
+        :param args: mapping of query string arguments
+        :param accept: Accept header of the request
+        :return: OrderQuery instance
+        :raises ValueError: if an argument is invalid
+        """
+        limit = args.get("limit")
+        if limit is not None:
+            if not limit.isdigit() or not 0 < int(limit) <= MAX_LIMIT:
+                raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+            limit = int(limit)
+        cursor = args.get("cursor")
+        if cursor is not None:
+            cursor = decode_cursor(cursor)
+        fields = args.get("fields")
+        if fields is not None:
+            fields = tuple(field for field in fields.split(",") if field)
+        return cls(
+            account_number=args.get("account_number"),
+            status=args.get("status"),
+            date_from=args.get("date_from"),
+            date_to=args.get("date_to"),
+            fields=fields,
+            limit=limit,
+            cursor=cursor,
+            stream=args.get("format") == "ndjson" or "application/x-ndjson" in accept,
+        )
+
+    @property
+    def paginated(self):
+        """
+        :return: bool if the response is a page with a next cursor instead of a plain list of orders
+        """
+        return self.limit is not None or self.cursor is not None
+
+    def matches(self, order):
+        """
+        Checks an order against the filters. Dates are compared on their YYYY-MM-DD prefix.
+        :param order: order dict
+        :return: bool if the order passes all filters
+        """
+        if self.account_number is not None and record_key(
+            order.get("account_number")
+        ) != record_key(self.account_number):
+            return False
+        if self.status is not None and order.get("status") != self.status:
+            return False
+        date = str(order.get("date", ""))[:10]
+        if self.date_from is not None and date < self.date_from:
+            return False
+        if self.date_to is not None and date > self.date_to:
+            return False
+        return True
+
+    def project(self, order):
+        """
+        Reduces an order to the requested fields.
+        :param order: order dict
+        :return: projected order dict
+        """
+        if self.fields is None:
+            return order
+        return {field: order[field] for field in self.fields if field in order}
+
+
+def encode_cursor(position, order_id):
+    """
+    Encodes the position and ID of the last returned order as an opaque cursor.
+    """
+    data = json.dumps([position, order_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor created by encode_cursor.
+    :return: tuple of position and order ID
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        position, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(position), order_id
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+_positions = {"orders": None, "length": 0, "positions": None}
+_positions_lock = threading.Lock()
+
+
+def _position_of(orders, order_id):
+    # order_id -> position map, rebuilt when a different orders list is loaded or the list was changed
+    # in place by the order repository
+    key = record_key(order_id)
+    with _positions_lock:
+        if _positions["orders"] is orders and _positions["length"] == len(orders):
+            position = _positions["positions"].get(key)
+            if position is None or record_key(orders[position].get("order_id")) == key:
+                return position
+        _positions["positions"] = {
+            record_key(order.get("order_id")): position for position, order in enumerate(orders)
+        }
+        _positions["orders"] = orders
+        _positions["length"] = len(orders)
+        return _positions["positions"].get(key)
+
+
+def start_position(orders, cursor):
+    """
+    Finds the position after the last order returned for a cursor. Orders deleted since the cursor
+    was created are handled by looking the order ID up again.
+    :param orders: list of order dicts
+    :param cursor: decoded cursor or None
+    :return: position to continue from
+    """
+    if cursor is None:
+        return 0
+    position, order_id = cursor
+    if position < len(orders) and orders[position].get("order_id") == order_id:
+        return position + 1
+    found = _position_of(orders, order_id)
+    return position + 1 if found is None else found + 1
+
+
+def iter_orders(orders, query):
+    """
+    Yields the projected orders matching the query, starting at its cursor and stopping after its limit.
+    :param orders: list of order dicts
+    :param query: OrderQuery instance
+    :return: generator of (position, order) tuples
+    """
+    returned = 0
+    for position in range(start_position(orders, query.cursor), len(orders)):
+        if query.limit is not None and returned >= query.limit:
+            return
+        order = orders[position]
+        if query.matches(order):
+            returned += 1
+            yield position, query.project(order)
+
+
+def query_orders(orders, query):
+    """
+    Runs a query and collects the result.
+    :param orders: list of order dicts
+    :param query: OrderQuery instance
+    :return: list of orders, or a page dict with orders and next_cursor if the query is paginated
+    """
+    results = list(iter_orders(orders, query))
+    page = [order for _, order in results]
+    if not query.paginated:
+        return page
+    next_cursor = None
+    if query.limit is not None and len(results) == query.limit:
+        position = results[-1][0]
+        if position + 1 < len(orders):
+            next_cursor = encode_cursor(position, orders[position].get("order_id"))
+    return {"orders": page, "next_cursor": next_cursor}
+
+
+def stream_orders(orders, query):
+    """
+    Serialises matching orders one line at a time as NDJSON.
+    :param orders: list of order dicts
+    :param query: OrderQuery instance
+    :return: generator of NDJSON lines
+    """
+    for _, order in iter_orders(orders, query):
+        yield json.dumps(order, default=str) + "\n"
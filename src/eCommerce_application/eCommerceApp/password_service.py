@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import bcrypt
+from metrics import timed
+
+logger = logging.getLogger("EShopApp")
+
+
+class PasswordServiceBusy(Exception):
+    """
+    Raised when the password service queue stays full for longer than the submit timeout.
+    """
+
+
+def _hash_password(password, rounds):
+    # module-level so it can be run in a process pool
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+    return hashed, time.perf_counter() - started
+
+
+def _check_password(password, hashed):
+    started = time.perf_counter()
+    validated = bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    return validated, time.perf_counter() - started
+
+
+def hash_cost(hashed):
+    """
+    Reads the cost factor of a bcrypt hash ($2b$<cost>$...).
+    :param hashed: bcrypt hash string
+    :return: int cost, or None if the hash is not a bcrypt hash
+    """
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded worker pool instead of the calling thread.
+    At most max_pending requests are queued or running, callers beyond that wait up to the submit
+    timeout for a free slot and then get PasswordServiceBusy, so a burst of logins applies backpressure
+    instead of growing an unbounded queue. bcrypt releases the GIL, so a thread pool runs hashes in
+    parallel, a process pool can be used instead where that is preferred.
+    """
+
+    def __init__(
+        self, rounds=12, max_workers=None, max_pending=64, submit_timeout=5.0, use_processes=False
+    ):
+        """
+        :param rounds: bcrypt cost factor of new hashes
+        :param max_workers: number of hashing workers, defaults to the number of CPUs
+        :param max_pending: maximum number of queued and running requests
+        :param submit_timeout: seconds to wait for a free slot before raising PasswordServiceBusy
+        :param use_processes: run hashes in worker processes instead of threads
+        """
+        self.rounds = rounds
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hasher"
+            )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_latency = 0.0
+
+    @timed("bcrypt_hash")
+    def hash(self, password):
+        """
+        Hashes a password with the configured cost factor.
+        :param password: plain text password
+        :return: bcrypt hash string
+        """
+        return self._submit(_hash_password, password, self.rounds).result()
+
+    def hash_many(self, passwords):
+        """
+        Hashes a batch of passwords in parallel on the worker pool, e.g. for an account import.
+        At most max_pending hashes of the batch are in flight, so a large batch waits for its own
+        earlier hashes instead of running into the submit timeout.
+        :param passwords: iterable of plain text passwords
+        :return: list of bcrypt hash strings in the same order
+        """
+        hashes = []
+        in_flight = deque()
+        for password in passwords:
+            if len(in_flight) >= self.max_pending:
+                hashes.append(in_flight.popleft().result())
+            in_flight.append(self._submit(_hash_password, password, self.rounds))
+        hashes.extend(future.result() for future in in_flight)
+        return hashes
+
+    @timed("bcrypt_verify")
+    def verify(self, password, hashed):
+        """
+        Checks a password against a stored bcrypt hash.
+        :param password: plain text password
+        :param hashed: stored bcrypt hash string
+        :return: bool if the password matches
+        """
+        return self._submit(_check_password, password, hashed).result()
+
+    @timed("bcrypt_hash")
+    async def hash_async(self, password):
+        """
+        Awaitable variant of hash, waits for a free slot without blocking the event loop.
+        """
+        await asyncio.to_thread(self._acquire_slot)
+        return await asyncio.wrap_future(
+            self._submit(_hash_password, password, self.rounds, acquired=True)
+        )
+
+    @timed("bcrypt_verify")
+    async def verify_async(self, password, hashed):
+        """
+        Awaitable variant of verify, waits for a free slot without blocking the event loop.
+        """
+        await asyncio.to_thread(self._acquire_slot)
+        return await asyncio.wrap_future(
+            self._submit(_check_password, password, hashed, acquired=True)
+        )
+
+    def needs_rehash(self, hashed):
+        """
+        Checks if a stored hash was created with a lower cost factor than the configured one.
+        :param hashed: stored bcrypt hash string
+        :return: bool if the password should be hashed again
+        """
+        cost = hash_cost(hashed)
+        return cost is not None and cost < self.rounds
+
+    def verify_and_rehash(self, password, hashed):
+        """
+        Verifies a password and, if it matches and the stored cost factor is outdated, hashes it again.
+        :param password: plain text password
+        :param hashed: stored bcrypt hash string
+        :return: tuple of bool if the password matches and the new hash, or None if no rehash was needed
+        """
+        validated = self.verify(password, hashed)
+        if validated and self.needs_rehash(hashed):
+            logger.info("Rehashing password with cost factor %d.", self.rounds)
+            return validated, self.hash(password)
+        return validated, None
+
+    async def verify_and_rehash_async(self, password, hashed):
+        """
+        Awaitable variant of verify_and_rehash.
+        """
+        validated = await self.verify_async(password, hashed)
+        if validated and self.needs_rehash(hashed):
+            return validated, await self.hash_async(password)
+        return validated, None
+
+    def metrics(self):
+        """
+        Returns queue and latency metrics of the service.
+        :return: dict with queue depth, in-flight and completed requests, rejections and latencies in seconds
+        """
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "mean_hash_seconds": self._hash_seconds / completed,
+                "mean_wait_seconds": self._wait_seconds / completed,
+                "max_latency_seconds": self._max_latency,
+            }
+
+    def shutdown(self, wait=True):
+        """
+        Stops the worker pool.
+        :param wait: wait for queued requests to finish
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordServiceBusy("Too many password requests in progress, try again later.")
+
+    def _submit(self, fn, *args, acquired=False):
+        if not acquired:
+            self._acquire_slot()
+        submitted = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._finish(submitted, None)
+            raise
+        # callers receive the result only, the worker's timing goes into the metrics
+        result = Future()
+
+        def done(finished):
+            self._finish(submitted, finished)
+            if finished.cancelled():
+                result.cancel()
+            elif finished.exception() is not None:
+                result.set_exception(finished.exception())
+            else:
+                result.set_result(finished.result()[0])
+
+        future.add_done_callback(done)
+        return result
+
+    def _finish(self, submitted, future):
+        latency = time.perf_counter() - submitted
+        hash_seconds = 0.0
+        if future is not None and not future.cancelled() and future.exception() is None:
+            hash_seconds = future.result()[1]
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._hash_seconds += hash_seconds
+            self._wait_seconds += max(0.0, latency - hash_seconds)
+            self._max_latency = max(self._max_latency, latency)
+        self._slots.release()
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher():
+    """
+    Returns the process-wide password service. The cost factor of new hashes can be set with the
+    ESHOP_BCRYPT_ROUNDS environment variable.
+    :return: PasswordHasher instance
+    """
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher(rounds=int(os.environ.get("ESHOP_BCRYPT_ROUNDS", "12")))
+        return _hasher
@@ -0,0 +1,173 @@
+import logging
+import threading
+from array import array
+from helper_funcs import get_data
+from records import InventoryColumns, format_cents, numpy, to_cents
+from repositories import get_order_repository
+
+logger = logging.getLogger("EShopApp")
+
+
+class PricingEngine:
+    """
+    Prices orders from the inventory. Item prices are held as exact integer cents in a columnar index
+    by item ID, rebuilt only when the inventory changes, so totals are exact decimal sums without float
+    rounding. Many orders are repriced in one vectorised pass over their flattened order items.
+    """
+
+    def __init__(self, debug=False):
+        """
+        :param debug: debug flag for testing
+        """
+        self.debug = debug
+        self._source = None
+        self._columns = None
+        self._lock = threading.Lock()
+
+    def price_cents(self, item_id):
+        """
+        :param item_id: ID of an item
+        :return: int price of the item in cents
+        :raises ValueError: if the item does not exist
+        """
+        columns = self._index()
+        return columns.price_cents[self._position(columns, item_id)]
+
+    def order_total_cents(self, order_items):
+        """
+        Computes the exact total of order items.
+        :param order_items: list of {"item_id": ..., "quantity": ...} dicts
+        :return: int total in cents
+        :raises ValueError: if an item does not exist
+        """
+        columns = self._index()
+        return sum(
+            columns.price_cents[self._position(columns, line["item_id"])] * int(line["quantity"])
+            for line in order_items
+        )
+
+    def order_total(self, order_items):
+        """
+        Computes the total of order items as a price string of the JSON schema.
+        :param order_items: list of {"item_id": ..., "quantity": ...} dicts
+        :return: total string, e.g. "109.85"
+        """
+        return format_cents(self.order_total_cents(order_items))
+
+    def reprice(self, orders, price_changes=None):
+        """
+        Computes the totals of many orders in one pass. The order items of all orders are flattened
+        into typed arrays of price positions, quantities and owning order, and the line totals are
+        summed per order, vectorised with NumPy when it is installed. An order that cannot be priced,
+        e.g. because it references an item no longer in the inventory, gets None instead of a total.
+        :param orders: list of order dicts
+        :param price_changes: dict of item ID to new price, applied on top of the inventory prices
+        :return: list of total strings or None in the order of the orders
+        :raises ValueError: if an item of the price changes does not exist
+        """
+        columns = self._index()
+        prices = columns.price_cents
+        if price_changes:
+            prices = array("q", prices)
+            for item_id, price in price_changes.items():
+                prices[self._position(columns, item_id)] = to_cents(price)
+        positions = array("q")
+        quantities = array("q")
+        owners = array("q")
+        unpriced = set()
+        for number, order in enumerate(orders):
+            try:
+                lines = [
+                    (self._position(columns, line["item_id"]), int(line["quantity"]))
+                    for line in order.get("order_items", ())
+                ]
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("Order %s cannot be priced: %s", order.get("order_id"), e)
+                unpriced.add(number)
+                continue
+            for position, quantity in lines:
+                positions.append(position)
+                quantities.append(quantity)
+                owners.append(number)
+        if numpy is not None and positions:
+            lines = numpy.frombuffer(prices, dtype=numpy.int64)[
+                numpy.frombuffer(positions, dtype=numpy.int64)
+            ] * numpy.frombuffer(quantities, dtype=numpy.int64)
+            totals = numpy.zeros(len(orders), dtype=numpy.int64)
+            numpy.add.at(totals, numpy.frombuffer(owners, dtype=numpy.int64), lines)
+            totals = totals.tolist()
+        else:
+            totals = [0] * len(orders)
+            for position, quantity, owner in zip(positions, quantities, owners):
+                totals[owner] += prices[position] * quantity
+        return [
+            None if number in unpriced else format_cents(total) for number, total in enumerate(totals)
+        ]
+
+    def _index(self):
+        inventory = get_data("inventory", self.debug)
+        with self._lock:
+            if inventory is not self._source:
+                self._columns = InventoryColumns(inventory)
+                self._source = inventory
+                logger.debug("Price index rebuilt for %d items.", len(inventory))
+            return self._columns
+
+    @staticmethod
+    def _position(columns, item_id):
+        position = columns.position(item_id)
+        if position is None:
+            raise ValueError(f"No item found with the ID {item_id}")
+        return position
+
+
+def reprice_open_orders(price_changes=None, status="placed", engine=None, repository=None):
+    """
+    Applies price changes to the open order book: all orders with the status are repriced in one pass
+    and the orders whose total changed are saved together. Orders that cannot be priced keep their
+    total and are returned to the caller.
+    :param price_changes: dict of item ID to new price, the current inventory prices if None
+    :param status: status of the orders to reprice
+    :param engine: PricingEngine, the process-wide engine by default
+    :param repository: OrderRepository, the process-wide repository by default
+    :return: tuple of the number of orders whose total changed and the list of orders that could not
+    be priced
+    """
+    engine = engine or get_pricing_engine()
+    repository = repository or get_order_repository()
+    orders = repository.find_by_status(status)
+    totals = engine.reprice(orders, price_changes)
+    updates = {
+        order["order_id"]: {"total": total}
+        for order, total in zip(orders, totals)
+        if total is not None and order.get("total") != total
+    }
+    unpriced = [order for order, total in zip(orders, totals) if total is None]
+    if updates:
+        future = repository.update_many(updates)
+        if future is not None:
+            future.result()
+    logger.info(
+        "Repriced %d of %d %s orders, %d could not be priced.",
+        len(updates),
+        len(orders),
+        status,
+        len(unpriced),
+    )
+    return len(updates), unpriced
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_pricing_engine(debug=False):
+    """
+    Returns the process-wide pricing engine.
+    :param debug: debug flag for testing
+    :return: PricingEngine instance
+    """
+    with _engines_lock:
+        if debug not in _engines:
+            _engines[debug] = PricingEngine(debug)
+        return _engines[debug]
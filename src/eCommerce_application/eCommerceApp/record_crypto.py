@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import InvalidToken
+from metrics import timed
+from secret_keys import get_keyring
+
+logger = logging.getLogger("EShopApp")
+
+# personally identifiable account fields, nested fields are separated by a dot
+PII_FIELDS = (
+    "name",
+    "surname",
+    "phone",
+    "phone_number",
+    "address.line1",
+    "address.line2",
+    "address.postcode",
+)
+
+# fields shown when listing accounts
+LISTING_FIELDS = ("account_number", "email_address", "name", "surname", "role")
+
+# records encrypted or decrypted per thread pool task
+CHUNK_SIZE = 256
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_crypto_executor():
+    """
+    Returns the shared thread pool for record encryption. The cryptography primitives release the GIL,
+    so the chunks of a batch run in parallel.
+    :return: ThreadPoolExecutor instance
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="record-crypto"
+            )
+        return _executor
+
+
+def _transform(record, fields, transform):
+    # copies the record and the nested dicts holding transformed fields
+    result = dict(record)
+    for field in fields:
+        *parents, name = field.split(".")
+        target = result
+        for parent in parents:
+            value = target.get(parent)
+            if not isinstance(value, dict):
+                target = None
+                break
+            value = dict(value)
+            target[parent] = value
+            target = value
+        if target is not None and isinstance(target.get(name), str):
+            target[name] = transform(target[name])
+    return result
+
+
+def _encryptor(cipher):
+    return lambda value: cipher.encrypt(value.encode("utf-8")).decode("utf-8")
+
+
+def _decryptor(cipher):
+    def decrypt(value):
+        try:
+            return cipher.decrypt(value.encode("utf-8")).decode("utf-8")
+        except InvalidToken:
+            # accounts registered with security disabled hold plain text
+            return value
+
+    return decrypt
+
+
+def encrypt_record(record, cipher=None, fields=PII_FIELDS):
+    """
+    Encrypts the PII fields of one account dict.
+    :param record: account dict
+    :param cipher: Fernet/MultiFernet cipher, the keyring's data encryption cipher by default
+    :param fields: fields to encrypt
+    :return: copy of the record with encrypted fields
+    """
+    return _transform(record, fields, _encryptor(cipher or get_keyring().cipher()))
+
+
+def decrypt_record(record, cipher=None, fields=PII_FIELDS):
+    """
+    Decrypts the PII fields of one account dict. Fields that are not encrypted are kept as they are.
+    :param record: account dict
+    :param cipher: Fernet/MultiFernet cipher, the keyring's data encryption cipher by default
+    :param fields: fields to decrypt
+    :return: copy of the record with decrypted fields
+    """
+    return _transform(record, fields, _decryptor(cipher or get_keyring().cipher()))
+
+
+@timed("encrypt_records")
+def encrypt_records(records, cipher=None, fields=PII_FIELDS):
+    """
+    Encrypts the PII fields of many account dicts, split in chunks across the crypto thread pool.
+    :param records: list of account dicts
+    :param cipher: Fernet/MultiFernet cipher, the keyring's data encryption cipher by default
+    :param fields: fields to encrypt
+    :return: list of encrypted copies in the same order
+    """
+    return _map_records(records, fields, _encryptor(cipher or get_keyring().cipher()))
+
+
+def decrypt_records(records, cipher=None, fields=PII_FIELDS):
+    """
+    Decrypts the PII fields of many account dicts, split in chunks across the crypto thread pool.
+    :param records: list of account dicts
+    :param cipher: Fernet/MultiFernet cipher, the keyring's data encryption cipher by default
+    :param fields: fields to decrypt
+    :return: list of decrypted copies in the same order
+    """
+    return _map_records(records, fields, _decryptor(cipher or get_keyring().cipher()))
+
+
+def _map_records(records, fields, transform):
+    records = list(records)
+
+    def run(chunk):
+        return [_transform(record, fields, transform) for record in chunk]
+
+    if len(records) <= CHUNK_SIZE:
+        return run(records)
+    chunks = [records[i:i + CHUNK_SIZE] for i in range(0, len(records), CHUNK_SIZE)]
+    results = []
+    for chunk in get_crypto_executor().map(run, chunks):
+        results.extend(chunk)
+    return results
+
+
+class LazyDecryptedAccount(Mapping):
+    """
+    Read-only view of an account dict that decrypts PII fields only when they are accessed.
+    Printing the view shows the display fields only, so listing screens decrypt nothing else.
+    """
+
+    def __init__(self, record, cipher=None, display_fields=LISTING_FIELDS):
+        """
+        :param record: stored account dict
+        :param cipher: Fernet/MultiFernet cipher, the keyring's data encryption cipher by default
+        :param display_fields: fields included when the view is printed
+        """
+        self._record = record
+        self._decrypt = _decryptor(cipher or get_keyring().cipher())
+        self._display_fields = display_fields
+        self._decrypted = {}
+
+    def __getitem__(self, key):
+        if key in self._decrypted:
+            return self._decrypted[key]
+        value = self._record[key]
+        pii = [field.split(".", 1)[1] for field in PII_FIELDS if field.startswith(f"{key}.")]
+        if pii and isinstance(value, dict):
+            value = _transform(value, pii, self._decrypt)
+        elif key in PII_FIELDS and isinstance(value, str):
+            value = self._decrypt(value)
+        self._decrypted[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._record)
+
+    def __len__(self):
+        return len(self._record)
+
+    def __repr__(self):
+        return repr({field: self.get(field) for field in self._display_fields if field in self._record})
+
+
+def lazy_decrypt(records, cipher=None, display_fields=LISTING_FIELDS):
+    """
+    Wraps account dicts in lazily decrypting views.
+    :param records: iterable of account dicts
+    :param cipher: Fernet/MultiFernet cipher, the keyring's data encryption cipher by default
+    :param display_fields: fields included when a view is printed
+    :return: list of LazyDecryptedAccount views
+    """
+    cipher = cipher or get_keyring().cipher()
+    return [LazyDecryptedAccount(record, cipher, display_fields) for record in records]
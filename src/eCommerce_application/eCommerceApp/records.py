@@ -0,0 +1,145 @@
+import logging
+from array import array
+from decimal import ROUND_HALF_UP, Decimal
+from journal import record_key
+
+try:
+    import numpy
+except ImportError:
+    # aggregations fall back to the pure Python loops over the same arrays
+    numpy = None
+
+logger = logging.getLogger("EShopApp")
+
+
+def to_cents(price):
+    """
+    Converts a price of the JSON schema ("2.99") to exact integer cents.
+    :param price: price string, int or Decimal
+    :return: int cents, rounded half up
+    """
+    return int((Decimal(str(price)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def format_cents(cents):
+    """
+    Formats integer cents as a price string of the JSON schema.
+    :param cents: int cents
+    :return: price string with two decimals, e.g. "2.99"
+    """
+    return str(Decimal(int(cents)).scaleb(-2))
+
+
+class InventoryColumns:
+    """
+    Columnar container for a large inventory. Text fields are kept in lists, prices (in cents) and
+    quantities in typed arrays of 8 bytes per value instead of one dict and several string objects per
+    item, so aggregations over price and quantity run over contiguous memory, vectorised with NumPy
+    when it is installed.
+    """
+
+    def __init__(self, items=()):
+        """
+        :param items: iterable of item dicts of the JSON schema
+        """
+        self.item_ids = []
+        self.brands = []
+        self.names = []
+        self.category_ids = []
+        self.price_cents = array("q")
+        self.quantities = array("q")
+        self._positions = {}
+        for item in items:
+            self.append(item)
+
+    def append(self, item):
+        """
+        Adds an item.
+        :param item: item dict of the JSON schema
+        """
+        self._positions[record_key(item.get("item_id"))] = len(self.item_ids)
+        self.item_ids.append(item.get("item_id"))
+        self.brands.append(item.get("brand"))
+        self.names.append(item.get("name"))
+        self.category_ids.append(item.get("category_id"))
+        self.price_cents.append(to_cents(item.get("price") or 0))
+        self.quantities.append(int(item.get("quantity") or 0))
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def position(self, item_id):
+        """
+        :param item_id: ID of an item as string or int
+        :return: row of the item, or None if not found
+        """
+        return self._positions.get(record_key(item_id))
+
+    def row(self, position):
+        """
+        :param position: row of an item
+        :return: item dict of the JSON schema
+        """
+        return {
+            "item_id": self.item_ids[position],
+            "brand": self.brands[position],
+            "name": self.names[position],
+            "price": format_cents(self.price_cents[position]),
+            "quantity": str(self.quantities[position]),
+            "category_id": self.category_ids[position],
+        }
+
+    def item(self, position):
+        """
+        :param position: row of an item
+        :return: Item instance
+        """
+        # imported here as the models price orders through this module
+        from models import Item
+
+        return Item.from_dict(self.row(position))
+
+    def to_dicts(self):
+        """
+        :return: list of item dicts of the JSON schema
+        """
+        return [self.row(position) for position in range(len(self))]
+
+    def total_quantity(self):
+        """
+        :return: number of items in stock
+        """
+        if numpy is not None and len(self):
+            return int(numpy.frombuffer(self.quantities, dtype=numpy.int64).sum())
+        return sum(self.quantities)
+
+    def stock_value_cents(self):
+        """
+        :return: value of the stock, price times quantity over all items, in cents
+        """
+        if numpy is not None and len(self):
+            prices = numpy.frombuffer(self.price_cents, dtype=numpy.int64)
+            quantities = numpy.frombuffer(self.quantities, dtype=numpy.int64)
+            return int(numpy.dot(prices, quantities))
+        return sum(price * quantity for price, quantity in zip(self.price_cents, self.quantities))
+
+    def stock_value_by_category(self):
+        """
+        :return: dict of category ID to value of its stock in cents
+        """
+        totals = {}
+        for category_id, price, quantity in zip(self.category_ids, self.price_cents, self.quantities):
+            totals[category_id] = totals.get(category_id, 0) + price * quantity
+        return totals
+
+    def low_stock(self, threshold):
+        """
+        :param threshold: quantity below which an item is low on stock
+        :return: list of IDs of items with a quantity below the threshold
+        """
+        if numpy is not None and len(self):
+            quantities = numpy.frombuffer(self.quantities, dtype=numpy.int64)
+            return [self.item_ids[position] for position in numpy.flatnonzero(quantities < threshold)]
+        return [
+            item_id for item_id, quantity in zip(self.item_ids, self.quantities) if quantity < threshold
+        ]
@@ -0,0 +1,463 @@
+import logging
+import threading
+from helper_funcs import get_data
+from journal import record_key
+from order_log import get_order_writer
+from storage import get_storage_engine
+
+logger = logging.getLogger("EShopApp")
+
+
+class AccountRepository:
+    """
+    Indexed view of the stored accounts.
+    Keeps hash indexes on e-mail address, account number and account ID so lookups do not scan the
+    accounts list. The indexes are rebuilt whenever the data store hands out a reloaded accounts list
+    and are maintained in place on insert and delete.
+    The accounts list is shared with the data store and never modified: the first change after a load
+    or save copies it, and changes find their account's position through an account number index.
+    Changes are persisted through the storage engine on save, which for JSON storage appends them to
+    the accounts journal instead of rewriting the accounts file.
+    """
+
+    def __init__(self, debug=False):
+        """
+        Initialises an empty repository, accounts are indexed on first access.
+        :param debug: debug flag for testing
+        """
+        self.debug = debug
+        self._source = None
+        self._accounts = []
+        # account number -> position in the accounts list
+        self._positions = {}
+        self._by_email = {}
+        self._by_number = {}
+        self._by_id = {}
+        self._pending = []
+        self._lock = threading.RLock()
+
+    def find_by_email(self, email_address):
+        """
+        Finds an account by its e-mail address.
+        :param email_address: e-mail address of the account
+        :return: account dict or None
+        """
+        with self._lock:
+            self._sync()
+            return self._by_email.get(email_address)
+
+    def find_by_account_number(self, account_number):
+        """
+        Finds an account by its account number.
+        :param account_number: account number as string or int
+        :return: account dict or None
+        """
+        with self._lock:
+            self._sync()
+            return self._by_number.get(record_key(account_number))
+
+    def find_by_id(self, account_id):
+        """
+        Finds an account by its account ID.
+        :param account_id: account ID
+        :return: account dict or None
+        """
+        with self._lock:
+            self._sync()
+            return self._by_id.get(str(account_id))
+
+    def email_exists(self, email_address):
+        """
+        Checks if an account is registered with the e-mail address.
+        :param email_address: e-mail address to check
+        :return: bool if account exists
+        """
+        return self.find_by_email(email_address) is not None
+
+    def all(self):
+        """
+        Returns all accounts. The list is shared and must not be modified.
+        :return: list of account dicts
+        """
+        with self._lock:
+            self._sync()
+            return self._accounts
+
+    def add(self, account):
+        """
+        Adds a new account and updates the indexes.
+        :param account: account dict
+        """
+        with self._lock:
+            self._sync()
+            if account.get("email_address") in self._by_email:
+                raise ValueError(f"E-mail already registered: {account.get('email_address')}")
+            accounts = self._writable()
+            self._positions[record_key(account.get("account_number"))] = len(accounts)
+            accounts.append(account)
+            self._index(account)
+            self._pending.append({"op": "put", "record": account})
+
+    def update(self, account_number, **changes):
+        """
+        Updates fields of a stored account and re-indexes it.
+        :param account_number: account number of the account
+        :param changes: fields to set
+        :return: the updated account dict or None if not found
+        """
+        with self._lock:
+            self._sync()
+            account = self._by_number.get(record_key(account_number))
+            if account is None:
+                return None
+            updated = {**account, **changes}
+            position = self._positions.pop(record_key(account.get("account_number")))
+            self._writable()[position] = updated
+            self._positions[record_key(updated.get("account_number"))] = position
+            self._unindex(account)
+            self._index(updated)
+            self._pending.append({"op": "put", "record": updated})
+            return updated
+
+    def delete_by_id(self, account_id):
+        """
+        Deletes an account by its account ID and removes it from the indexes.
+        :param account_id: account ID
+        :return: the deleted account dict or None if not found
+        """
+        with self._lock:
+            self._sync()
+            account = self._by_id.get(str(account_id))
+            if account is None:
+                return None
+            position = self._positions.pop(record_key(account.get("account_number")))
+            accounts = self._writable()
+            del accounts[position]
+            # only the accounts behind the deleted one move
+            for moved in range(position, len(accounts)):
+                self._positions[record_key(accounts[moved].get("account_number"))] = moved
+            self._unindex(account)
+            self._pending.append({"op": "delete", "key": account.get("account_number")})
+            return account
+
+    def save(self):
+        """
+        Persists the changes made since the last save through the storage engine. The updated list is
+        handed to the engine, so the next read neither reloads the data nor rebuilds the indexes.
+        """
+        with self._lock:
+            if self._pending:
+                engine = get_storage_engine(self.debug)
+                if engine.write("accounts", self._pending, merged=self._accounts):
+                    self._source = self._accounts
+                self._pending = []
+            logger.info("Accounts saved.")
+
+    def _sync(self):
+        accounts = get_data("accounts", self.debug)
+        if accounts is not self._source:
+            self._rebuild(accounts)
+
+    def _writable(self):
+        # copy-on-write, the list shared with the data store is copied before the first change
+        if self._accounts is self._source:
+            self._accounts = list(self._accounts)
+        return self._accounts
+
+    def _rebuild(self, accounts):
+        self._source = accounts
+        self._accounts = accounts
+        self._positions = {}
+        self._by_email = {}
+        self._by_number = {}
+        self._by_id = {}
+        for position, account in enumerate(accounts):
+            self._positions[record_key(account.get("account_number"))] = position
+            self._index(account)
+        logger.debug("Account indexes rebuilt for %d accounts.", len(self._accounts))
+
+    def _index(self, account):
+        if account.get("email_address"):
+            self._by_email[account["email_address"]] = account
+        if account.get("account_number") not in (None, ""):
+            self._by_number[record_key(account["account_number"])] = account
+        if account.get("account_id") not in (None, ""):
+            self._by_id[str(account["account_id"])] = account
+
+    def _unindex(self, account):
+        self._by_email.pop(account.get("email_address"), None)
+        self._by_number.pop(record_key(account.get("account_number")), None)
+        self._by_id.pop(str(account.get("account_id")), None)
+
+
+class OrderRepository:
+    """
+    Indexed view of the stored orders.
+    Keeps an order ID index and secondary indexes from account number and status to order IDs, so an
+    account's order history costs O(k) in its own number of orders instead of scanning all orders.
+    The orders list is shared with the data store and never modified: a change builds a new list, which
+    is handed to the order writer and only becomes the repository's list, with the indexes updated, once
+    the change is durable. A failed change is dropped and later changes start again from the durable
+    orders. Changes build on the latest pending list, found through a position index, so they need no
+    list scans. The indexes are rebuilt only when the data store hands out orders changed by someone else.
+    Changes are persisted through the group-committing order writer, the returned futures resolve once
+    they are durable.
+    """
+
+    def __init__(self, debug=False, writer=None):
+        """
+        Initialises an empty repository, orders are indexed on first access.
+        :param debug: debug flag for testing
+        :param writer: OrderWriter persisting the changes, the process-wide writer by default
+        """
+        self.debug = debug
+        self.writer = writer or get_order_writer(debug)
+        self._source = None
+        # durable orders with their indexes
+        self._orders = []
+        self._by_id = {}
+        # account number / status -> order IDs, dicts are used as insertion ordered sets
+        self._by_account = {}
+        self._by_status = {}
+        # latest list including the pending changes, with order ID -> position in it
+        self._head = []
+        self._positions = {}
+        # id -> list of the changes submitted but not resolved yet
+        self._pending = {}
+        # incremented whenever the pending changes are dropped
+        self._generation = 0
+        self._lock = threading.RLock()
+
+    def find_by_id(self, order_id):
+        """
+        Finds an order by its order ID.
+        :param order_id: order ID as string or int
+        :return: order dict or None
+        """
+        with self._lock:
+            self._sync()
+            return self._by_id.get(record_key(order_id))
+
+    def find_by_account(self, account_number):
+        """
+        Finds the orders of an account, oldest first.
+        :param account_number: account number as string or int
+        :return: list of order dicts
+        """
+        with self._lock:
+            self._sync()
+            return [self._by_id[key] for key in self._by_account.get(record_key(account_number), ())]
+
+    def find_by_status(self, status):
+        """
+        Finds the orders with a status, in the order they got the status.
+        :param status: order status, e.g. placed
+        :return: list of order dicts
+        """
+        with self._lock:
+            self._sync()
+            return [self._by_id[key] for key in self._by_status.get(status, ())]
+
+    def all(self):
+        """
+        Returns all durable orders. The list is shared and must not be modified.
+        :return: list of order dicts
+        """
+        with self._lock:
+            self._sync()
+            return self._orders
+
+    def add(self, order):
+        """
+        Adds a new order or replaces the order with the same ID.
+        :param order: order dict holding its order_id
+        :return: Future resolved when the order is durable
+        """
+        with self._lock:
+            self._sync()
+            return self._change(puts=[order])
+
+    def update(self, order_id, **changes):
+        """
+        Updates fields of a stored order.
+        :param order_id: order ID
+        :param changes: fields to set, e.g. status
+        :return: Future resolved when the change is durable, or None if not found
+        """
+        return self.update_many({order_id: changes})
+
+    def update_many(self, updates):
+        """
+        Updates fields of several orders as one change, so the orders list is copied only once.
+        :param updates: dict of order ID to dict of fields to set
+        :return: Future resolved when the changes are durable, or None if none of the orders was found
+        """
+        with self._lock:
+            self._sync()
+            orders = []
+            for order_id, changes in updates.items():
+                position = self._positions.get(record_key(order_id))
+                if position is not None:
+                    orders.append({**self._head[position], **changes})
+            return self._change(puts=orders) if orders else None
+
+    def delete(self, order_id):
+        """
+        Deletes an order.
+        :param order_id: order ID
+        :return: Future resolved when the deletion is durable, or None if not found
+        """
+        with self._lock:
+            self._sync()
+            key = record_key(order_id)
+            if key not in self._positions:
+                return None
+            return self._change(deletes=[key])
+
+    def _change(self, puts=(), deletes=()):
+        # copy-on-write: the new list is built from the latest pending one, the lists handed out stay as they are
+        head = list(self._head)
+        positions = self._positions
+        changes = []
+        entries = []
+        for order in puts:
+            key = record_key(order.get("order_id"))
+            position = positions.get(key)
+            if position is None:
+                positions[key] = len(head)
+                head.append(order)
+                changes.append((None, order))
+            else:
+                changes.append((head[position], order))
+                head[position] = order
+            entries.append({"op": "put", "record": order})
+        if deletes:
+            removed = set()
+            for key in deletes:
+                position = positions.pop(key)
+                removed.add(position)
+                changes.append((head[position], None))
+                entries.append({"op": "delete", "key": head[position].get("order_id")})
+            head = [order for position, order in enumerate(head) if position not in removed]
+            # only the orders behind the first deleted one move
+            for position in range(min(removed), len(head)):
+                positions[record_key(head[position].get("order_id"))] = position
+        self._head = head
+        self._pending[id(head)] = head
+        generation = self._generation
+        future = self.writer.submit(entries, merged=head)
+        future.add_done_callback(lambda done: self._resolved(done, head, changes, generation))
+        return future
+
+    def _resolved(self, future, orders, changes, generation):
+        with self._lock:
+            self._pending.pop(id(orders), None)
+            if future.exception() is not None:
+                if generation == self._generation:
+                    # drops this and all later pending changes, they were built on top of it
+                    self._generation += 1
+                    self._reset_head()
+                return
+            if generation != self._generation:
+                # built on a dropped change, the durable orders are reloaded from the data store instead
+                self._source = self._orders = None
+                return
+            self._orders = orders
+            for old, new in changes:
+                if old is None:
+                    self._index(new)
+                elif new is None:
+                    self._unindex(old)
+                else:
+                    self._reindex(old, new)
+
+    def _sync(self):
+        orders = get_data("orders", self.debug)
+        # the writer hands this repository's lists to the data store after committing their changes
+        if orders is not self._source and orders is not self._orders and id(orders) not in self._pending:
+            self._rebuild(orders)
+
+    def _rebuild(self, orders):
+        self._source = orders
+        self._orders = orders
+        self._by_id = {}
+        self._by_account = {}
+        self._by_status = {}
+        for order in orders:
+            self._index(order)
+        self._generation += 1
+        self._reset_head()
+        logger.debug("Order indexes rebuilt for %d orders.", len(orders))
+
+    def _reset_head(self):
+        self._head = self._orders
+        self._positions = {
+            record_key(order.get("order_id")): position for position, order in enumerate(self._orders)
+        }
+
+    def _index(self, order):
+        key = record_key(order.get("order_id"))
+        self._by_id[key] = order
+        self._by_account.setdefault(record_key(order.get("account_number")), {})[key] = None
+        self._by_status.setdefault(order.get("status"), {})[key] = None
+
+    def _unindex(self, order):
+        key = record_key(order.get("order_id"))
+        self._by_id.pop(key, None)
+        self._remove_id(self._by_account, record_key(order.get("account_number")), key)
+        self._remove_id(self._by_status, order.get("status"), key)
+
+    def _reindex(self, old, new):
+        # only moves the order between index entries whose value changed, so it keeps its place
+        key = record_key(new.get("order_id"))
+        self._by_id[key] = new
+        for index, old_value, new_value in (
+            (
+                self._by_account,
+                record_key(old.get("account_number")),
+                record_key(new.get("account_number")),
+            ),
+            (self._by_status, old.get("status"), new.get("status")),
+        ):
+            if old_value != new_value:
+                self._remove_id(index, old_value, key)
+                index.setdefault(new_value, {})[key] = None
+
+    @staticmethod
+    def _remove_id(index, value, key):
+        ids = index.get(value)
+        if ids is not None:
+            ids.pop(key, None)
+            if not ids:
+                del index[value]
+
+
+_account_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_account_repository(debug=False):
+    """
+    Returns the process-wide account repository.
+    :param debug: debug flag for testing
+    :return: AccountRepository instance
+    """
+    with _repositories_lock:
+        if debug not in _account_repositories:
+            _account_repositories[debug] = AccountRepository(debug)
+        return _account_repositories[debug]
+
+
+_order_repositories = {}
+
+
+def get_order_repository(debug=False):
+    """
+    Returns the process-wide order repository.
+    :param debug: debug flag for testing
+    :return: OrderRepository instance
+    """
+    with _repositories_lock:
+        if debug not in _order_repositories:
+            _order_repositories[debug] = OrderRepository(debug)
+        return _order_repositories[debug]
@@ -0,0 +1,63 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def strong_etag(body):
+    """
+    Creates a strong ETag from the bytes of a response body.
+    :param body: response body bytes
+    :return: unquoted ETag string
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized API responses.
+    Entries are stored per data type together with the data version they were rendered from, and all
+    entries of a data type are dropped as soon as its version changes, so unchanged data is neither
+    reloaded nor serialised again and changed data is never served from the cache.
+    """
+
+    def __init__(self, max_entries=128):
+        """
+        :param max_entries: maximum number of cached responses
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get_or_render(self, data_type, version, key, render, etag=None):
+        """
+        Returns a cached response or renders and caches it.
+        :param data_type: type of data the response is built from
+        :param version: current version token of the data
+        :param key: hashable key identifying the request, e.g. its query string
+        :param render: callable returning the response body, bytes unless an ETag is given
+        :param etag: ETag of the response for bodies that are not serialised, e.g. one derived from the
+        version and the key, the strong ETag of the body bytes if None
+        :return: tuple of ETag and body
+        """
+        with self._lock:
+            if self._versions.get(data_type) != version:
+                self._drop(data_type)
+                self._versions[data_type] = version
+            entry = self._entries.get((data_type, key))
+            if entry is not None:
+                self._entries.move_to_end((data_type, key))
+                return entry
+        body = render()
+        entry = (etag or strong_etag(body), body)
+        with self._lock:
+            # only cache if the data did not change while rendering
+            if self._versions.get(data_type) == version:
+                self._entries[(data_type, key)] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _drop(self, data_type):
+        for cached in [cached for cached in self._entries if cached[0] == data_type]:
+            del self._entries[cached]
@@ -0,0 +1,133 @@
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# weights of a term matching a token of each field when ranking results
+FIELD_WEIGHTS = {"name": 3.0, "brand": 2.0, "category_id": 1.0}
+
+
+class InventorySearchIndex:
+    """
+    Search index over the inventory, built once when the inventory is loaded.
+    Substring search on item names is served from a trigram index, whose smallest posting list gives
+    the candidates that are then checked with the same substring test as a sequential search, so
+    results are identical to it. A token index over name, brand and category_id additionally serves
+    prefix and multi-term searches with ranked results.
+    """
+
+    gram_size = 3
+
+    def __init__(self, items):
+        """
+        Builds the index.
+        :param items: list of inventory item dicts
+        """
+        self.items = items
+        self._names = [item.get("name", "").lower() for item in items]
+        grams = {}
+        tokens = {}
+        for position, name in enumerate(self._names):
+            for gram in {name[i:i + self.gram_size] for i in range(len(name) - self.gram_size + 1)}:
+                grams.setdefault(gram, []).append(position)
+            item = items[position]
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in TOKEN_PATTERN.findall(str(item.get(field, "")).lower()):
+                    postings = tokens.setdefault(token, {})
+                    if weight > postings.get(position, 0):
+                        postings[position] = weight
+        # posting lists hold item positions in ascending order, so results keep inventory order
+        self._grams = {gram: array("I", positions) for gram, positions in grams.items()}
+        self._tokens = tokens
+        self._sorted_tokens = sorted(tokens)
+
+    def search(self, keyword):
+        """
+        Finds items whose name contains the keyword, ignoring case.
+        :param keyword: search keyword
+        :return: list of matching item dicts in inventory order
+        """
+        keyword = keyword.lower()
+        if len(keyword) < self.gram_size:
+            # too short for the trigram index, matches most of the inventory anyway
+            candidates = range(len(self._names))
+        else:
+            candidates = None
+            for i in range(len(keyword) - self.gram_size + 1):
+                postings = self._grams.get(keyword[i:i + self.gram_size])
+                if postings is None:
+                    return []
+                if candidates is None or len(postings) < len(candidates):
+                    candidates = postings
+        names = self._names
+        return [self.items[i] for i in candidates if keyword in names[i]]
+
+    def search_terms(self, query, top_k=None):
+        """
+        Finds items where every term of the query is a prefix of a token in the item's name, brand
+        or category ID, ranked by how well and in which fields the terms match.
+        :param query: whitespace separated search terms
+        :param top_k: number of best results to return, all matches if None
+        :return: list of matching item dicts, best matches first
+        """
+        terms = TOKEN_PATTERN.findall(query.lower())
+        if not terms:
+            return []
+        scores = None
+        for term in terms:
+            term_scores = self._prefix_scores(term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    position: score + term_scores[position]
+                    for position, score in scores.items()
+                    if position in term_scores
+                }
+            if not scores:
+                return []
+        if top_k is None:
+            ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        else:
+            ranked = heapq.nsmallest(
+                top_k, scores, key=lambda position: (-scores[position], position)
+            )
+        return [self.items[position] for position in ranked]
+
+    def _prefix_scores(self, term):
+        # tokens starting with the term are adjacent in the sorted token list
+        scores = {}
+        start = bisect_left(self._sorted_tokens, term)
+        for token in islice(self._sorted_tokens, start, None):
+            if not token.startswith(term):
+                break
+            # exact token matches rank above prefix matches
+            boost = 1.0 if token == term else 0.5
+            for position, weight in self._tokens[token].items():
+                score = weight * boost
+                if score > scores.get(position, 0):
+                    scores[position] = score
+        return scores
+
+
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def get_search_index(items):
+    """
+    Returns the process-wide search index of the inventory, so sessions and models share one index
+    instead of each building their own. The data store hands out the same list until the inventory
+    changes, so the index is rebuilt once per inventory version.
+    :param items: list of inventory item dicts as loaded from the data store
+    :return: InventorySearchIndex of the items
+    """
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None or _shared_index.items is not items:
+            _shared_index = InventorySearchIndex(items)
+        return _shared_index
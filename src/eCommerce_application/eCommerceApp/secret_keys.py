@@ -0,0 +1,149 @@
+import json
+import logging
+import secrets
+import threading
+import time
+from cryptography.fernet import Fernet, MultiFernet
+from data_store import file_signature
+from journal import write_json_atomic
+
+logger = logging.getLogger("EShopApp")
+
+
+class Keyring:
+    """
+    Holds the application's key material, loaded once from the keys file.
+    Keeps ready-made Fernet ciphers and the JWT signing keys in memory, checks at most every few
+    seconds whether the keys file changed and reloads it if so, and supports rotating keys without
+    a restart. Keys replaced by a rotation are kept as previous keys, so data encrypted and tokens
+    signed with them can still be decrypted and verified.
+    """
+
+    def __init__(self, path, check_interval=5.0):
+        """
+        :param path: path of the keys file
+        :param check_interval: minimum number of seconds between checks for a changed keys file
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._keys = None
+        self._ciphers = {}
+        self._signature = None
+        self._checked_at = 0.0
+
+    def get(self, key_type):
+        """
+        Returns the current raw key of a type.
+        :param key_type: type of key required (jwt or encryption)
+        :return key: key string, or None if not configured
+        """
+        return self._current_keys().get(key_type)
+
+    def previous(self, key_type):
+        """
+        Returns the keys of a type that were replaced by rotations, newest first.
+        :param key_type: type of key
+        :return: list of key strings
+        """
+        return list(self._current_keys().get(f"previous_{key_type}s", []))
+
+    def cipher(self, key_type="data_encryption_key"):
+        """
+        Returns the cipher for a data encryption key. Encrypts with the current key and decrypts
+        with the current or any previous key.
+        :param key_type: type of the encryption key
+        :return: MultiFernet instance
+        """
+        keys = self._current_keys()
+        cipher = self._ciphers.get(key_type)
+        if cipher is None:
+            with self._lock:
+                cipher = self._ciphers.get(key_type)
+                if cipher is None:
+                    fernets = [
+                        Fernet(key.encode("utf-8"))
+                        for key in [keys[key_type], *keys.get(f"previous_{key_type}s", [])]
+                    ]
+                    cipher = MultiFernet(fernets)
+                    self._ciphers[key_type] = cipher
+        return cipher
+
+    def jwt_signing_key(self):
+        """
+        :return: key used to sign new JSON web tokens
+        """
+        return self.get("jwt_secret_key")
+
+    def jwt_verification_keys(self):
+        """
+        :return: current and previous keys accepted when verifying JSON web tokens
+        """
+        return [self.jwt_signing_key(), *self.previous("jwt_secret_key")]
+
+    def rotate(self, key_type, new_key=None):
+        """
+        Replaces a key with a new one and keeps the old key as a previous key. The keys file is
+        rewritten atomically, so other processes pick up the rotation on their next check.
+        :param key_type: type of key to rotate
+        :param new_key: new key, generated if not given
+        :return: the new key
+        """
+        if new_key is None:
+            if key_type.endswith("encryption_key"):
+                new_key = Fernet.generate_key().decode("utf-8")
+            else:
+                new_key = secrets.token_urlsafe(32)
+        with self._lock:
+            keys = dict(self.reload())
+            if keys.get(key_type):
+                keys[f"previous_{key_type}s"] = [keys[key_type], *keys.get(f"previous_{key_type}s", [])]
+            keys[key_type] = new_key
+            write_json_atomic(self.path, [keys])
+            self.reload()
+        logger.info("Rotated %s.", key_type)
+        return new_key
+
+    def reload(self):
+        """
+        Loads the keys file and drops the ciphers built from the previous keys.
+        :return: dict of keys
+        """
+        with self._lock:
+            signature = file_signature((self.path,))
+            with open(self.path) as f:
+                keys = json.load(f)[0]
+            self._keys = keys
+            self._ciphers = {}
+            self._signature = signature
+            self._checked_at = time.monotonic()
+            return keys
+
+    def _current_keys(self):
+        keys = self._keys
+        if keys is None:
+            return self.reload()
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                self._checked_at = time.monotonic()
+                if file_signature((self.path,)) != self._signature:
+                    logger.info("Keys file %s changed, reloading.", self.path)
+                    return self.reload()
+        return keys
+
+
+_keyrings = {}
+_keyrings_lock = threading.Lock()
+
+
+def get_keyring(debug=False):
+    """
+    Returns the process-wide keyring.
+    :param debug: debug flag for testing, loads the test keys
+    :return: Keyring instance
+    """
+    with _keyrings_lock:
+        if debug not in _keyrings:
+            path = "tests/test_data/test_keys.json" if debug else "no_secrets_here/keys.json"
+            _keyrings[debug] = Keyring(path)
+        return _keyrings[debug]
@@ -0,0 +1,501 @@
+import argparse
+import logging
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import jwt
+from flask import g, jsonify, request
+from api_server import ApiServer, create_app
+from helper_funcs import get_data
+from logging_setup import configure_logging
+from models import EShopModel
+from record_crypto import lazy_decrypt
+from repositories import get_account_repository
+from tokens import get_token_verifier
+
+logger = logging.getLogger("EShopApp")
+
+
+def session_role_required(roles):
+    """
+    Role-based access control of service session operations, the headless counterpart of the
+    controller's role_required: a denied call is logged and returns None, which the API answers with 403.
+    :param roles: roles allowed to call the operation
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.has_role(roles):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class ServiceSession:
+    """
+    State of one shopper in service mode: the logged-in account with its JWT and role, and the order in
+    progress. Operations reuse EShopModel and the controller's role-based access control, a session handles
+    one request at a time.
+    """
+
+    def __init__(self, secure=True):
+        """
+        :param secure: secure functionality bool
+        """
+        self.secure = secure
+        self.model = EShopModel()
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        # wall clock expiry of sessions restored from a JSON web token
+        self.expires = None
+
+    def login(self, email, password):
+        """
+        :return: bool if login successful
+        """
+        return self.model.authenticate(email, password, self.secure)
+
+    def has_role(self, roles):
+        """
+        Checks the session's role, taken from the verified claims of its JSON web token once logged in.
+        :param roles: allowed roles
+        :return: bool if the session has one of the roles
+        """
+        account = self.model.account
+        role = get_token_verifier().role(account.jwt) if account.jwt else account.role
+        if role in roles:
+            return True
+        logger.warning("Unauthorised access by %s, requires one of %s", account.email_address, roles)
+        return False
+
+    def search(self, search_keyword):
+        """
+        :return: found inventory items
+        """
+        return self.model.search_inventory(search_keyword)
+
+    def add_item(self, item_id, quantity):
+        """
+        :return: current order dict
+        """
+        self.model.add_to_order(item_id, quantity)
+        return self.model.get_current_order()
+
+    def place_order(self):
+        """
+        :return: placed order dict, or None if the order is empty
+        """
+        return self.model.place_order()
+
+    def own_orders(self):
+        """
+        :return: list of orders of the logged-in account
+        """
+        return self.model.search_orders()
+
+    @session_role_required(["admin", "clerk"])
+    def all_orders(self):
+        """
+        :return: list of all orders
+        """
+        return list(get_data("orders"))
+
+    @session_role_required(["clerk"])
+    def delete_order(self, order_id):
+        """
+        :return: bool if the order was deleted
+        """
+        if self.model.delete_order(order_id):
+            logger.info("Order with the ID %s is deleted.", order_id)
+            return True
+        return False
+
+    @session_role_required(["admin", "clerk"])
+    def all_accounts(self):
+        """
+        :return: list of accounts with the listing fields decrypted
+        """
+        return [dict(account.items()) for account in lazy_decrypt(get_data("accounts"))]
+
+    @session_role_required(["admin"])
+    def delete_account(self, account_id):
+        """
+        :return: bool if the account was deleted
+        """
+        repository = get_account_repository()
+        if repository.delete_by_id(account_id):
+            repository.save()
+            logger.info("Account with the ID %s is deleted.", account_id)
+            return True
+        return False
+
+
+class SessionStore:
+    """
+    Thread-safe store of service sessions by opaque bearer token. Sessions expire after being idle for the
+    TTL, and the least recently used session is dropped when the store is full. Sessions can also be
+    restored from a verified JSON web token, so a client can be served by any worker process.
+    """
+
+    def __init__(self, ttl=1800.0, max_sessions=10000, secure=True):
+        """
+        :param ttl: seconds a session may stay idle
+        :param max_sessions: maximum number of sessions kept
+        :param secure: secure functionality bool of new sessions
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.secure = secure
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, session=None):
+        """
+        Stores a session under a new token.
+        :param session: ServiceSession, e.g. one that has just logged in, a new not yet logged-in session
+        if None
+        :return: tuple of token and ServiceSession
+        """
+        token = secrets.token_urlsafe(32)
+        session = session or ServiceSession(self.secure)
+        self._add(token, session)
+        return token, session
+
+    def restore(self, token, claims):
+        """
+        Recreates the session of a client that logged in elsewhere from its token's verified claims.
+        The session ends when the token expires.
+        :param token: encoded JSON web token
+        :param claims: verified claims of the token
+        :return: ServiceSession
+        """
+        session = ServiceSession(self.secure)
+        account = session.model.account
+        account.email_address = claims.get("user_email", "")
+        account.account_number = claims.get("account_number", "")
+        account.role = claims.get("role")
+        account.jwt = token
+        session.expires = claims["exp"]
+        self._add(token, session)
+        return session
+
+    def get(self, token):
+        """
+        Looks up a session and marks it as used.
+        :param token: bearer token
+        :return: ServiceSession, or None if unknown or expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if now - session.last_seen > self.ttl or (
+                session.expires is not None and time.time() >= session.expires
+            ):
+                del self._sessions[token]
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(token)
+            return session
+
+    def remove(self, token):
+        """
+        Ends a session.
+        :param token: bearer token
+        """
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def purge(self):
+        """
+        Drops expired sessions.
+        :return: number of dropped sessions
+        """
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            expired = [token for token, session in self._sessions.items() if session.last_seen < cutoff]
+            for token in expired:
+                del self._sessions[token]
+        return len(expired)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _add(self, token, session):
+        with self._lock:
+            self._sessions[token] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+
+class LoginThrottle:
+    """
+    Limits failed logins per account and per client, like the attempt limit of the interactive login.
+    After max_failures failed logins of an account, or max_client_failures from one client address,
+    within the window, further logins of that account or from that client are refused until the lockout
+    has passed, however the password. A successful login clears the account's failures. The least
+    recently failed entries are dropped when more than max_entries are tracked.
+    """
+
+    def __init__(
+        self, max_failures=4, max_client_failures=20, window=900.0, lockout=900.0, max_entries=100000
+    ):
+        """
+        :param max_failures: failed logins of an account that lock it
+        :param max_client_failures: failed logins from a client address that lock the client
+        :param window: seconds over which failures are counted
+        :param lockout: seconds a locked account or client has to wait
+        :param max_entries: maximum number of accounts and clients tracked
+        """
+        self.max_failures = max_failures
+        self.max_client_failures = max_client_failures
+        self.window = window
+        self.lockout = lockout
+        self.max_entries = max_entries
+        # ("account", e-mail) / ("client", address) -> (failures, first failure, locked until)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retry_after(self, email, client):
+        """
+        :param email: e-mail address of the login
+        :param client: client address
+        :return: seconds until the account and the client may log in again, 0 if they may now
+        """
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for key in self._keys(email, client):
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] > now:
+                    wait = max(wait, entry[2] - now)
+        return wait
+
+    def failed(self, email, client):
+        """
+        Records a failed login of the account from the client.
+        :param email: e-mail address of the login
+        :param client: client address
+        """
+        now = time.monotonic()
+        account_key, client_key = self._keys(email, client)
+        with self._lock:
+            for key, limit in ((account_key, self.max_failures), (client_key, self.max_client_failures)):
+                failures, first, _ = self._entries.get(key, (0, now, 0.0))
+                if now - first > self.window:
+                    failures, first = 0, now
+                failures += 1
+                locked_until = now + self.lockout if failures >= limit else 0.0
+                self._entries[key] = (failures, first, locked_until)
+                self._entries.move_to_end(key)
+                if locked_until:
+                    logger.warning("Logins locked for %s after %d failures.", key[1], failures)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def succeeded(self, email):
+        """
+        Clears the failed logins of an account.
+        :param email: e-mail address of the login
+        """
+        with self._lock:
+            self._entries.pop(("account", email.strip().lower()), None)
+
+    @staticmethod
+    def _keys(email, client):
+        return ("account", email.strip().lower()), ("client", client)
+
+
+def create_service_app(sessions=None, throttle=None):
+    """
+    Creates the shop API with the service mode endpoints. Clients log in once and send the returned
+    token as "Authorization: Bearer <token>" with every other request. The returned JSON web token is
+    accepted as well and is verified statelessly, so it is valid at every worker process.
+    :param sessions: SessionStore, a new store by default
+    :param throttle: LoginThrottle, by default a new one allowing 4 failed logins per account in secure mode
+    and 1000 in the insecure demonstration mode, like the interactive login
+    :return: Flask app
+    """
+    app = create_app()
+    # an empty store is falsy, as it has a length
+    if sessions is None:
+        sessions = SessionStore()
+    if throttle is None:
+        throttle = LoginThrottle(max_failures=4 if sessions.secure else 1000)
+    app.config["SESSIONS"] = sessions
+
+    def bearer_token():
+        header = request.headers.get("Authorization", "")
+        return header[7:] if header.startswith("Bearer ") else None
+
+    def with_session(handler):
+        # runs the handler under the session's lock, so requests of one session do not interleave
+        @wraps(handler)
+        def view(*args, **kwargs):
+            token = bearer_token()
+            session = sessions.get(token) if token else None
+            if session is None and token and token.count(".") == 2:
+                try:
+                    session = sessions.restore(token, get_token_verifier().verify(token))
+                except jwt.InvalidTokenError:
+                    session = None
+            if session is None:
+                return jsonify({"error": "Login required"}), 401
+            with session.lock:
+                g.session = session
+                return handler(*args, **kwargs)
+
+        return view
+
+    def allowed(result):
+        # session_role_required returns None when access is denied
+        if result is None:
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify(result)
+
+    @app.route("/api/session", methods=["POST"])
+    def login():
+        body = request.get_json(silent=True) or {}
+        email = str(body.get("email", ""))
+        client = request.remote_addr or ""
+        wait = throttle.retry_after(email, client)
+        if wait:
+            response = jsonify({"error": "Too many failed logins, try again later"})
+            response.headers["Retry-After"] = str(math.ceil(wait))
+            return response, 429
+        # the session is only stored once the credentials are valid, so failed logins cannot evict others
+        session = ServiceSession(sessions.secure)
+        if not session.login(email, str(body.get("password", ""))):
+            throttle.failed(email, client)
+            return jsonify({"error": "Invalid e-mail address or password"}), 401
+        throttle.succeeded(email)
+        token, session = sessions.create(session)
+        account = session.model.account
+        logger.info("Successful login with %s", account.email_address)
+        return jsonify(
+            {
+                "token": token,
+                "jwt": account.jwt,
+                "role": account.role,
+                "account_number": account.account_number,
+            }
+        )
+
+    @app.route("/api/session", methods=["DELETE"])
+    @with_session
+    def logout():
+        sessions.remove(bearer_token())
+        return "", 204
+
+    @app.route("/api/inventory", methods=["GET"])
+    @with_session
+    def search():
+        return jsonify(g.session.search(request.args.get("q", "")))
+
+    @app.route("/api/orders/current/items", methods=["POST"])
+    @with_session
+    def add_item():
+        body = request.get_json(silent=True) or {}
+        try:
+            quantity = int(body.get("quantity", 1))
+        except (TypeError, ValueError):
+            return jsonify({"error": "quantity must be a number"}), 400
+        try:
+            return jsonify(g.session.add_item(str(body.get("item_id", "")), quantity))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.route("/api/orders/current", methods=["POST"])
+    @with_session
+    def place_order():
+        order = g.session.place_order()
+        if order is None:
+            return jsonify({"error": "No items in the current order"}), 400
+        return jsonify(order), 201
+
+    @app.route("/api/orders/<order_id>", methods=["DELETE"])
+    @with_session
+    def delete_order(order_id):
+        deleted = g.session.delete_order(order_id)
+        if deleted is False:
+            return jsonify({"error": "Order not found"}), 404
+        return allowed(deleted)
+
+    @app.route("/api/orders/mine", methods=["GET"])
+    @with_session
+    def own_orders():
+        return jsonify(g.session.own_orders())
+
+    @app.route("/api/orders/all", methods=["GET"])
+    @with_session
+    def all_orders():
+        return allowed(g.session.all_orders())
+
+    @app.route("/api/accounts", methods=["GET"])
+    @with_session
+    def all_accounts():
+        return allowed(g.session.all_accounts())
+
+    # the orders listing of the base API shows every account's orders, so it is only served to
+    # logged-in admins and clerks here
+    list_orders = app.view_functions["get_orders_api"]
+
+    @with_session
+    def guarded_orders():
+        if not g.session.has_role(["admin", "clerk"]):
+            return jsonify({"error": "Forbidden"}), 403
+        return list_orders()
+
+    app.view_functions["get_orders_api"] = guarded_orders
+
+    @app.route("/api/accounts/<account_id>", methods=["DELETE"])
+    @with_session
+    def delete_account(account_id):
+        deleted = g.session.delete_account(account_id)
+        if deleted is False:
+            return jsonify({"error": "Account not found"}), 404
+        return allowed(deleted)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the shop as a headless multi-session API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=32, help="worker threads per process")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="pre-forked worker processes, each keeps its own sessions",
+    )
+    parser.add_argument("--session-ttl", type=float, default=1800.0, help="idle seconds before logout")
+    parser.add_argument("--insecure", action="store_true", help="run the insecure demonstration mode")
+    args = parser.parse_args()
+
+    configure_logging(filename="app.log", level=logging.INFO)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    store = SessionStore(ttl=args.session_ttl, secure=not args.insecure)
+    server = ApiServer(
+        create_service_app(store),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        processes=args.processes,
+    )
+    server.start()
+    print(f"Serving the shop on {server.url}, press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(60)
+            store.purge()
+    except KeyboardInterrupt:
+        server.stop()
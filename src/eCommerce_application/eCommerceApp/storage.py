@@ -0,0 +1,398 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from data_store import data_store, file_signature
+from journal import RecordJournal, apply_entries, record_key, write_json_atomic
+
+logger = logging.getLogger("EShopApp")
+
+# field identifying a record of each data type
+RECORD_KEYS = {"accounts": "account_number", "inventory": "item_id", "orders": "order_id"}
+
+
+def get_data_path(data_type, debug=False):
+    """
+    Resolves the JSON file backing a type of data.
+    :param data_type: type of data required to be loaded
+    :param debug: debug flag for testing
+    :return file: path of the JSON file
+    """
+    if data_type == "accounts":
+        if debug is False:
+            file = "data/accounts.json"
+        else:
+            file = "tests/test_data/test_accounts.json"
+    elif data_type == "inventory":
+        if debug is False:
+            file = "data/inventory.json"
+        else:
+            file = "test_inventory.json"
+    elif data_type == "orders":
+        if debug is False:
+            file = "data/orders.json"
+        else:
+            file = "test_orders.json"
+    else:
+        raise ValueError("No such data exists.")
+    return file
+
+
+class StorageEngine(ABC):
+    """
+    Interface of the persistence backends behind helper_funcs.get_data.
+    Records are exchanged as the dicts of the JSON schema, so models and controllers
+    work unchanged on every engine.
+    """
+
+    @abstractmethod
+    def load(self, data_type):
+        """
+        Loads all records of a data type. The returned list is shared and must not be modified,
+        the same list object is returned for as long as the stored data has not changed.
+        :param data_type: accounts, inventory or orders
+        :return: list of record dicts
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def write(self, data_type, entries, merged=None, durable=False):
+        """
+        Persists put/delete entries, see journal.apply_entries for their format.
+        :param data_type: accounts, inventory or orders
+        :param entries: list of entry dicts
+        :param merged: the caller's in-memory list with the entries already applied, which is handed
+        out by the next load if nobody else changed the data in the meantime
+        :param durable: the entries must be on disk when write returns
+        :return: bool if merged is now the list returned by load
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def version(self, data_type):
+        """
+        Returns a token that changes whenever the stored data of a type changes, e.g. to invalidate
+        caches built from it. Tokens are only comparable within one process.
+        :param data_type: accounts, inventory or orders
+        :return: hashable version token
+        """
+        raise NotImplementedError
+
+    def compact(self, data_type):
+        """
+        Folds changes logged since the last compaction into the stored data, if the engine logs them.
+        :param data_type: accounts, inventory or orders
+        """
+
+    def find(self, data_type, field, value):
+        """
+        Finds records where a field equals the value.
+        :param data_type: accounts, inventory or orders
+        :param field: record field
+        :param value: value to match
+        :return: list of record dicts
+        """
+        return [record for record in self.load(data_type) if record.get(field) == value]
+
+    def scan(self, data_type):
+        """
+        Iterates over all records of a data type, e.g. for an export. Engines that can read records
+        one at a time do so without loading the whole data type.
+        :param data_type: accounts, inventory or orders
+        :return: iterator of record dicts
+        """
+        return iter(self.load(data_type))
+
+    def close(self):
+        """
+        Releases resources held by the engine.
+        """
+
+
+class JsonStorageEngine(StorageEngine):
+    """
+    Storage engine keeping each data type in its JSON file, served through the data store.
+    Accounts and orders are written through an append-only journal, inventory is rewritten atomically.
+    """
+
+    # data types persisted through an append-only journal
+    journaled = ("accounts", "orders")
+
+    def __init__(self, debug=False):
+        """
+        :param debug: debug flag for testing, loads the test data files
+        """
+        self.debug = debug
+        self._journals = {}
+        self._lock = threading.Lock()
+
+    def get_journal(self, data_type):
+        """
+        Returns the append-only journal of a journaled data type.
+        :param data_type: type of data
+        :return: RecordJournal instance, or None if the data type is not journaled
+        """
+        if data_type not in self.journaled:
+            return None
+        with self._lock:
+            if data_type not in self._journals:
+                self._journals[data_type] = RecordJournal(
+                    get_data_path(data_type, self.debug), RECORD_KEYS[data_type]
+                )
+            return self._journals[data_type]
+
+    def load(self, data_type):
+        path = get_data_path(data_type, self.debug)
+        journal = self.get_journal(data_type)
+        if journal is None:
+            return data_store.get(path)
+        # merged view of the snapshot file and the changes appended since the last compaction
+        return data_store.get(path, loader=journal.load, watch=journal.files)
+
+    def version(self, data_type):
+        journal = self.get_journal(data_type)
+        return file_signature(journal.files if journal else (get_data_path(data_type, self.debug),))
+
+    def write(self, data_type, entries, merged=None, durable=False):
+        path = get_data_path(data_type, self.debug)
+        journal = self.get_journal(data_type)
+        if journal is None:
+            records = apply_entries(list(self.load(data_type)), entries, RECORD_KEYS[data_type])
+            write_json_atomic(path, records)
+            data_store.update(path, records)
+            return False
+        handed_over = False
+        if entries:
+            before, after = journal.append_entries(entries, fsync=durable)
+            if merged is not None:
+                # only hand over the in-memory list if nobody else changed the files before the write. The
+                # list is cached with the signature taken right after the write under the journal lock, so
+                # appends of other processes after that still invalidate it.
+                handed_over = data_store.update(
+                    path, merged, watch=journal.files, expected=before, signature=after
+                )
+        if journal.needs_compaction():
+            self.compact(data_type)
+            handed_over = False
+        return handed_over
+
+    def compact(self, data_type):
+        journal = self.get_journal(data_type)
+        if journal is not None:
+            records, signature = journal.compact()
+            data_store.update(
+                get_data_path(data_type, self.debug), records, watch=journal.files, signature=signature
+            )
+
+
+class SQLiteStorageEngine(StorageEngine):
+    """
+    Embedded SQLite storage engine.
+    Each record is stored as its JSON document next to the indexed lookup columns. The database runs
+    in WAL mode so readers are not blocked by writers, and all statements are parameterised constant
+    SQL, which the sqlite3 module prepares once and reuses from its statement cache.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS accounts ("
+        " seq INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE,"
+        " email_address TEXT, account_id TEXT, data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS accounts_email ON accounts (email_address)",
+        "CREATE INDEX IF NOT EXISTS accounts_id ON accounts (account_id)",
+        "CREATE TABLE IF NOT EXISTS inventory ("
+        " seq INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, name TEXT, data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS inventory_name ON inventory (name)",
+        "CREATE TABLE IF NOT EXISTS orders ("
+        " seq INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE,"
+        " account_number TEXT, status TEXT, data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS orders_account_number ON orders (account_number)",
+    )
+
+    # extra indexed columns of each table, filled from the record fields of the same name
+    columns = {
+        "accounts": ("email_address", "account_id"),
+        "inventory": ("name",),
+        "orders": ("account_number", "status"),
+    }
+
+    def __init__(self, path="data/eshop.db"):
+        """
+        Opens (and creates if necessary) the database.
+        :param path: path of the SQLite database file
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._lock = threading.RLock()
+        # data type -> (version, records)
+        self._cache = {}
+        self._generation = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                for statement in self.schema:
+                    self._conn.execute(statement)
+
+    def load(self, data_type):
+        self._check_type(data_type)
+        with self._lock:
+            version = self._version()
+            cached = self._cache.get(data_type)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            rows = self._conn.execute(f"SELECT data FROM {data_type} ORDER BY seq")
+            records = [json.loads(data) for (data,) in rows]
+            self._cache[data_type] = (version, records)
+            return records
+
+    def version(self, data_type):
+        self._check_type(data_type)
+        with self._lock:
+            return self._version()
+
+    def write(self, data_type, entries, merged=None, durable=False):
+        self._check_type(data_type)
+        columns = self.columns[data_type]
+        upsert = (
+            f"INSERT INTO {data_type} (key, {', '.join(columns)}, data)"
+            f" VALUES (?, {', '.join('?' for _ in columns)}, ?)"
+            f" ON CONFLICT (key) DO UPDATE SET"
+            f" {', '.join(f'{column} = excluded.{column}' for column in columns)},"
+            f" data = excluded.data"
+        )
+        delete = f"DELETE FROM {data_type} WHERE key = ?"
+        key_field = RECORD_KEYS[data_type]
+        with self._lock:
+            cached = self._cache.get(data_type)
+            up_to_date = cached is not None and cached[0] == self._version()
+            if durable:
+                # in WAL mode only synchronous=FULL syncs the log on every commit
+                self._conn.execute("PRAGMA synchronous=FULL")
+            try:
+                with self._conn:
+                    for entry in entries:
+                        if entry["op"] == "put":
+                            self._conn.execute(upsert, self._row(entry["record"], key_field, columns))
+                        elif entry["op"] == "delete":
+                            self._conn.execute(delete, (record_key(entry["key"]),))
+            finally:
+                if durable:
+                    self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._generation += 1
+            self._cache.pop(data_type, None)
+            if merged is not None and up_to_date:
+                self._cache[data_type] = (self._version(), merged)
+                return True
+            return False
+
+    def insert_many(self, data_type, records):
+        """
+        Bulk inserts records in one transaction, replacing records with the same key.
+        :param data_type: accounts, inventory or orders
+        :param records: iterable of record dicts
+        :return: number of inserted records
+        """
+        self._check_type(data_type)
+        columns = self.columns[data_type]
+        key_field = RECORD_KEYS[data_type]
+        insert = (
+            f"INSERT OR REPLACE INTO {data_type} (key, {', '.join(columns)}, data)"
+            f" VALUES (?, {', '.join('?' for _ in columns)}, ?)"
+        )
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.executemany(
+                    insert, (self._row(record, key_field, columns) for record in records)
+                )
+            self._generation += 1
+            self._cache.pop(data_type, None)
+            return cursor.rowcount
+
+    def find(self, data_type, field, value):
+        self._check_type(data_type)
+        if field == RECORD_KEYS[data_type]:
+            column, value = "key", record_key(value)
+        elif field in self.columns[data_type]:
+            column = field
+        else:
+            return super().find(data_type, field, value)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM {data_type} WHERE {column} = ? ORDER BY seq", (value,)
+            )
+            return [json.loads(data) for (data,) in rows]
+
+    def scan(self, data_type):
+        self._check_type(data_type)
+        # a connection of its own reads a consistent snapshot without holding the engine lock
+        conn = sqlite3.connect(self.path)
+        try:
+            for (data,) in conn.execute(f"SELECT data FROM {data_type} ORDER BY seq"):
+                yield json.loads(data)
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _version(self):
+        # data_version changes when another connection commits, the generation on our own commits
+        (data_version,) = self._conn.execute("PRAGMA data_version").fetchone()
+        return data_version, self._generation
+
+    def _check_type(self, data_type):
+        # table names cannot be bound as parameters, so only known data types are accepted
+        if data_type not in RECORD_KEYS:
+            raise ValueError("No such data exists.")
+
+    @staticmethod
+    def _row(record, key_field, columns):
+        values = [record.get(column) for column in columns]
+        return (
+            record_key(record[key_field]),
+            *(None if value is None else str(value) for value in values),
+            json.dumps(record),
+        )
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def create_storage_engine():
+    """
+    Creates the storage engine configured through the ESHOP_STORAGE environment variable,
+    "json" (default) or "sqlite". The SQLite database path can be set with ESHOP_SQLITE_PATH.
+    :return: StorageEngine instance
+    """
+    engine = os.environ.get("ESHOP_STORAGE", "json").lower()
+    if engine == "json":
+        return JsonStorageEngine()
+    elif engine == "sqlite":
+        return SQLiteStorageEngine(os.environ.get("ESHOP_SQLITE_PATH", "data/eshop.db"))
+    raise ValueError(f"Unknown storage engine: {engine}")
+
+
+def get_storage_engine(debug=False):
+    """
+    Returns the process-wide storage engine. Test data is always read from the JSON test files.
+    :param debug: debug flag for testing
+    :return: StorageEngine instance
+    """
+    with _engines_lock:
+        if debug not in _engines:
+            _engines[debug] = JsonStorageEngine(debug=True) if debug else create_storage_engine()
+        return _engines[debug]
+
+
+def set_storage_engine(engine, debug=False):
+    """
+    Replaces the process-wide storage engine, e.g. to run the shop on a specific database.
+    :param engine: StorageEngine instance
+    :param debug: debug flag for testing
+    """
+    with _engines_lock:
+        _engines[debug] = engine
@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import jwt
+from secret_keys import get_keyring
+
+logger = logging.getLogger("EShopApp")
+
+ALGORITHM = "HS256"
+# registered claims every token must carry
+REQUIRED_CLAIMS = ("exp", "nbf", "iat")
+
+
+def issue_token(claims, lifetime=None, keyring=None):
+    """
+    Signs a JSON web token with the current signing key, valid from now for its lifetime.
+    :param claims: dict of claims, e.g. user_email, role and account_number
+    :param lifetime: seconds the token is valid, ESHOP_JWT_LIFETIME or one hour by default
+    :param keyring: Keyring to sign with, the process-wide keyring by default
+    :return: encoded token string
+    """
+    if lifetime is None:
+        lifetime = int(os.environ.get("ESHOP_JWT_LIFETIME", "3600"))
+    now = int(time.time())
+    payload = dict(claims, iat=now, nbf=now, exp=now + lifetime)
+    return jwt.encode(payload, (keyring or get_keyring()).jwt_signing_key(), algorithm=ALGORITHM)
+
+
+class TokenVerifier:
+    """
+    Verifies HS256 JSON web tokens against the current and previous signing keys, and checks their
+    expiry and not-before times. Verified tokens are kept in a bounded cache, so repeated requests with
+    the same token only compare timestamps instead of computing the HMAC and decoding the JSON again.
+    Everything needed to verify is in the token and the keys file, so any worker process can authorise
+    a request without shared session state.
+    """
+
+    def __init__(self, keyring=None, max_entries=4096, cache_ttl=300.0, leeway=5):
+        """
+        :param keyring: Keyring holding the signing keys, the process-wide keyring by default
+        :param max_entries: maximum number of cached tokens
+        :param cache_ttl: seconds a verified token is trusted before its signature is checked again
+        :param leeway: seconds of clock skew tolerated on exp and nbf
+        """
+        self.keyring = keyring
+        self.max_entries = max_entries
+        self.cache_ttl = cache_ttl
+        self.leeway = leeway
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token):
+        """
+        Verifies a token and returns its claims.
+        :param token: encoded token string
+        :return: dict of claims
+        :raises jwt.InvalidTokenError: if the token is malformed, forged, expired or not yet valid
+        """
+        keyring = self.keyring or get_keyring()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None:
+                claims, key, valid_until = entry
+                if now < valid_until and key in keyring.jwt_verification_keys():
+                    self._cache.move_to_end(token)
+                    self.hits += 1
+                    return claims
+                del self._cache[token]
+            self.misses += 1
+        claims, key = self._decode(token, keyring)
+        # cached until the token expires or the cache TTL ends, whichever comes first
+        valid_until = min(claims["exp"] + self.leeway, now + self.cache_ttl)
+        with self._lock:
+            self._cache[token] = (claims, key, valid_until)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return claims
+
+    def role(self, token):
+        """
+        Derives the role of a token's account from its claims.
+        :param token: encoded token string
+        :return: role string, or None if the token is invalid
+        """
+        try:
+            return self.verify(token).get("role")
+        except jwt.InvalidTokenError as e:
+            logger.warning("Rejected JSON web token: %s", e)
+            return None
+
+    def clear(self):
+        """
+        Drops all cached tokens.
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def _decode(self, token, keyring):
+        error = jwt.InvalidSignatureError("No signing key configured")
+        for key in keyring.jwt_verification_keys():
+            if not key:
+                continue
+            try:
+                claims = jwt.decode(
+                    token,
+                    key,
+                    algorithms=[ALGORITHM],
+                    options={"require": list(REQUIRED_CLAIMS)},
+                    leeway=self.leeway,
+                )
+                return claims, key
+            except jwt.InvalidSignatureError as e:
+                # signed with a different key, try the previous keys
+                error = e
+        raise error
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_token_verifier():
+    """
+    Returns the process-wide token verifier.
+    :return: TokenVerifier instance
+    """
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = TokenVerifier()
+        return _verifier
@@ -0,0 +1,130 @@
+import re
+import string
+
+# minimum password length of the strength check
+PASSWORD_MIN_LENGTH = 8
+PASSWORD_SPECIAL_CHARACTERS = frozenset("@!$&.")
+
+# the insecure pattern is catastrophically backtracking on purpose, it demonstrates a ReDoS attack
+# when the application runs with security disabled
+# Regex source for evil pattern: DZone https://dzone.com/articles/regular-expressions-denial
+INSECURE_EMAIL_PATTERN = re.compile(
+    r"^([0-9a-za-z]([-.\w]*[0-9a-za-z])*@([0-9a-za-z][-\w]*[0-9a-za-z]\.)+[a-za-z]{2,9})$"
+)
+# the secure pattern, kept for reference and for the benchmark, is_valid_email implements it without
+# backtracking
+# Regex source for safe pattern: GeeksForGeeks https://www.geeksforgeeks.org/check-if-email-address-valid-or-not-in-python/
+SECURE_EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+_LETTERS = frozenset(string.ascii_letters)
+_LOCAL_CHARACTERS = frozenset(string.ascii_letters + string.digits + "._%+-")
+_DOMAIN_CHARACTERS = frozenset(string.ascii_letters + string.digits + ".-")
+_UPPERCASE = frozenset(string.ascii_uppercase)
+_LOWERCASE = frozenset(string.ascii_lowercase)
+
+
+def is_valid_email(email):
+    """
+    Checks an e-mail address against the secure pattern in linear time.
+    The pattern ^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}$ accepts exactly the addresses whose
+    part before the only "@" is a non-empty run of local characters, and whose domain consists of domain
+    characters with a last "." that has at least one character before it and only two or more letters
+    after it, as the letters of the top level domain cannot contain a ".". Each character is looked at
+    a constant number of times, so no input can make the check backtrack.
+    :param email: email address string
+    :return: bool if the address matches
+    """
+    local, at, domain = email.partition("@")
+    if not at or not local or not _LOCAL_CHARACTERS.issuperset(local):
+        return False
+    if not _DOMAIN_CHARACTERS.issuperset(domain):
+        return False
+    dot = domain.rfind(".")
+    top_level = domain[dot + 1:]
+    return dot >= 1 and len(top_level) >= 2 and _LETTERS.issuperset(top_level)
+
+
+def is_valid_email_insecure(email):
+    """
+    Checks an e-mail address against the insecure, backtracking pattern. Crafted input such as
+    "a" * 30 + "!" takes exponential time, this is intentional for the ReDoS demonstration.
+    :param email: email address string
+    :return: bool if the address matches
+    """
+    return INSECURE_EMAIL_PATTERN.fullmatch(email) is not None
+
+
+def is_strong_password(password):
+    """
+    Checks password strength in a single pass: at least 8 characters, an uppercase and a lowercase
+    letter, a digit and one of @!$&. are required. Digits are decimal digits of any script, as matched by
+    the \\d of the previous regex check.
+    :param password: password string
+    :return: bool if the password is strong
+    """
+    if len(password) < PASSWORD_MIN_LENGTH:
+        return False
+    upper = lower = digit = special = False
+    for character in password:
+        if character in _UPPERCASE:
+            upper = True
+        elif character in _LOWERCASE:
+            lower = True
+        elif character in PASSWORD_SPECIAL_CHARACTERS:
+            special = True
+        elif character.isdecimal():
+            digit = True
+        else:
+            continue
+        if upper and lower and digit and special:
+            return True
+    return False
+
+
+def validate_emails(emails, secure=True):
+    """
+    Validates a batch of e-mail addresses, e.g. for an account import.
+    :param emails: iterable of email address strings
+    :param secure: use the linear-time check, otherwise the insecure pattern
+    :return: list of bools in the order of the addresses
+    """
+    check = is_valid_email if secure else is_valid_email_insecure
+    return [isinstance(email, str) and check(email) for email in emails]
+
+
+def validate_passwords(passwords, secure=True):
+    """
+    Validates the strength of a batch of passwords.
+    :param passwords: iterable of password strings
+    :param secure: apply the strength check, every password passes if False
+    :return: list of bools in the order of the passwords
+    """
+    if not secure:
+        return [True for _ in passwords]
+    return [isinstance(password, str) and is_strong_password(password) for password in passwords]
+
+
+def validate_accounts(accounts, secure=True, email_field="email_address", password_field="password"):
+    """
+    Validates the e-mail addresses and passwords of a batch of account records. Records without a
+    password field are only checked for their e-mail address.
+    :param accounts: iterable of account dicts
+    :param secure: secure functionality bool
+    :param email_field: field holding the e-mail address
+    :param password_field: field holding the plain text password
+    :return: list of error message lists in the order of the accounts, empty if a record is valid
+    """
+    check_email = is_valid_email if secure else is_valid_email_insecure
+    results = []
+    for account in accounts:
+        errors = []
+        email = account.get(email_field)
+        if not isinstance(email, str) or not check_email(email):
+            errors.append(f"Invalid email address: {email}")
+        password = account.get(password_field)
+        if password is not None and secure and (
+            not isinstance(password, str) or not is_strong_password(password)
+        ):
+            errors.append("Password does not match the requirements.")
+        results.append(errors)
+    return results
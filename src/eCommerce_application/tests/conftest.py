@@ -0,0 +1,6 @@
+import os
+import sys
+
+# application modules import each other by module name as the app is run from within eCommerceApp/,
+# so that directory has to be importable when the tests import eCommerceApp.<module>
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "eCommerceApp"))
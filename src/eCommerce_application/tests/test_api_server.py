@@ -0,0 +1,33 @@
+from eCommerceApp.api_server import ApiServer
+from flask import Flask
+import requests
+import pytest
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+
+    @app.route("/ping")
+    def ping():
+        return "pong"
+
+    return app
+
+
+def test_server_ready_without_sleeping(app):
+    """
+    Tests that the server accepts requests as soon as start() returns and stops gracefully.
+    """
+    server = ApiServer(app, port=0, workers=2)
+    assert server.start() is True
+    try:
+        with requests.Session() as session:
+            for _ in range(3):
+                assert session.get(f"{server.url}/ping", timeout=5).text == "pong"
+        assert server.startup_ms < 1000
+    finally:
+        server.stop()
+
+    with pytest.raises(requests.ConnectionError):
+        requests.get(f"{server.url}/ping", timeout=1)
@@ -0,0 +1,70 @@
+from eCommerceApp import async_controllers
+from eCommerceApp.async_controllers import AsyncEShopController
+from eCommerceApp.http_client import ApiResponse
+import asyncio
+import logging
+
+
+class StubClient:
+    def __init__(self):
+        self.etags = []
+
+    def get_orders(self, etag=None):
+        self.etags.append(etag)
+        if etag == '"v1"':
+            return ApiResponse(304, etag=etag)
+        return ApiResponse(200, [{"order_id": "0000001"}], '"v1"')
+
+
+def test_role_required_on_coroutines(monkeypatch):
+    """
+    Tests that the async controller shares role-based access control and ETag revalidation.
+    """
+    client = StubClient()
+    monkeypatch.setattr(async_controllers, "get_api_client", lambda: client)
+    controller = AsyncEShopController()
+
+    controller.model.account.role = "user"
+    assert asyncio.run(controller.get_all_orders()) is None
+    assert client.etags == []
+
+    controller.model.account.role = "clerk"
+    first = asyncio.run(controller.get_all_orders())
+    assert asyncio.run(controller.get_all_orders()) is first
+    assert client.etags == [None, '"v1"']
+
+
+def test_registration_shares_validation():
+    """
+    Tests that concurrent registrations are validated with the same e-mail and password checks.
+    """
+    async def register(email):
+        controller = AsyncEShopController()
+        try:
+            await controller.model.register_account(email, "weak", "", "", "", "", "", "")
+        except ValueError as e:
+            return str(e)
+
+    async def main():
+        return await asyncio.gather(register("not-an-email"), register("valid@gmail.com"))
+
+    invalid, weak = asyncio.run(main())
+    assert invalid.startswith("Invalid email address")
+    assert weak == "Password does not match the requirements."
+
+
+def test_delete_account_reports_missing_account(monkeypatch, caplog):
+    """
+    Tests that deleting an unknown account is reported as not found instead of as deleted.
+    """
+    class Repository:
+        def delete_by_id(self, account_id):
+            return None
+
+    monkeypatch.setattr(async_controllers, "get_account_repository", Repository)
+    controller = AsyncEShopController()
+    controller.model.account.role = "admin"
+
+    with caplog.at_level(logging.INFO, logger="EShopApp"):
+        assert asyncio.run(controller.delete_account("99")) is False
+    assert [record.getMessage() for record in caplog.records] == ["No account found with the ID 99."]
@@ -0,0 +1,38 @@
+import os
+from benchmarks.generators import generate_orders, resolve_size
+from benchmarks import run_benchmarks
+from benchmarks.run_benchmarks import compare_results, run_suite
+import pytest
+
+
+def test_generators_are_reproducible():
+    """
+    Tests that the synthetic data of a seed is the same on every run.
+    """
+    assert resolve_size("100k") == 100_000 and resolve_size("250") == 250
+    orders = generate_orders(50, accounts=10, items=20, seed=3)
+    assert orders == generate_orders(50, accounts=10, items=20, seed=3)
+    assert {order["order_id"] for order in orders} == {f"{number:07d}" for number in range(1, 51)}
+
+
+def test_suite_runs_in_isolation_and_detects_regressions():
+    """
+    Tests that the suite runs on its own data and ID allocators in a temporary directory and that the baseline
+    comparison reports slower benchmarks only.
+    """
+    directory = os.getcwd()
+    helper_funcs = run_benchmarks.helper_funcs
+    allocators = (helper_funcs.account_number_allocator, helper_funcs.order_number_allocator)
+    results = run_suite(size=200, repeat=1, only=["get_data_cold", "search_orders", "api_orders"])
+
+    assert os.getcwd() == directory
+    assert (helper_funcs.account_number_allocator, helper_funcs.order_number_allocator) == allocators
+    assert set(results["benchmarks"]) == {"get_data_cold", "search_orders", "api_orders"}
+    assert all(timing["median_s"] > 0 for timing in results["benchmarks"].values())
+
+    baseline = {"records": 200, "benchmarks": {name: dict(timing) for name, timing in results["benchmarks"].items()}}
+    baseline["benchmarks"]["search_orders"]["median_s"] /= 2
+    regressions = compare_results(results, baseline, threshold=0.5)
+    assert [regression["benchmark"] for regression in regressions] == ["search_orders"]
+    with pytest.raises(ValueError):
+        compare_results(results, {"records": 10_000, "benchmarks": {}})
@@ -0,0 +1,99 @@
+import io
+import json
+from eCommerceApp import bulk_io
+from eCommerceApp.bulk_io import export_records, import_records, iter_json_records
+from eCommerceApp.helper_funcs import get_secret_key
+from eCommerceApp.password_service import PasswordHasher
+from eCommerceApp.storage import JsonStorageEngine, SQLiteStorageEngine
+from cryptography.fernet import Fernet
+import bcrypt
+import pytest
+
+
+@pytest.fixture
+def cipher_suite():
+    return Fernet(get_secret_key("test_data_encryption_key", debug=True))
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    hasher = PasswordHasher(rounds=4, max_workers=2, max_pending=4)
+    monkeypatch.setattr(bulk_io, "get_password_hasher", lambda: hasher)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_incremental_parsing():
+    """
+    Tests that JSON arrays and NDJSON are parsed record by record across chunk boundaries.
+    """
+    records = [{"item_id": f"{number:07d}", "name": "Shampoo é [1], {2}"} for number in range(50)]
+    array = json.dumps(records, indent=2)
+    ndjson = "\n".join(json.dumps(record) for record in records) + "\n"
+
+    assert list(iter_json_records(io.StringIO(array), read_size=7)) == records
+    assert list(iter_json_records(io.StringIO(ndjson), read_size=7)) == records
+    assert list(iter_json_records(io.StringIO("  [ ]\n"))) == []
+    for invalid in ('[{"a": 1} {"a": 2}]', '[{"a": 1},', '{"a": 1}\n[1]', '{"a": '):
+        with pytest.raises(ValueError):
+            list(iter_json_records(io.StringIO(invalid), read_size=3))
+
+
+def test_account_import_and_export(tmp_path, hasher, cipher_suite):
+    """
+    Tests that valid accounts are imported with hashed passwords and encrypted details, invalid ones are
+    reported, and an exported file can be imported again without encrypting twice.
+    """
+    engine = SQLiteStorageEngine(str(tmp_path / "eshop.db"))
+    source = "\n".join(
+        json.dumps(account)
+        for account in [
+            {"account_number": "000335", "email_address": "annasmith@gmail.com", "password": "SsDMoDuLe123!.",
+             "name": "Anna", "address": {"line1": "60 Acorn Place", "line2": "", "postcode": "NW85BN"}},
+            {"account_number": "000336", "email_address": "test@email1", "password": "SsDMoDuLe123!."},
+            {"account_number": "000337", "email_address": "georgephil@gmail.com", "password": "weak"},
+            {"account_number": "000338", "email_address": "annasmith@gmail.com", "password": "SsDMoDuLe123!."},
+        ]
+    )
+    report = import_records("accounts", io.StringIO(source), batch_size=2, engine=engine, cipher=cipher_suite)
+
+    assert (report["read"], report["imported"], report["rejected"]) == (4, 1, 3)
+    assert [error["record"] for error in report["errors"]] == [2, 3, 4]
+    assert report["records_per_second"] > 0
+    (account,) = engine.load("accounts")
+    assert bcrypt.checkpw(b"SsDMoDuLe123!.", account["secure_password"].encode("utf-8"))
+    assert "password" not in account
+    assert cipher_suite.decrypt(account["name"].encode("utf-8")) == b"Anna"
+    assert cipher_suite.decrypt(account["address"]["line1"].encode("utf-8")) == b"60 Acorn Place"
+
+    exported = io.StringIO()
+    assert export_records("accounts", exported, ndjson=True, engine=engine)["exported"] == 1
+    report = import_records("accounts", io.StringIO(exported.getvalue()), engine=engine, cipher=cipher_suite)
+    assert report["imported"] == 1
+    (reimported,) = engine.load("accounts")
+    assert reimported["secure_password"] == account["secure_password"]
+    assert cipher_suite.decrypt(reimported["name"].encode("utf-8")) == b"Anna"
+    engine.close()
+
+
+def test_json_storage_import(tmp_path, monkeypatch):
+    """
+    Tests that inventory and orders are validated and written through the JSON storage engine.
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    for data_type in ("inventory", "orders"):
+        (tmp_path / "data" / f"{data_type}.json").write_text("[]")
+    engine = JsonStorageEngine()
+    items = [{"item_id": f"{number:07d}", "price": "2.99", "quantity": "20"} for number in range(1, 6)]
+    items.append({"item_id": "0000006", "price": "free", "quantity": "1"})
+    orders = [
+        {"order_id": "0000001", "account_number": "000335", "order_items": [{"item_id": "0000001", "quantity": 2}]},
+        {"order_id": "0000002", "account_number": "000335", "order_items": [{"item_id": "0000001"}]},
+    ]
+
+    assert import_records("inventory", io.StringIO(json.dumps(items)), batch_size=2, engine=engine)["imported"] == 5
+    assert import_records("orders", io.StringIO(json.dumps(orders)), engine=engine)["rejected"] == 1
+    assert [item["item_id"] for item in JsonStorageEngine().load("inventory")] == [f"{n:07d}" for n in range(1, 6)]
+    (order,) = JsonStorageEngine().load("orders")
+    assert order["order_items"] == [{"item_id": "0000001", "quantity": 2}] and order["status"] == ""
@@ -0,0 +1,54 @@
+import json
+import os
+from eCommerceApp.data_store import DataStore
+import pytest
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "orders.json"
+    path.write_text(json.dumps([{"order_id": "0000001"}]))
+    return str(path)
+
+
+def test_data_parsed_once(data_file):
+    """
+    Tests that repeated reads of an unchanged file are served from the cache.
+    """
+    store = DataStore()
+    first = store.get(data_file)
+    second = store.get(data_file)
+
+    assert first is second
+    assert store.stats() == {"hits": 1, "misses": 1, "reloads": 0, "entries": 1}
+
+
+def test_data_reloaded_on_change(data_file):
+    """
+    Tests that a changed file is parsed again.
+    """
+    store = DataStore()
+    store.get(data_file)
+    with open(data_file, "w") as f:
+        json.dump([{"order_id": "0000001"}, {"order_id": "0000002"}], f)
+
+    assert len(store.get(data_file)) == 2
+    assert store.stats()["reloads"] == 1
+
+
+def test_least_recently_used_evicted(tmp_path):
+    """
+    Tests that the cache never holds more files than its limit.
+    """
+    store = DataStore(max_entries=2)
+    paths = []
+    for i in range(3):
+        path = os.path.join(tmp_path, f"{i}.json")
+        with open(path, "w") as f:
+            json.dump([i], f)
+        paths.append(path)
+        store.get(path)
+
+    assert store.stats()["entries"] == 2
+    store.get(paths[0])
+    assert store.stats()["misses"] == 4
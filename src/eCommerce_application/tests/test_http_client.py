@@ -0,0 +1,77 @@
+from eCommerceApp import api_server, http_client
+from eCommerceApp.api_server import ApiServer
+from eCommerceApp.http_client import ApiClient
+import pytest
+
+
+class StaticVersionEngine:
+    current = 1
+
+    def version(self, data_type):
+        return self.current
+
+
+@pytest.fixture
+def orders(monkeypatch):
+    orders = [
+        {"account_number": "000335", "order_id": f"{number:07d}", "status": "placed"}
+        for number in range(1, 101)
+    ]
+    monkeypatch.setattr(api_server, "get_data", lambda data_type: orders)
+    monkeypatch.setattr(http_client, "get_data", lambda data_type: orders)
+    monkeypatch.setattr(api_server, "get_storage_engine", StaticVersionEngine)
+    monkeypatch.setattr(http_client, "get_storage_engine", StaticVersionEngine)
+    monkeypatch.setattr(StaticVersionEngine, "current", 1)
+    return orders
+
+
+def test_client_gzip_and_conditional_get(orders):
+    """
+    Tests that the pooled client receives compressed responses and revalidates with the ETag.
+    """
+    server = ApiServer(port=0, workers=2)
+    server.start()
+    client = ApiClient(server.url, in_process=False)
+    try:
+        response = client.get_orders()
+        assert response.status_code == 200
+        assert response.data == orders
+        raw = client.session.get(f"{server.url}/api/orders", stream=True, timeout=5)
+        assert raw.headers["Content-Encoding"] == "gzip"
+        raw.close()
+        assert client.get_orders(etag=response.etag).status_code == 304
+        bad = client.get_orders(cursor="not-a-cursor")
+        assert bad.status_code == 400 and "error" in bad.data
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_client_skips_http_in_process(orders):
+    """
+    Tests that requests to a server running in this process are answered without HTTP, with an ETag
+    that is revalidated until the orders change.
+    """
+    # the client looks for servers of the api_server module it imported, which is not eCommerceApp.api_server
+    server = http_client.api_server.ApiServer(port=0, workers=2)
+    server.start()
+    client = ApiClient(server.url)
+    # fails the test if a request is sent over HTTP
+    client.session.get = None
+    try:
+        response = client.get_orders(limit=10)
+        assert response.status_code == 200
+        assert response.data["orders"] == orders[:10]
+        assert response.etag
+
+        assert client.get_orders(etag=response.etag, limit=10).status_code == 304
+        assert client.get_orders(etag=response.etag, limit=20).status_code == 200
+        StaticVersionEngine.current = 2
+        changed = client.get_orders(etag=response.etag, limit=10)
+        assert changed.status_code == 200 and changed.etag != response.etag
+        bad = client.get_orders(cursor="not-a-cursor")
+        assert bad.status_code == 400 and "error" in bad.data
+    finally:
+        client.close()
+        server.stop()
+    assert client._local_server() is None
@@ -0,0 +1,40 @@
+import threading
+from eCommerceApp.id_allocator import IdAllocator
+
+
+def test_ids_continue_after_existing_data(tmp_path):
+    """
+    Tests that the first ID follows the highest ID recovered from the data.
+    """
+    allocator = IdAllocator(str(tmp_path / "orders.hwm"), lambda: 41, block_size=4)
+
+    assert [allocator.next_id() for _ in range(6)] == [42, 43, 44, 45, 46, 47]
+
+
+def test_no_duplicate_ids_under_parallel_load(tmp_path):
+    """
+    Tests that threads sharing an allocator and allocators sharing a file (as separate processes would)
+    never hand out the same ID.
+    """
+    path = str(tmp_path / "accounts.hwm")
+    allocators = [IdAllocator(path, lambda: 0, block_size=8) for _ in range(3)]
+    ids = []
+    ids_lock = threading.Lock()
+
+    def allocate(allocator):
+        allocated = [allocator.next_id() for _ in range(200)]
+        with ids_lock:
+            ids.extend(allocated)
+
+    threads = [
+        threading.Thread(target=allocate, args=(allocator,))
+        for allocator in allocators
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(ids) == 1200
+    assert len(set(ids)) == 1200
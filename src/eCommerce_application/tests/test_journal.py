@@ -0,0 +1,39 @@
+import json
+from eCommerceApp.journal import RecordJournal
+import pytest
+
+
+@pytest.fixture
+def journal(tmp_path):
+    snapshot = tmp_path / "accounts.json"
+    snapshot.write_text(json.dumps([{"account_number": "000001", "name": "Anna"}]))
+    return RecordJournal(str(snapshot), "account_number", fsync_every=2, compact_every=3)
+
+
+def test_journal_merged_view(journal):
+    """
+    Tests that appended changes are replayed on top of the snapshot.
+    """
+    journal.put({"account_number": 2, "name": "George"})
+    journal.put({"account_number": 1, "name": "Anna Smith"})
+    journal.delete(2)
+
+    assert journal.load() == [{"account_number": 1, "name": "Anna Smith"}]
+
+
+def test_journal_compaction(journal):
+    """
+    Tests that compaction moves the journal into the snapshot without changing the merged view.
+    """
+    for number in range(2, 5):
+        journal.put({"account_number": number, "name": ""})
+    journal.load()
+    assert journal.needs_compaction()
+
+    merged, _ = journal.compact()
+
+    with open(journal.snapshot_path) as f:
+        assert json.load(f) == merged
+    with open(journal.journal_path) as f:
+        assert f.read() == ""
+    assert len(journal.load()) == 4
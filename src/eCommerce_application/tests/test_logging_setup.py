@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+from eCommerceApp.logging_setup import DeferredQueueHandler, configure_logging, shutdown_logging
+import pytest
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    shutdown_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_json_lines_written_in_background(root_logger, tmp_path):
+    """
+    Tests that records are formatted on the listener thread as JSON lines with their extra fields,
+    and that debug records are sampled per message.
+    """
+    log_file = tmp_path / "app.log"
+    configure_logging(filename=str(log_file), debug_sample_rate=10)
+    logger = logging.getLogger("EShopApp")
+    for number in range(25):
+        logger.debug("Price index rebuilt for %d items.", number)
+    logger.info("Order %s placed.", "0000001", extra={"account_number": "000335"})
+    try:
+        raise ValueError("No item found with this ID.")
+    except ValueError:
+        logger.exception("Order failed.")
+
+    shutdown_logging()
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+
+    assert [entry["message"] for entry in entries if entry["level"] == "DEBUG"] == [
+        f"Price index rebuilt for {number} items." for number in (0, 10, 20)
+    ]
+    placed = entries[3]
+    assert placed["message"] == "Order 0000001 placed." and placed["account_number"] == "000335"
+    assert placed["logger"] == "EShopApp" and placed["function"] == "test_json_lines_written_in_background"
+    assert "ValueError: No item found with this ID." in entries[4]["exception"]
+
+
+def test_size_based_rotation(root_logger, tmp_path):
+    """
+    Tests that the log file is rotated once it reaches the configured size.
+    """
+    log_file = tmp_path / "app.log"
+    configure_logging(filename=str(log_file), json_format=False, max_bytes=1000, backup_count=2)
+    for number in range(100):
+        logging.getLogger("EShopApp").info("Successful login with user%d@gmail.com", number)
+    shutdown_logging()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["app.log", "app.log.1", "app.log.2"]
+    assert log_file.read_text().splitlines()[-1] == "INFO:EShopApp:Successful login with user99@gmail.com"
+
+
+def test_only_own_handlers_replaced(root_logger, tmp_path):
+    """
+    Tests that reconfiguring replaces the module's own queue handler and keeps handlers installed by others.
+    """
+    foreign = logging.NullHandler()
+    root_logger.addHandler(foreign)
+    configure_logging(filename=str(tmp_path / "app.log"))
+    configure_logging(filename=str(tmp_path / "app.log"))
+
+    assert foreign in root_logger.handlers
+    assert sum(isinstance(handler, DeferredQueueHandler) for handler in root_logger.handlers) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork is not available")
+def test_forked_workers_write_own_file(root_logger, tmp_path):
+    """
+    Tests that a forked worker process logs to a file of its own instead of rotating the parent's file.
+    """
+    log_file = tmp_path / "app.log"
+    configure_logging(filename=str(log_file), json_format=False)
+    pid = os.fork()
+    if pid == 0:
+        logging.getLogger("EShopApp").info("Logged by the worker.")
+        shutdown_logging()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    logging.getLogger("EShopApp").info("Logged by the parent.")
+    shutdown_logging()
+
+    assert log_file.read_text().splitlines() == ["INFO:EShopApp:Logged by the parent."]
+    worker_file = tmp_path / f"app.{pid}.log"
+    assert worker_file.read_text().splitlines() == ["INFO:EShopApp:Logged by the worker."]
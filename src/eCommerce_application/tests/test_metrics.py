@@ -0,0 +1,97 @@
+import sys
+from eCommerceApp import api_server, metrics
+from eCommerceApp.password_service import PasswordHasher
+import pytest
+
+
+class StaticVersionEngine:
+    def version(self, data_type):
+        return 1
+
+
+@pytest.fixture
+def enabled():
+    # the app modules import the metrics module by its flat name, which is a module of its own
+    modules = [metrics, sys.modules[api_server.timed.__module__]]
+    for module in modules:
+        module.enable()
+    yield metrics
+    for module in modules:
+        module.enable(False)
+        module.registry.reset()
+
+
+def test_timers_and_quantiles(enabled):
+    """
+    Tests that timed calls, timed blocks, errors and counters are recorded with nearest-rank quantiles.
+    """
+    @metrics.timed("search_inventory")
+    def search(keyword):
+        if keyword is None:
+            raise ValueError("No keyword.")
+        return [keyword]
+
+    assert search("Shampoo") == ["Shampoo"] and search.__name__ == "search"
+    with pytest.raises(ValueError):
+        search(None)
+    with metrics.timer("search_inventory"):
+        pass
+    metrics.increment("orders_not_modified", 2)
+    histogram = metrics.Histogram(window=4)
+    for seconds in (5, 1, 2, 3, 4, 100):
+        histogram.observe(seconds)
+
+    snapshot = metrics.registry.snapshot()
+    assert snapshot["operations"]["search_inventory"]["count"] == 3
+    assert snapshot["operations"]["search_inventory"]["errors"] == 1
+    assert snapshot["counters"] == {"orders_not_modified": 2}
+    # only the latest four observations are kept for the quantiles
+    assert (histogram.count, histogram.sum) == (6, 115)
+    assert histogram.quantiles() == {0.5: 3, 0.95: 100, 0.99: 100}
+
+
+def test_disabled_metrics_record_nothing():
+    """
+    Tests that nothing is recorded while metrics are disabled.
+    """
+    metrics.enable(False)
+    metrics.registry.reset()
+    metrics.timed("get_data")(lambda: None)()
+    metrics.increment("orders_not_modified")
+
+    assert metrics.timer("get_data") is metrics.timer("fetch_orders")
+    assert metrics.registry.snapshot() == {"counters": {}, "operations": {}}
+
+
+def test_password_hashing_is_timed(enabled):
+    """
+    Tests that bcrypt hashing and verification are timed, also when called through verify_and_rehash.
+    """
+    hasher = PasswordHasher(rounds=4, max_workers=1)
+    try:
+        hashed = hasher.hash("Password1!")
+        assert hasher.verify_and_rehash("Password1!", hashed) == (True, None)
+    finally:
+        hasher.shutdown()
+
+    operations = sys.modules[api_server.timed.__module__].registry.snapshot()["operations"]
+    assert operations["bcrypt_hash"]["count"] == 1
+    assert operations["bcrypt_verify"]["count"] == 1
+
+
+def test_prometheus_endpoint(enabled, monkeypatch):
+    """
+    Tests that the API exposes the latencies of the orders endpoint in the Prometheus text format.
+    """
+    monkeypatch.setattr(api_server, "get_data", lambda data_type: [])
+    monkeypatch.setattr(api_server, "get_storage_engine", StaticVersionEngine)
+    client = api_server.create_app().test_client()
+    for _ in range(3):
+        assert client.get("/api/orders").status_code == 200
+
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    lines = response.get_data(as_text=True).splitlines()
+    assert "# TYPE eshop_operation_duration_seconds summary" in lines
+    assert 'eshop_operation_duration_seconds_count{operation="api_orders"} 3' in lines
+    assert any(line.startswith('eshop_operation_duration_seconds{operation="api_orders",quantile="0.99"}') for line in lines)
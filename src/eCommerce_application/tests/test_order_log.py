@@ -0,0 +1,44 @@
+import json
+from eCommerceApp import order_log
+from eCommerceApp.order_log import OrderWriter
+from eCommerceApp.storage import JsonStorageEngine
+import pytest
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "orders.json").write_text(
+        json.dumps([{"order_id": "0000001", "account_number": "000335", "status": "placed"}])
+    )
+    engine = JsonStorageEngine()
+    monkeypatch.setattr(order_log, "get_storage_engine", lambda debug=False: engine)
+    return engine
+
+
+def test_group_commit_and_compaction(engine, tmp_path):
+    """
+    Tests that acknowledged orders are durable, batched together and compacted into the snapshot.
+    """
+    writer = OrderWriter(compact_interval=3600)
+    futures = [
+        writer.put({"order_id": f"{number:07d}", "account_number": "000298", "status": "placed"})
+        for number in range(2, 52)
+    ]
+    futures.append(writer.delete("0000001"))
+    for future in futures:
+        assert future.result(timeout=10) is None
+    assert writer.entries_written == 51
+    assert writer.batches < 51
+
+    # replaying the journal on a fresh engine restores every acknowledged change
+    orders = JsonStorageEngine().load("orders")
+    assert [order["order_id"] for order in orders] == [f"{number:07d}" for number in range(2, 52)]
+
+    writer.close()
+    with open(tmp_path / "data" / "orders.json") as f:
+        assert len(json.load(f)) == 50
+    assert (tmp_path / "data" / "orders.jsonl").read_text() == ""
+    with pytest.raises(RuntimeError):
+        writer.put({"order_id": "0000099"})
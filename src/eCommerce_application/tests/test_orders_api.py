@@ -0,0 +1,76 @@
+from eCommerceApp.orders_api import OrderQuery, query_orders, stream_orders
+import json
+import pytest
+
+
+@pytest.fixture
+def orders():
+    return [
+        {
+            "account_number": "000335" if number % 2 else "000298",
+            "order_id": f"{number:07d}",
+            "date": f"2024-10-{number:02d}",
+            "status": "placed" if number % 3 else "completed",
+            "total": "1.00",
+            "order_items": [],
+        }
+        for number in range(1, 21)
+    ]
+
+
+def test_cursor_pagination(orders):
+    """
+    Tests that following the cursors returns every order exactly once.
+    """
+    seen = []
+    args = {"limit": "6"}
+    while True:
+        page = query_orders(orders, OrderQuery.from_args(args))
+        seen.extend(order["order_id"] for order in page["orders"])
+        if page["next_cursor"] is None:
+            break
+        args = {"limit": "6", "cursor": page["next_cursor"]}
+
+    assert seen == [order["order_id"] for order in orders]
+
+
+def test_filters_and_projection(orders):
+    """
+    Tests server-side filters and field projection.
+    """
+    query = OrderQuery.from_args(
+        {
+            "account_number": "335",
+            "status": "placed",
+            "date_from": "2024-10-05",
+            "date_to": "2024-10-11",
+            "fields": "order_id,status",
+        }
+    )
+
+    assert query_orders(orders, query) == [
+        {"order_id": "0000005", "status": "placed"},
+        {"order_id": "0000007", "status": "placed"},
+        {"order_id": "0000011", "status": "placed"},
+    ]
+    with pytest.raises(ValueError):
+        OrderQuery.from_args({"limit": "0"})
+    with pytest.raises(ValueError):
+        OrderQuery.from_args({"cursor": "not a cursor"})
+
+
+def test_ndjson_stream(orders):
+    """
+    Tests that streamed orders are serialised one per line.
+    """
+    query = OrderQuery.from_args({"format": "ndjson", "status": "completed"})
+    lines = list(stream_orders(orders, query))
+
+    assert [json.loads(line)["order_id"] for line in lines] == [
+        "0000003",
+        "0000006",
+        "0000009",
+        "0000012",
+        "0000015",
+        "0000018",
+    ]
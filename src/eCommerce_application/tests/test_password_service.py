@@ -0,0 +1,54 @@
+import asyncio
+from eCommerceApp.password_service import PasswordHasher, PasswordServiceBusy, hash_cost
+import bcrypt
+import pytest
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=5, max_workers=2, max_pending=2, submit_timeout=0.05)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify(hasher):
+    """
+    Tests hashing and verification on the worker pool, synchronously and awaited.
+    """
+    hashed = hasher.hash("SsDMoDuLe123!.")
+
+    assert hash_cost(hashed) == 5
+    assert hasher.verify("SsDMoDuLe123!.", hashed) is True
+    assert hasher.verify("admin123", hashed) is False
+    assert asyncio.run(hasher.verify_async("SsDMoDuLe123!.", hashed)) is True
+    assert hasher.metrics()["completed"] == 4
+
+
+def test_rehash_on_outdated_cost(hasher):
+    """
+    Tests that a matching password stored with a lower cost factor is hashed again.
+    """
+    old_hash = bcrypt.hashpw(b"SsDMoDuLe123!.", bcrypt.gensalt(4)).decode("utf-8")
+
+    validated, new_hash = hasher.verify_and_rehash("SsDMoDuLe123!.", old_hash)
+    assert validated is True
+    assert hash_cost(new_hash) == 5
+
+    assert hasher.verify_and_rehash("SsDMoDuLe123!.", new_hash) == (True, None)
+    assert hasher.verify_and_rehash("wrong", old_hash) == (False, None)
+
+
+def test_backpressure(hasher):
+    """
+    Tests that requests beyond the queue limit are rejected once the submit timeout passes.
+    """
+    # occupy every queue slot
+    for _ in range(2):
+        hasher._slots.acquire()
+    try:
+        with pytest.raises(PasswordServiceBusy):
+            hasher.hash("SsDMoDuLe123!.")
+    finally:
+        for _ in range(2):
+            hasher._slots.release()
+    assert hasher.metrics()["rejected"] == 1
@@ -0,0 +1,74 @@
+from eCommerceApp import pricing, records
+from eCommerceApp.pricing import PricingEngine, reprice_open_orders
+import pytest
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    inventory = [
+        {"item_id": "0000001", "price": "2.99", "quantity": "20"},
+        {"item_id": "0000002", "price": "0.10", "quantity": "35"},
+        {"item_id": "0000003", "price": "5.99", "quantity": "2"},
+    ]
+    monkeypatch.setattr(pricing, "get_data", lambda data_type, debug=False: inventory)
+    return PricingEngine()
+
+
+@pytest.fixture
+def orders():
+    return [
+        {"order_id": "0000001", "total": "0.00", "order_items": [{"item_id": "001", "quantity": "3"}]},
+        {"order_id": "0000002", "total": "0.30", "order_items": [{"item_id": "2", "quantity": 3}]},
+        {
+            "order_id": "0000003",
+            "total": "0.00",
+            "order_items": [{"item_id": "0000002", "quantity": "1"}, {"item_id": "0000003", "quantity": "2"}],
+        },
+    ]
+
+
+def test_exact_order_totals(engine):
+    """
+    Tests that totals are exact decimal sums and unknown items are rejected.
+    """
+    assert engine.order_total([{"item_id": "0000002", "quantity": 3}]) == "0.30"
+    assert engine.order_total([]) == "0.00"
+    with pytest.raises(ValueError):
+        engine.price_cents("0000099")
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_batch_repricing(engine, orders, monkeypatch, use_numpy):
+    """
+    Tests that repricing many orders in one pass matches the per-order totals.
+    """
+    if not use_numpy:
+        monkeypatch.setattr(pricing, "numpy", None)
+    elif records.numpy is None:
+        pytest.skip("NumPy is not installed")
+    assert engine.reprice(orders) == [engine.order_total(o["order_items"]) for o in orders]
+    assert engine.reprice(orders, {"0000002": "0.20"}) == ["8.97", "0.60", "12.18"]
+    stale = {"order_id": "0000004", "total": "1.00", "order_items": [{"item_id": "026", "quantity": 1}]}
+    assert engine.reprice([orders[1], stale, orders[0]]) == ["0.30", None, "8.97"]
+
+
+def test_reprice_open_orders(engine, orders):
+    """
+    Tests that only orders whose total changed are saved, and that orders referencing items no longer
+    in the inventory are returned instead of aborting the repricing.
+    """
+    stale = {"order_id": "0000004", "total": "1.00", "order_items": [{"item_id": "026", "quantity": 1}]}
+    orders = orders + [stale]
+
+    class Repository:
+        updates = []
+
+        def find_by_status(self, status):
+            return orders
+
+        def update_many(self, updates):
+            self.updates.extend((order_id, changes["total"]) for order_id, changes in updates.items())
+
+    repository = Repository()
+    assert reprice_open_orders(engine=engine, repository=repository) == (2, [stale])
+    assert repository.updates == [("0000001", "8.97"), ("0000003", "12.08")]
@@ -0,0 +1,51 @@
+from eCommerceApp.helper_funcs import get_secret_key
+from eCommerceApp.record_crypto import decrypt_records, encrypt_records, lazy_decrypt
+from cryptography.fernet import Fernet
+import pytest
+
+
+@pytest.fixture
+def cipher_suite():
+    return Fernet(get_secret_key("test_data_encryption_key", debug=True))
+
+
+@pytest.fixture
+def accounts():
+    return [
+        {
+            "account_number": str(number),
+            "email_address": f"user{number}@gmail.com",
+            "name": "Anna",
+            "surname": "Smith",
+            "address": {"line1": "60 Acorn Place", "line2": "", "postcode": "NW85BN"},
+            "phone": "07562074907",
+        }
+        for number in range(600)
+    ]
+
+
+def test_batch_encryption_round_trip(cipher_suite, accounts):
+    """
+    Tests that a batch spanning several thread pool chunks encrypts PII only and decrypts back.
+    """
+    encrypted = encrypt_records(accounts, cipher_suite)
+
+    assert encrypted[0]["name"] != "Anna"
+    assert encrypted[0]["address"]["postcode"] != "NW85BN"
+    assert encrypted[599]["email_address"] == "user599@gmail.com"
+    # source records are left untouched
+    assert accounts[0]["address"]["line1"] == "60 Acorn Place"
+    assert decrypt_records(encrypted, cipher_suite) == accounts
+
+
+def test_lazy_decryption(cipher_suite, accounts):
+    """
+    Tests that the listing view decrypts fields on access and shows the listing fields only.
+    """
+    view = lazy_decrypt(encrypt_records(accounts[:1], cipher_suite), cipher_suite)[0]
+
+    assert view["surname"] == "Smith"
+    assert view["address"]["line1"] == "60 Acorn Place"
+    assert repr(view) == repr(
+        {"account_number": "0", "email_address": "user0@gmail.com", "name": "Anna", "surname": "Smith"}
+    )
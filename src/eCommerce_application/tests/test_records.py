@@ -0,0 +1,46 @@
+from eCommerceApp import records
+from eCommerceApp.models import AccountModel, Item, OrderModel
+from eCommerceApp.records import InventoryColumns, format_cents, to_cents
+import pytest
+
+
+@pytest.fixture
+def inventory():
+    return [
+        {"item_id": "0000001", "brand": "Fern", "name": "Shampoo", "price": "2.99", "quantity": "20", "category_id": "01"},
+        {"item_id": "0000002", "brand": "Fern", "name": "Conditioner", "price": "2.99", "quantity": "35", "category_id": "04"},
+        {"item_id": "0000003", "brand": "Fern", "name": "Mask", "price": "5.99", "quantity": "2", "category_id": "01"},
+    ]
+
+
+def test_slotted_records_round_trip(inventory):
+    """
+    Tests that the slotted models convert to and from the JSON schema without an instance dict.
+    """
+    item = Item.from_dict(inventory[0])
+    assert item.name == "Shampoo" and item.to_dict() == inventory[0]
+    assert not hasattr(item, "__dict__")
+
+    order = OrderModel.from_dict({"order_id": "0000001", "order_items": [{"item_id": "0000001", "quantity": 1}]})
+    order.add_product_to_order("0000002", 2)
+    assert order.to_dict()["order_items"] == [{"item_id": "0000001", "quantity": 1}, {"item_id": "0000002", "quantity": 2}]
+    assert AccountModel.from_dict({"email_address": "a@gmail.com"}).to_dict()["role"] == "user"
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_inventory_column_aggregations(inventory, monkeypatch, use_numpy):
+    """
+    Tests the columnar aggregations with and without NumPy.
+    """
+    if not use_numpy:
+        monkeypatch.setattr(records, "numpy", None)
+    elif records.numpy is None:
+        pytest.skip("NumPy is not installed")
+    columns = InventoryColumns(inventory)
+    assert columns.total_quantity() == 57
+    assert columns.stock_value_cents() == 299 * 20 + 299 * 35 + 599 * 2
+    assert columns.stock_value_by_category() == {"01": 299 * 20 + 599 * 2, "04": 299 * 35}
+    assert columns.low_stock(5) == ["0000003"]
+    assert columns.to_dicts() == inventory
+    assert columns.item(columns.position("0000003")).price == "5.99"
+    assert (to_cents("0.005"), format_cents(300)) == (1, "3.00")
@@ -0,0 +1,151 @@
+import json
+from concurrent.futures import Future
+from eCommerceApp.helper_funcs import get_data
+from eCommerceApp.repositories import AccountRepository, OrderRepository
+import pytest
+
+
+@pytest.fixture
+def repository():
+    return AccountRepository(debug=True)
+
+
+def test_account_lookup(repository):
+    """
+    Tests that accounts are found through the e-mail and account number indexes.
+    """
+    assert repository.find_by_email("testemail1@gmail.com")["account_number"] == "000123"
+    assert repository.find_by_account_number(456)["email_address"] == "testemail2@gmail.com"
+    assert repository.find_by_email("testemail10@gmail.com") is None
+
+
+def test_indexes_follow_insert_and_delete(repository):
+    """
+    Tests that the indexes stay correct when accounts are added and deleted in memory.
+    """
+    repository.add(
+        {"account_id": "7", "email_address": "new@gmail.com", "account_number": "000789"}
+    )
+    assert repository.email_exists("new@gmail.com")
+    assert repository.find_by_id("7")["account_number"] == "000789"
+
+    with pytest.raises(ValueError):
+        repository.add({"email_address": "new@gmail.com"})
+
+    assert repository.delete_by_id("7") is not None
+    assert repository.find_by_email("new@gmail.com") is None
+    assert repository.find_by_account_number("000789") is None
+    assert repository.delete_by_id("7") is None
+
+
+
+def test_unsaved_account_changes_stay_private(tmp_path, monkeypatch):
+    """
+    Tests that changes after a save do not show up in the accounts list handed to the data store, and
+    that accounts with equal fields are updated and deleted by their own position.
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    twin = {"email_address": "", "name": "Anna"}
+    (tmp_path / "data" / "accounts.json").write_text(
+        json.dumps([{**twin, "account_number": "000001"}, {**twin, "account_number": "000002"}])
+    )
+    repository = AccountRepository()
+    repository.add({"account_id": "3", "email_address": "saved@gmail.com", "account_number": "000003"})
+    repository.save()
+    stored = get_data("accounts")
+    assert len(stored) == 3
+
+    repository.add({"account_id": "4", "email_address": "unsaved@gmail.com", "account_number": "000004"})
+    repository.update("000002", name="Maria")
+    repository.delete_by_id("3")
+    assert get_data("accounts") is stored and len(stored) == 3
+    assert stored[1]["name"] == "Anna"
+    assert [(a["account_number"], a.get("name")) for a in repository.all()] == [
+        ("000001", "Anna"),
+        ("000002", "Maria"),
+        ("000004", None),
+    ]
+    assert repository.find_by_account_number(4)["email_address"] == "unsaved@gmail.com"
+
+class RecordingWriter:
+    def __init__(self):
+        self.entries = []
+
+    def submit(self, entries, merged=None):
+        self.entries.extend(entries)
+        future = Future()
+        future.set_result(None)
+        return future
+
+
+@pytest.fixture
+def orders(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "orders.json").write_text(
+        json.dumps(
+            [
+                {"order_id": "0000001", "account_number": "000335", "status": "placed"},
+                {"order_id": "0000002", "account_number": "000298", "status": "completed"},
+                {"order_id": "0000003", "account_number": "000335", "status": "completed"},
+            ]
+        )
+    )
+    writer = RecordingWriter()
+    return OrderRepository(writer=writer), writer
+
+
+def test_order_indexes_follow_changes(orders):
+    """
+    Tests that the account and status indexes are maintained on create, update and delete.
+    """
+    repository, writer = orders
+    assert [o["order_id"] for o in repository.find_by_account(335)] == ["0000001", "0000003"]
+
+    repository.add({"order_id": "0000004", "account_number": "000335", "status": "placed"}).result()
+    repository.update("0000001", status="completed").result()
+    repository.delete(3).result()
+    assert repository.delete("0000099") is None
+
+    assert [o["order_id"] for o in repository.find_by_account("000335")] == ["0000001", "0000004"]
+    assert [o["order_id"] for o in repository.find_by_status("placed")] == ["0000004"]
+    assert [o["order_id"] for o in repository.find_by_status("completed")] == ["0000002", "0000001"]
+    assert repository.find_by_id(1)["status"] == "completed"
+    assert [entry["op"] for entry in writer.entries] == ["put", "put", "delete"]
+
+
+class ManualWriter:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, entries, merged=None):
+        future = Future()
+        self.submitted.append((entries, merged, future))
+        return future
+
+
+def test_order_changes_are_copy_on_write(orders):
+    """
+    Tests that changes never modify a handed out list, become visible once durable and are dropped
+    together with the changes built on them when a commit fails.
+    """
+    repository, _ = orders
+    repository.writer = writer = ManualWriter()
+    shared = repository.all()
+    snapshot = list(shared)
+
+    repository.add({"order_id": "0000004", "account_number": "000335", "status": "placed"})
+    repository.update(4, status="completed")
+    assert repository.find_by_id(4) is None
+    assert [o["status"] for o in writer.submitted[1][1] if o["order_id"] == "0000004"] == ["completed"]
+    writer.submitted[0][2].set_exception(OSError("disk full"))
+    writer.submitted[1][2].set_result(None)
+    assert repository.find_by_id(4) is None and repository.update(4, status="placed") is None
+
+    repository.delete(1)
+    writer.submitted[2][2].set_result(None)
+    assert repository.find_by_id(1) is None
+    assert [o["order_id"] for o in repository.all()] == ["0000002", "0000003"]
+    assert [o["order_id"] for o in repository.find_by_account(335)] == ["0000003"]
+    assert shared == snapshot
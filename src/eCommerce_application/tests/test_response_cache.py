@@ -0,0 +1,23 @@
+from eCommerceApp.response_cache import ResponseCache
+
+
+def test_response_rendered_once_per_version():
+    """
+    Tests that responses are only rendered again when the data version changes.
+    """
+    cache = ResponseCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return b'[{"order_id": "0000001"}]'
+
+    etag, body = cache.get_or_render("orders", 1, b"", render)
+    assert cache.get_or_render("orders", 1, b"", render) == (etag, body)
+    assert len(renders) == 1
+
+    # same content under a new version keeps its strong ETag
+    assert cache.get_or_render("orders", 2, b"", render)[0] == etag
+    assert len(renders) == 2
+    cache.get_or_render("orders", 2, b"limit=1", render)
+    assert len(renders) == 3
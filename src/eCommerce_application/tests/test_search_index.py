@@ -0,0 +1,62 @@
+import random
+from eCommerceApp.search_index import InventorySearchIndex, get_search_index
+import pytest
+
+
+@pytest.fixture
+def inventory():
+    return [
+        {"item_id": "0000001", "brand": "Fern", "name": "Deep Moisture Shampoo", "category_id": "01"},
+        {"item_id": "0000002", "brand": "Fern", "name": "Deep Moisture Conditioner", "category_id": "04"},
+        {"item_id": "0000003", "brand": "Fern", "name": "Deep Moisture Mask", "category_id": "03"},
+        {"item_id": "0000004", "brand": "Oakley", "name": "Dry Shampoo", "category_id": "02"},
+    ]
+
+
+def sequential_search(inventory, keyword):
+    return [item for item in inventory if keyword.lower() in item.get("name", "").lower()]
+
+
+def test_search_matches_sequential_search(inventory):
+    """
+    Tests that the index returns the same items, in the same order, as a sequential substring search.
+    """
+    index = InventorySearchIndex(inventory)
+    keywords = ["", "d", "sh", "SHAMPOO", "moisture c", "oo", "mask", "xyz", "Deep Moisture Mask"]
+    for keyword in keywords:
+        assert index.search(keyword) == sequential_search(inventory, keyword)
+
+    # random substrings of random names
+    rng = random.Random(1)
+    alphabet = "abcde "
+    items = [{"name": "".join(rng.choice(alphabet) for _ in range(12))} for _ in range(200)]
+    index = InventorySearchIndex(items)
+    for _ in range(200):
+        name = rng.choice(items)["name"]
+        start = rng.randrange(len(name))
+        keyword = name[start:start + rng.randint(1, 6)]
+        assert index.search(keyword) == sequential_search(items, keyword)
+
+
+def test_ranked_term_search(inventory):
+    """
+    Tests prefix, multi-term AND and top-k searches over name, brand and category.
+    """
+    index = InventorySearchIndex(inventory)
+
+    assert [item["item_id"] for item in index.search_terms("sham")] == ["0000001", "0000004"]
+    assert [item["item_id"] for item in index.search_terms("fern sham")] == ["0000001"]
+    assert index.search_terms("fern dry") == []
+    assert len(index.search_terms("deep", top_k=2)) == 2
+    assert index.search_terms("02")[0]["item_id"] == "0000004"
+
+
+def test_shared_index_per_inventory_version(inventory):
+    """
+    Tests that the shared index is reused for the same inventory list and rebuilt for a changed one.
+    """
+    index = get_search_index(inventory)
+    assert get_search_index(inventory) is index
+    changed = inventory[:2]
+    assert get_search_index(changed) is not index
+    assert get_search_index(changed).search("shampoo") == [inventory[0]]
@@ -0,0 +1,46 @@
+import json
+from eCommerceApp.secret_keys import Keyring
+import pytest
+
+
+@pytest.fixture
+def keyring(tmp_path):
+    path = tmp_path / "keys.json"
+    with open("tests/test_data/test_keys.json") as f:
+        keys = json.load(f)[0]
+    path.write_text(
+        json.dumps([{"jwt_secret_key": "secret", "data_encryption_key": keys["test_data_encryption_key"]}])
+    )
+    return Keyring(str(path), check_interval=0)
+
+
+def test_cipher_reused(keyring):
+    """
+    Tests that the cipher is built once and reused while the keys file is unchanged.
+    """
+    assert keyring.cipher() is keyring.cipher()
+
+
+def test_rotation_keeps_old_data_readable(keyring):
+    """
+    Tests that data encrypted before a key rotation can still be decrypted afterwards.
+    """
+    token = keyring.cipher().encrypt(b"Anda Ziemele")
+    old_key = keyring.get("data_encryption_key")
+
+    keyring.rotate("data_encryption_key")
+
+    assert keyring.get("data_encryption_key") != old_key
+    assert keyring.previous("data_encryption_key") == [old_key]
+    assert keyring.cipher().decrypt(token) == b"Anda Ziemele"
+
+
+def test_hot_reload(keyring):
+    """
+    Tests that a changed keys file is picked up without restarting.
+    """
+    assert keyring.jwt_signing_key() == "secret"
+    with open(keyring.path, "w") as f:
+        json.dump([{"jwt_secret_key": "rotated secret!"}], f)
+
+    assert keyring.jwt_signing_key() == "rotated secret!"
@@ -0,0 +1,85 @@
+from eCommerceApp import service
+from eCommerceApp.service import LoginThrottle, SessionStore, create_service_app
+import pytest
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def authenticate(self, email, password, secure=True):
+        self.account.email_address = email
+        self.account.role = "clerk" if email.startswith("clerk") else "user"
+        return password == "Password1!"
+
+    monkeypatch.setattr(service.EShopModel, "authenticate", authenticate)
+    throttle = LoginThrottle(max_failures=3, max_client_failures=5)
+    return create_service_app(SessionStore(ttl=60), throttle).test_client()
+
+
+def login(client, email, password="Password1!", client_address="127.0.0.1"):
+    return client.post(
+        "/api/session",
+        json={"email": email, "password": password},
+        environ_base={"REMOTE_ADDR": client_address},
+    )
+
+
+def auth(client, email):
+    response = login(client, email)
+    return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+
+def test_sessions_keep_their_own_role(client):
+    """
+    Tests that every session is authorised with the role of its own login.
+    """
+    assert client.get("/api/orders/all").status_code == 401
+    bad = client.post("/api/session", json={"email": "user@gmail.com", "password": "wrong"})
+    assert bad.status_code == 401
+    assert len(client.application.config["SESSIONS"]) == 0
+
+    user = auth(client, "user@gmail.com")
+    clerk = auth(client, "clerk@gmail.com")
+    assert client.get("/api/orders/all", headers=user).status_code == 403
+    assert client.get("/api/orders").status_code == 401
+    assert client.get("/api/orders", headers=user).status_code == 403
+    assert client.get("/api/orders", headers=clerk).status_code not in (401, 403)
+    assert client.delete("/api/accounts/1", headers=clerk).status_code == 403
+
+    assert client.delete("/api/session", headers=user).status_code == 204
+    assert client.get("/api/orders/mine", headers=user).status_code == 401
+
+
+def test_failed_logins_are_limited(client):
+    """
+    Tests that an account is locked after repeated failed logins, also for the right password, and that
+    a client is locked after failing for several accounts, while other clients can still log in.
+    """
+    assert login(client, "user@gmail.com", "wrong").status_code == 401
+    assert login(client, "user@gmail.com").status_code == 200
+    for _ in range(3):
+        assert login(client, "user@gmail.com", "wrong").status_code == 401
+    locked = login(client, "user@gmail.com")
+    assert locked.status_code == 429 and int(locked.headers["Retry-After"]) > 0
+    assert login(client, "user@gmail.com", client_address="10.0.0.2").status_code == 429
+
+    for number in range(5):
+        assert login(client, f"user{number}@gmail.com", "wrong", "10.0.0.3").status_code == 401
+    assert login(client, "clerk@gmail.com", client_address="10.0.0.3").status_code == 429
+    assert login(client, "clerk@gmail.com", client_address="10.0.0.4").status_code == 200
+
+
+def test_sessions_expire():
+    """
+    Tests that idle sessions expire and the least recently used session is dropped when full.
+    """
+    store = SessionStore(ttl=0.0, max_sessions=2)
+    token, _ = store.create()
+    assert store.get(token) is None
+
+    store = SessionStore(max_sessions=2)
+    first, _ = store.create()
+    second, _ = store.create()
+    store.get(first)
+    store.create()
+    assert store.get(second) is None
+    assert store.get(first) is not None
@@ -0,0 +1,80 @@
+import json
+from eCommerceApp.journal import RecordJournal
+from eCommerceApp.storage import JsonStorageEngine, SQLiteStorageEngine, StorageEngine
+import pytest
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = SQLiteStorageEngine(str(tmp_path / "eshop.db"))
+    yield engine
+    engine.close()
+
+
+def test_sqlite_write_and_load(engine):
+    """
+    Tests that records written to SQLite are loaded back in insertion order and found by indexed fields.
+    """
+    engine.insert_many(
+        "accounts",
+        [
+            {"account_number": "000335", "email_address": "annasmith@gmail.com"},
+            {"account_number": "000298", "email_address": "georgephil@gmail.com"},
+        ],
+    )
+    engine.write("accounts", [{"op": "put", "record": {"account_number": 338, "email_address": "new@gmail.com"}}])
+
+    assert [a["account_number"] for a in engine.load("accounts")] == ["000335", "000298", 338]
+    assert engine.find("accounts", "email_address", "georgephil@gmail.com")[0]["account_number"] == "000298"
+    assert engine.find("accounts", "account_number", 335)[0]["email_address"] == "annasmith@gmail.com"
+
+
+def test_sqlite_load_cached_until_write(engine):
+    """
+    Tests that unchanged data is served from memory and deletes are applied.
+    """
+    engine.insert_many("orders", [{"order_id": "0000001", "account_number": "000335"}])
+    orders = engine.load("orders")
+    assert engine.load("orders") is orders
+
+    engine.write("orders", [{"op": "delete", "key": "0000001"}])
+    assert engine.load("orders") == []
+
+
+def test_storage_engine_is_abstract():
+    """
+    Tests that engines must implement load, write and version.
+    """
+    class LoadOnlyEngine(StorageEngine):
+        def load(self, data_type):
+            return []
+
+    with pytest.raises(TypeError):
+        StorageEngine()
+    with pytest.raises(TypeError):
+        LoadOnlyEngine()
+
+
+def test_json_write_does_not_mask_later_appends(tmp_path, monkeypatch):
+    """
+    Tests that a list handed to the data store on write is replaced once another process appends to
+    the journal right after the write, instead of being cached with the newer file signature.
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "accounts.json").write_text(json.dumps([{"account_number": "000001"}]))
+    engine = JsonStorageEngine()
+    records = engine.load("accounts")
+    journal = engine.get_journal("accounts")
+    other_process = RecordJournal("data/accounts.json", "account_number")
+    append_entries = journal.append_entries
+
+    def append_before_handover(entries, fsync=False):
+        signatures = append_entries(entries, fsync)
+        other_process.put({"account_number": "000003"})
+        return signatures
+
+    monkeypatch.setattr(journal, "append_entries", append_before_handover)
+    added = {"account_number": "000002"}
+    assert engine.write("accounts", [{"op": "put", "record": added}], merged=records + [added])
+    assert [record["account_number"] for record in engine.load("accounts")] == ["000001", "000002", "000003"]
@@ -0,0 +1,45 @@
+import json
+import jwt
+from eCommerceApp.secret_keys import Keyring
+from eCommerceApp.tokens import TokenVerifier, issue_token
+import pytest
+
+
+@pytest.fixture
+def keyring(tmp_path):
+    path = tmp_path / "keys.json"
+    path.write_text(json.dumps([{"jwt_secret_key": "secret-signing-key-of-32-bytes!!"}]))
+    return Keyring(str(path), check_interval=0)
+
+
+def test_verified_tokens_are_cached(keyring):
+    """
+    Tests that a token's role comes from its claims and repeated checks skip decoding.
+    """
+    verifier = TokenVerifier(keyring)
+    token = issue_token({"user_email": "a@gmail.com", "role": "clerk"}, keyring=keyring)
+    assert verifier.role(token) == "clerk"
+    assert verifier.verify(token)["user_email"] == "a@gmail.com"
+    assert (verifier.hits, verifier.misses) == (1, 1)
+
+    # tokens signed before a key rotation stay valid, forged ones are rejected
+    keyring.rotate("jwt_secret_key")
+    assert verifier.role(token) == "clerk"
+    forged = jwt.encode({"role": "admin", "exp": 2**31, "nbf": 0, "iat": 0}, "x" * 32, algorithm="HS256")
+    assert verifier.role(forged) is None
+
+
+def test_expired_and_immature_tokens_rejected(keyring):
+    """
+    Tests the expiry and not-before checks.
+    """
+    verifier = TokenVerifier(keyring, leeway=0)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(issue_token({"role": "admin"}, lifetime=-1, keyring=keyring))
+    early = jwt.encode(
+        {"role": "admin", "exp": 2**31, "nbf": 2**31 - 1, "iat": 0},
+        keyring.jwt_signing_key(),
+        algorithm="HS256",
+    )
+    with pytest.raises(jwt.ImmatureSignatureError):
+        verifier.verify(early)
@@ -0,0 +1,69 @@
+from eCommerceApp.validators import (
+    SECURE_EMAIL_PATTERN,
+    is_strong_password,
+    is_valid_email,
+    validate_accounts,
+    validate_emails,
+    validate_passwords,
+)
+import itertools
+import re
+import time
+
+
+def test_email_scanner_matches_secure_pattern():
+    """
+    Tests that the linear-time scanner accepts exactly the addresses the secure regex accepts.
+    """
+    alphabet = "a1.@-!"
+    for length in range(1, 8):
+        for characters in itertools.product(alphabet, repeat=length):
+            email = "".join(characters)
+            assert is_valid_email(email) is (SECURE_EMAIL_PATTERN.fullmatch(email) is not None), email
+    for email in ["a@b.co", "a@.co", "a@b..co", "a.b@c.d.ef", "a@b.c1", "a@b.co\n", "ü@b.co", "a@b.cö"]:
+        assert is_valid_email(email) is (SECURE_EMAIL_PATTERN.fullmatch(email) is not None), email
+
+
+def test_password_check_matches_regex_check():
+    """
+    Tests that the single-pass strength check gives the result of the previous regex searches.
+    """
+    def regex_check(password):
+        return bool(
+            re.search(r"[A-Z]", password)
+            and re.search(r"[a-z]", password)
+            and re.search(r"@|!|\$|&|\.", password)
+            and re.search(r"\d", password)
+            and len(password) >= 8
+        )
+
+    for password in ["SsDMoDuLe123!.", "SsDMoDuLe123#", "Az.!12", "aaaaAAAA1$", "AAAAaaaa١&", "Ab1!Ab1!"]:
+        assert is_strong_password(password) is regex_check(password), password
+
+
+def test_bulk_validation():
+    """
+    Tests the bulk validation of addresses, passwords and account records.
+    """
+    assert validate_emails(["testemail1@gmail.com", "testemail1", None]) == [True, False, False]
+    assert validate_passwords(["SsDMoDuLe123!.", "weak"]) == [True, False]
+    assert validate_passwords(["weak"], secure=False) == [True]
+    errors = validate_accounts(
+        [
+            {"email_address": "testemail1@gmail.com", "password": "SsDMoDuLe123!."},
+            {"email_address": "test@email1", "password": "weak"},
+            {"email_address": "testemail2@gmail.com"},
+        ]
+    )
+    assert errors[0] == [] and len(errors[1]) == 2 and errors[2] == []
+
+
+def test_email_scanner_is_linear_on_crafted_input():
+    """
+    Tests that input which makes a backtracking pattern explode is scanned quickly.
+    """
+    start = time.perf_counter()
+    for length in (1000, 10000, 100000):
+        assert not is_valid_email("a@" + "a." * length + "!")
+        assert not is_valid_email("a" * length + "@" + "-" * length)
+    assert time.perf_counter() - start < 1.0